@@ -49,6 +49,20 @@ const getThreatBadge = (level) => {
   return variants[level] || 'secondary';
 };
 
+// /ioc/search returns stored IOC documents; map them onto the fields the result cards show
+const toSearchResult = (ioc) => ({
+  ...ioc,
+  value: ioc.ioc_value,
+  type: ioc.ioc_type,
+  threat_level: ioc.threat_level || ioc.threat_type,
+  description: ioc.description || ioc.metadata?.description || '',
+  sources: ioc.metadata?.all_sources || [ioc.source].filter(Boolean),
+  campaigns: ioc.campaigns || [],
+  threat_actors: ioc.threat_actors || [],
+  malware_families: ioc.malware_families || [],
+  tags: ioc.tags || []
+});
+
 export default function IOCSearch() {
   const [searchQuery, setSearchQuery] = useState('');
   const [searchResults, setSearchResults] = useState(null);
@@ -76,22 +90,39 @@ export default function IOCSearch() {
     }
   };
 
-  const handleSearch = async () => {
+  // Pass the previous page's next_cursor to append the following page
+  const handleSearch = async (cursor = null) => {
     if (!searchQuery.trim()) return;
     
     setLoading(true);
-    setEnrichmentData(null);
-    setCorrelationData(null);
+    if (!cursor) {
+      setEnrichmentData(null);
+      setCorrelationData(null);
+    }
     
     try {
       const params = {
         query: searchQuery,
+        paginate: true,
+        ...(cursor && { cursor }),
         ...(iocTypeFilter !== 'all' && { ioc_type: iocTypeFilter }),
         ...(threatLevelFilter !== 'all' && { threat_level: threatLevelFilter })
       };
 
+      const started = performance.now();
       const response = await axios.get(apiPath('ioc/search'), { params });
-      setSearchResults(response.data);
+      const { results, next_cursor: nextCursor } = response.data;
+      const iocs = results.map(toSearchResult);
+      
+      setSearchResults((previous) => {
+        const shown = cursor && previous ? [...previous.iocs, ...iocs] : iocs;
+        return {
+          iocs: shown,
+          total_results: shown.length,
+          search_time_ms: Math.round(performance.now() - started),
+          next_cursor: nextCursor
+        };
+      });
     } catch (error) {
       console.error('Error searching IOCs:', error);
     } finally {
@@ -185,7 +216,7 @@ export default function IOCSearch() {
                   className="text-lg"
                 />
               </div>
-              <Button onClick={handleSearch} disabled={loading} size="lg">
+              <Button onClick={() => handleSearch()} disabled={loading} size="lg">
                 {loading ? <Loader2 className="w-4 h-4 animate-spin mr-2" /> : <Search className="w-4 h-4 mr-2" />}
                 Search
               </Button>
@@ -398,6 +429,18 @@ export default function IOCSearch() {
                   })}
                 </div>
 
+                {searchResults.next_cursor && (
+                  <div className="mt-4 text-center">
+                    <Button
+                      variant="outline"
+                      disabled={loading}
+                      onClick={() => handleSearch(searchResults.next_cursor)}
+                    >
+                      Load more
+                    </Button>
+                  </div>
+                )}
+
                 {searchResults.iocs.length === 0 && (
                   <div className="text-center py-12 text-gray-500 dark:text-[#a0a0a0]">
                     <Search className="w-12 h-12 mx-auto mb-3 text-gray-400" />
@@ -0,0 +1,56 @@
+"""
+Re-ingest IOCs from every feed with the IOC index in bulk-load mode.
+
+Refreshes are disabled until the load finishes, so newly collected IOCs are
+not searchable while it runs. Run it offline, not alongside /ioc/collect.
+Every collected IOC is written: the persistent dedup index (IOC_DEDUP_DB)
+is bypassed, so IOCs it already knows are not skipped.
+
+Usage:
+    python scripts/reingest_iocs.py [--limit-per-source N] [--no-force-merge]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.collectors.ioc_orchestrator import IOCOrchestrator
+from src.collectors.dedup_store import DedupStore
+from src.utils.elastic import ElasticsearchClient
+
+def reingest(limit_per_source: int, force_merge: bool) -> bool:
+    """Collect every feed in full and index the IOCs in bulk-load mode."""
+    # Deduplicate within this run only, never against earlier runs
+    dedup_store = DedupStore(':memory:')
+    orchestrator = IOCOrchestrator(dedup_store=dedup_store)
+    es_client = ElasticsearchClient()
+    
+    try:
+        with es_client.bulk_load(force_merge=force_merge):
+            result = es_client.stream_index(orchestrator.iter_all(limit_per_source=limit_per_source))
+        
+        print(f"Indexed {result['indexed']} IOCs in {result['seconds']:.1f}s "
+              f"({result['docs_per_second']:.0f} docs/s)")
+        if result['error']:
+            print(f"❌ Indexing stopped early: {result['error']}; watermarks and dedup records not advanced")
+            return False
+        if result['failed']:
+            print(f"❌ {result['failed']} IOCs failed to index; watermarks and dedup records not advanced")
+            return False
+        
+        orchestrator.commit()
+        return True
+    finally:
+        orchestrator.close()
+        dedup_store.close()
+        es_client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limit-per-source', type=int, default=1000)
+    parser.add_argument('--no-force-merge', action='store_true')
+    args = parser.parse_args()
+    
+    ok = reingest(args.limit_per_source, force_merge=not args.no_force_merge)
+    sys.exit(0 if ok else 1)
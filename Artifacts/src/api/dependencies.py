@@ -0,0 +1,245 @@
+"""Application-scoped clients shared by the API routers"""
+
+import os
+import asyncio
+import threading
+from typing import Optional, Union
+import logging
+
+from fastapi import HTTPException
+
+from ..utils.elastic import ElasticsearchClient, ELASTICSEARCH_AVAILABLE
+from ..utils.elastic_async import (
+    AsyncElasticsearchClient,
+    ThreadedElasticsearchClient,
+    ASYNC_ELASTICSEARCH_AVAILABLE
+)
+from ..utils.neo4j_async import AsyncNeo4jClient, NEO4J_AVAILABLE
+from ..utils.graph_cache import GraphKey, get_graph_cache, refresh_periodically
+
+logger = logging.getLogger(__name__)
+
+_es_client: Optional[ElasticsearchClient] = None
+_es_client_lock = threading.Lock()
+_async_es_client: Optional[Union[AsyncElasticsearchClient, ThreadedElasticsearchClient]] = None
+_async_es_client_lock = threading.Lock()
+_neo4j_client: Optional[AsyncNeo4jClient] = None
+_neo4j_client_lock = threading.Lock()
+_graph_refresh_task: Optional[asyncio.Task] = None
+
+
+def init_es_client() -> Optional[ElasticsearchClient]:
+    """
+    Create the shared Elasticsearch client (called once at application startup).
+    
+    Returns:
+        The shared client, or None if it could not be created
+    """
+    global _es_client
+    
+    if not ELASTICSEARCH_AVAILABLE:
+        return None
+    
+    with _es_client_lock:
+        if _es_client is None:
+            try:
+                _es_client = ElasticsearchClient()
+                logger.info("Created shared Elasticsearch client")
+            except Exception as e:
+                logger.error(f"Error creating Elasticsearch client: {e}")
+        return _es_client
+
+
+def close_es_client():
+    """Close the shared Elasticsearch client (called at application shutdown)."""
+    global _es_client
+    
+    with _es_client_lock:
+        if _es_client is not None:
+            try:
+                _es_client.close()
+            except Exception as e:
+                logger.error(f"Error closing Elasticsearch client: {e}")
+            _es_client = None
+
+
+def get_es_client() -> ElasticsearchClient:
+    """
+    FastAPI dependency returning the shared Elasticsearch client.
+    
+    The client is created lazily if the lifespan hook has not run (e.g. when
+    the app is used without its startup events), so handlers always reuse
+    one pool of keep-alive connections.
+    
+    Raises:
+        HTTPException: 503 if Elasticsearch is not installed, 500 if the client
+            cannot be created
+    """
+    if not ELASTICSEARCH_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Elasticsearch not available")
+    
+    client = _es_client or init_es_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="Elasticsearch client could not be created")
+    return client
+
+
+def init_async_es_client() -> Optional[Union[AsyncElasticsearchClient, ThreadedElasticsearchClient]]:
+    """
+    Create the shared async Elasticsearch client (called once at application startup).
+    
+    Uses AsyncElasticsearch when aiohttp is installed; otherwise the sync
+    client's calls are run in the thread pool so they never block the event
+    loop.
+    
+    Returns:
+        The shared client, or None if it could not be created
+    """
+    global _async_es_client
+    
+    if not ELASTICSEARCH_AVAILABLE:
+        return None
+    
+    with _async_es_client_lock:
+        if _async_es_client is None:
+            try:
+                if ASYNC_ELASTICSEARCH_AVAILABLE:
+                    _async_es_client = AsyncElasticsearchClient()
+                    logger.info("Created shared async Elasticsearch client")
+                else:
+                    sync_client = init_es_client()
+                    if sync_client is not None:
+                        _async_es_client = ThreadedElasticsearchClient(sync_client)
+            except Exception as e:
+                logger.error(f"Error creating async Elasticsearch client: {e}")
+        return _async_es_client
+
+
+def get_async_es_client() -> Union[AsyncElasticsearchClient, ThreadedElasticsearchClient]:
+    """
+    FastAPI dependency returning the shared async Elasticsearch client.
+    
+    Like ``get_es_client``, the client is created (under the same kind of
+    lock) if the lifespan hook has not run.
+    
+    Raises:
+        HTTPException: 503 if Elasticsearch is not installed, 500 if the client
+            cannot be created
+    """
+    if not ELASTICSEARCH_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Elasticsearch not available")
+    
+    client = _async_es_client or init_async_es_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="Elasticsearch client could not be created")
+    return client
+
+
+async def close_async_es_client():
+    """Close the shared async Elasticsearch client (called at application shutdown)."""
+    global _async_es_client
+    
+    with _async_es_client_lock:
+        client, _async_es_client = _async_es_client, None
+    
+    if client is not None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing async Elasticsearch client: {e}")
+
+
+def init_neo4j_client() -> Optional[AsyncNeo4jClient]:
+    """
+    Create the process-wide async Neo4j client (called once at application startup).
+    
+    The driver connects lazily, so this does not wait for Neo4j.
+    
+    Returns:
+        The shared client, or None if it could not be created
+    """
+    global _neo4j_client
+    
+    if not NEO4J_AVAILABLE:
+        return None
+    
+    with _neo4j_client_lock:
+        if _neo4j_client is None:
+            try:
+                _neo4j_client = AsyncNeo4jClient()
+                logger.info("Created shared Neo4j driver")
+            except Exception as e:
+                logger.error(f"Error creating Neo4j driver: {e}")
+        return _neo4j_client
+
+
+def get_neo4j_client() -> AsyncNeo4jClient:
+    """
+    FastAPI dependency returning the process-wide async Neo4j client.
+    
+    The driver (routing discovery, authentication and its connection pool)
+    is reused by every request until shutdown. Like ``get_es_client``, it is
+    created (under a lock) if the lifespan hook has not run.
+    
+    Raises:
+        HTTPException: 503 if Neo4j is not installed, 500 if the driver cannot be created
+    """
+    if not NEO4J_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Neo4j not available")
+    
+    client = _neo4j_client or init_neo4j_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="Neo4j driver could not be created")
+    return client
+
+
+async def close_neo4j_client():
+    """Close the process-wide Neo4j driver (called at application shutdown)."""
+    global _neo4j_client
+    
+    with _neo4j_client_lock:
+        client, _neo4j_client = _neo4j_client, None
+    
+    if client is not None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing Neo4j driver: {e}")
+
+
+async def _fetch_network_view(key: GraphKey):
+    return await get_neo4j_client().get_threat_subgraph(**key._asdict())
+
+
+def start_graph_refresh() -> Optional[asyncio.Task]:
+    """
+    Start rebuilding stale network views in the background (called at application startup).
+    
+    Views that were requested recently but expired or were invalidated by a
+    graph write are recomputed every GRAPH_CACHE_REFRESH_INTERVAL seconds
+    (default 60; 0 disables), so requests keep hitting precomputed views.
+    
+    Returns:
+        The refresh task, or None if disabled
+    """
+    global _graph_refresh_task
+    
+    interval = float(os.getenv('GRAPH_CACHE_REFRESH_INTERVAL', '60'))
+    if not NEO4J_AVAILABLE or interval <= 0 or _graph_refresh_task is not None:
+        return _graph_refresh_task
+    
+    _graph_refresh_task = asyncio.create_task(refresh_periodically(get_graph_cache(), _fetch_network_view, interval))
+    return _graph_refresh_task
+
+
+async def stop_graph_refresh():
+    """Cancel the background network view refresh (called at application shutdown)."""
+    global _graph_refresh_task
+    
+    if _graph_refresh_task is not None:
+        _graph_refresh_task.cancel()
+        try:
+            await _graph_refresh_task
+        except asyncio.CancelledError:
+            pass
+        _graph_refresh_task = None
@@ -1,24 +1,51 @@
 """FastAPI main application"""
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from typing import List, Dict, Optional
 import logging
 
+from .dependencies import (
+    init_es_client,
+    close_es_client,
+    init_async_es_client,
+    close_async_es_client,
+    init_neo4j_client,
+    close_neo4j_client,
+    start_graph_refresh,
+    stop_graph_refresh
+)
 from .routers import ioc, threats, actors, campaigns, detect, timeline, network, threat_timeline, ioc_search, mitre_attack, ir_playbooks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared backend clients on startup and close them on shutdown."""
+    init_es_client()
+    init_async_es_client()
+    init_neo4j_client()
+    start_graph_refresh()
+    yield
+    await stop_graph_refresh()
+    await close_async_es_client()
+    await close_neo4j_client()
+    close_es_client()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Cipher Threat Intelligence API",
     description="Cyber threat detection, attribution, and incident response platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware - allow Vercel deployments and local development
@@ -1,10 +1,11 @@
 """Threat actors endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Optional
 import logging
 
-from ...utils.neo4j_graph import Neo4jClient
+from ...utils.neo4j_async import AsyncNeo4jClient
+from ..dependencies import get_neo4j_client
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +14,21 @@ router = APIRouter()
 
 @router.get("/actors")
 async def get_actors(
-    limit: int = Query(100, description="Maximum results")
+    limit: int = Query(100, description="Maximum results"),
+    neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)
 ):
     """
     Get all threat actors.
     
     Args:
         limit: Maximum results
+        neo4j: Shared async Neo4j client
         
     Returns:
         List of threat actor dictionaries
     """
     try:
-        neo4j = Neo4jClient()
-        actors = neo4j.get_all_actors(limit=limit)
-        neo4j.close()
+        actors = await neo4j.get_all_actors(limit=limit)
         return {"actors": actors, "count": len(actors)}
     except Exception as e:
         logger.error(f"Error getting actors: {e}")
@@ -35,20 +36,20 @@ async def get_actors(
 
 
 @router.get("/actors/{actor_name}")
-async def get_actor_details(actor_name: str):
+async def get_actor_details(actor_name: str,
+                            neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)):
     """
     Get details for a specific threat actor.
     
     Args:
         actor_name: Threat actor name
+        neo4j: Shared async Neo4j client
         
     Returns:
         Threat actor details
     """
     try:
-        neo4j = Neo4jClient()
-        actor = neo4j.get_actor_details(actor_name)
-        neo4j.close()
+        actor = await neo4j.get_actor_details(actor_name)
         
         if not actor:
             raise HTTPException(status_code=404, detail="Actor not found")
@@ -62,20 +63,20 @@ async def get_actor_details(actor_name: str):
 
 
 @router.get("/actors/{actor_name}/iocs")
-async def get_actor_iocs(actor_name: str):
+async def get_actor_iocs(actor_name: str,
+                         neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)):
     """
     Get all IOCs associated with a threat actor.
     
     Args:
         actor_name: Threat actor name
+        neo4j: Shared async Neo4j client
         
     Returns:
         List of IOC dictionaries
     """
     try:
-        neo4j = Neo4jClient()
-        iocs = neo4j.get_actor_iocs(actor_name)
-        neo4j.close()
+        iocs = await neo4j.get_actor_iocs(actor_name)
         return {"iocs": iocs, "count": len(iocs)}
     except Exception as e:
         logger.error(f"Error getting actor IOCs: {e}")
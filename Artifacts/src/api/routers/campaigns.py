@@ -1,10 +1,11 @@
 """Campaigns endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Optional
 import logging
 
-from ...utils.neo4j_graph import Neo4jClient
+from ...utils.neo4j_async import AsyncNeo4jClient
+from ..dependencies import get_neo4j_client
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +14,21 @@ router = APIRouter()
 
 @router.get("/campaigns")
 async def get_campaigns(
-    limit: int = Query(100, description="Maximum results")
+    limit: int = Query(100, description="Maximum results"),
+    neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)
 ):
     """
     Get all active campaigns.
     
     Args:
         limit: Maximum results
+        neo4j: Shared async Neo4j client
         
     Returns:
         List of campaign dictionaries
     """
     try:
-        neo4j = Neo4jClient()
-        campaigns = neo4j.get_all_campaigns(limit=limit)
-        neo4j.close()
+        campaigns = await neo4j.get_all_campaigns(limit=limit)
         return {"campaigns": campaigns, "count": len(campaigns)}
     except Exception as e:
         logger.error(f"Error getting campaigns: {e}")
@@ -35,20 +36,20 @@ async def get_campaigns(
 
 
 @router.get("/campaigns/{campaign_id}")
-async def get_campaign_details(campaign_id: str):
+async def get_campaign_details(campaign_id: str,
+                               neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)):
     """
     Get details for a specific campaign.
     
     Args:
         campaign_id: Campaign ID
+        neo4j: Shared async Neo4j client
         
     Returns:
         Campaign details
     """
     try:
-        neo4j = Neo4jClient()
-        campaign = neo4j.get_campaign_details(campaign_id)
-        neo4j.close()
+        campaign = await neo4j.get_campaign_details(campaign_id)
         
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
@@ -62,20 +63,20 @@ async def get_campaign_details(campaign_id: str):
 
 
 @router.get("/campaigns/{campaign_id}/iocs")
-async def get_campaign_iocs(campaign_id: str):
+async def get_campaign_iocs(campaign_id: str,
+                            neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)):
     """
     Get all IOCs in a campaign.
     
     Args:
         campaign_id: Campaign ID
+        neo4j: Shared async Neo4j client
         
     Returns:
         List of IOC dictionaries
     """
     try:
-        neo4j = Neo4jClient()
-        iocs = neo4j.get_campaign_iocs(campaign_id)
-        neo4j.close()
+        iocs = await neo4j.get_campaign_iocs(campaign_id)
         return {"iocs": iocs, "count": len(iocs)}
     except Exception as e:
         logger.error(f"Error getting campaign IOCs: {e}")
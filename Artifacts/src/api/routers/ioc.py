@@ -1,12 +1,16 @@
 """IOC lookup and management endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Depends
 from typing import List, Dict, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import logging
 
 from ...collectors.ioc_orchestrator import IOCOrchestrator
-from ...utils.elastic import ElasticsearchClient
+from ...collectors.base_collector import BaseCollector
+from ...utils.elastic import ElasticsearchClient, CursorExpiredError
+from ...utils.elastic_async import AsyncElasticsearchClient
+from ...utils.bloom import get_ioc_bloom_index
+from ..dependencies import get_es_client, get_async_es_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,11 @@ class IOCLookupRequest(BaseModel):
     ioc_type: Optional[str] = None
 
 
+class IOCBatchLookupRequest(BaseModel):
+    """Request model for batched IOC lookup"""
+    indicators: List[IOCLookupRequest] = Field(..., max_length=50000)
+
+
 class IOCResponse(BaseModel):
     """Response model for IOC data"""
     ioc_value: str
@@ -34,26 +43,44 @@ class IOCResponse(BaseModel):
 
 
 @router.post("/ioc/check", response_model=List[IOCResponse])
-async def check_ioc(request: IOCLookupRequest):
+async def check_ioc(request: IOCLookupRequest,
+                    es_client: AsyncElasticsearchClient = Depends(get_async_es_client),
+                    sync_es_client: ElasticsearchClient = Depends(get_es_client)):
     """
     Check if IOC is known threat.
     
     Args:
         request: IOC lookup request
+        es_client: Shared async Elasticsearch client
+        sync_es_client: Shared Elasticsearch client (for filter rebuilds)
         
     Returns:
         List of matching IOC records
     """
     try:
-        # Initialize Elasticsearch client
-        es_client = ElasticsearchClient()
+        bloom = get_ioc_bloom_index()
+        
+        if bloom.rebuild_due:
+            bloom.rebuild_in_background(sync_es_client)
+        
+        # IOCs are stored under the normalized type (ipv4 -> ip, sha256 -> hash, ...)
+        ioc_type = BaseCollector._normalize_type(request.ioc_type) if request.ioc_type else None
+        
+        # The ioc_id (and so the filter) needs the type; untyped lookups always search
+        if ioc_type:
+            ioc_id = BaseCollector._ioc_id(ioc_type, request.ioc_value)
+            if not bloom.might_contain(ioc_id):
+                return []
         
         # Search for IOC
-        results = es_client.search_ioc(
+        results = await es_client.search_ioc(
             ioc_value=request.ioc_value,
-            ioc_type=request.ioc_type
+            ioc_type=ioc_type
         )
         
+        if ioc_type:
+            bloom.record_lookup(found=bool(results))
+        
         if not results:
             return []
         
@@ -70,44 +97,112 @@ async def check_ioc(request: IOCLookupRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ioc/check/batch")
+async def check_iocs(request: IOCBatchLookupRequest,
+                     es_client: AsyncElasticsearchClient = Depends(get_async_es_client),
+                     sync_es_client: ElasticsearchClient = Depends(get_es_client)):
+    """
+    Check many IOCs in one call.
+    
+    Typed indicators the membership filter rules out are answered without
+    querying Elasticsearch; the rest are resolved in chunked ``_mget`` /
+    ``msearch`` requests. IOCs indexed by other processes reach the filter
+    with its next rebuild (IOC_BLOOM_REBUILD_SECONDS); an older filter is
+    not used.
+    
+    Args:
+        request: Indicators to check (up to 50,000)
+        es_client: Shared async Elasticsearch client
+        sync_es_client: Shared Elasticsearch client (for filter rebuilds)
+        
+    Returns:
+        One result per indicator, in request order, and summary counts
+    """
+    try:
+        bloom = get_ioc_bloom_index()
+        
+        if bloom.rebuild_due:
+            bloom.rebuild_in_background(sync_es_client)
+        
+        indicators = [i.model_dump() for i in request.indicators]
+        
+        to_lookup = []
+        for n, indicator in enumerate(indicators):
+            if indicator['ioc_type']:
+                ioc_id = BaseCollector._ioc_id(BaseCollector._normalize_type(indicator['ioc_type']),
+                                               indicator['ioc_value'])
+                if not bloom.might_contain(ioc_id):
+                    continue
+            to_lookup.append(n)
+        
+        looked_up = await es_client.lookup_many([indicators[n] for n in to_lookup])
+        
+        results = [
+            {'ioc_value': i['ioc_value'], 'ioc_type': i['ioc_type'], 'found': False, 'matches': []}
+            for i in indicators
+        ]
+        for n, result in zip(to_lookup, looked_up):
+            results[n] = result
+            if indicators[n]['ioc_type']:
+                bloom.record_lookup(found=result['found'])
+        
+        return {
+            "results": results,
+            "checked": len(results),
+            "found": sum(1 for r in results if r['found']),
+            "skipped_by_filter": len(results) - len(to_lookup)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error checking IOCs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/ioc/search")
 async def search_iocs(
     query: str = Query(..., description="Search query"),
     ioc_type: Optional[str] = Query(None, description="Filter by IOC type"),
     min_confidence: float = Query(0.0, description="Minimum confidence score"),
-    limit: int = Query(100, description="Maximum results")
+    limit: int = Query(100, ge=1, le=10000, description="Maximum results per page"),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch (from next_cursor)"),
+    paginate: bool = Query(False, description="Return a next_cursor to page through all results"),
+    es_client: AsyncElasticsearchClient = Depends(get_async_es_client)
 ):
     """
     Search IOCs by query.
     
+    Matches IOC values exactly, by substring and by domain suffix, and
+    descriptions by full text, best matches first. Each result carries the
+    matching fragments under ``highlight``.
+    
     Args:
         query: Search query string
         ioc_type: Optional IOC type filter
         min_confidence: Minimum confidence score
-        limit: Maximum results
+        limit: Maximum results per page
+        cursor: Cursor returned as ``next_cursor`` by the previous page
+        paginate: Return a ``next_cursor`` (only then is a point-in-time opened)
+        es_client: Shared async Elasticsearch client
         
     Returns:
-        List of matching IOC records
+        Page of matching IOC records and the cursor of the next page (None on the last page)
     """
     try:
-        es_client = ElasticsearchClient()
-        
-        # Search threats (simplified - would use full-text search in production)
-        results = es_client.search_threats(
-            threat_type=ioc_type,
+        results, next_cursor = await es_client.search_text_page(
+            query,
+            ioc_type=ioc_type,
             min_confidence=min_confidence,
-            limit=limit
+            page_size=limit,
+            cursor=cursor,
+            paginate=paginate
         )
         
-        # Filter by query (simplified)
-        filtered = [
-            result for result in results
-            if query.lower() in str(result.get('ioc_value', '')).lower() or
-               query.lower() in str(result.get('description', '')).lower()
-        ]
-        
-        return filtered[:limit]
-        
+        return {"results": results, "count": len(results), "next_cursor": next_cursor}
+    
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching IOCs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,33 +211,47 @@ async def search_iocs(
 @router.post("/ioc/collect")
 async def collect_iocs(
     limit_per_source: int = Query(100, description="IOCs per source to collect"),
-    background_tasks: BackgroundTasks = None
+    incremental: bool = Query(True, description="Only fetch changes since the last collection"),
+    background_tasks: BackgroundTasks = None,
+    es_client: ElasticsearchClient = Depends(get_es_client)
 ):
     """
     Trigger IOC collection from all sources.
     
     Args:
         limit_per_source: Maximum IOCs per source
+        incremental: Resume each feed from its stored watermark
         background_tasks: Background tasks for async processing
+        es_client: Shared Elasticsearch client
         
     Returns:
         Collection status
     """
     try:
         orchestrator = IOCOrchestrator()
-        es_client = ElasticsearchClient()
         
         # Collect IOCs (async in background)
         def collect_and_index():
             try:
-                iocs = orchestrator.collect_all(limit_per_source=limit_per_source)
-                
-                # Index in Elasticsearch
-                es_client.bulk_index(iocs)
+                # Stream IOCs straight into Elasticsearch
+                iocs = orchestrator.iter_all(limit_per_source=limit_per_source,
+                                             incremental=incremental)
+                result = es_client.stream_index(get_ioc_bloom_index().track(iocs))
                 
-                logger.info(f"Collected and indexed {len(iocs)} IOCs")
+                logger.info(f"Collected and indexed {result['indexed']} IOCs")
+                # Only move the feeds forward once everything they returned is indexed
+                if result['error']:
+                    logger.warning(f"Indexing stopped early ({result['error']}); watermarks not advanced")
+                elif result['failed']:
+                    logger.warning(f"{result['failed']} IOCs failed to index; watermarks not advanced")
+                else:
+                    orchestrator.commit()
+                for source, report in orchestrator.source_reports.items():
+                    logger.info(f"Source {source}: {report}")
             except Exception as e:
                 logger.error(f"Error in background collection: {e}")
+            finally:
+                orchestrator.close()
         
         if background_tasks:
             background_tasks.add_task(collect_and_index)
@@ -156,3 +265,38 @@ async def collect_iocs(
         logger.error(f"Error starting IOC collection: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/ioc/filter/stats")
+async def get_filter_stats():
+    """
+    Get statistics of the IOC membership filter.
+    
+    Returns:
+        Filter size, estimated false-positive rate and backend round-trips avoided
+    """
+    return get_ioc_bloom_index().stats()
+
+
+@router.post("/ioc/filter/rebuild")
+async def rebuild_filter(es_client: ElasticsearchClient = Depends(get_es_client)):
+    """
+    Rebuild the IOC membership filter from Elasticsearch in the background.
+    
+    Args:
+        es_client: Shared Elasticsearch client
+        
+    Returns:
+        Rebuild status
+    """
+    try:
+        started = get_ioc_bloom_index().rebuild_in_background(es_client)
+        
+        return {
+            "status": "started" if started else "already_running",
+            "message": "IOC filter rebuild started" if started else "IOC filter rebuild already in progress"
+        }
+    
+    except Exception as e:
+        logger.error(f"Error starting IOC filter rebuild: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
@@ -1,10 +1,13 @@
 """Threat network graph endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import List, Dict, Optional
 import logging
 
-from ...utils.neo4j_graph import Neo4jClient
+from ...utils.neo4j_async import AsyncNeo4jClient
+from ...utils.neo4j_graph import relationship_pattern
+from ...utils.graph_cache import CompactGraph, graph_key, get_graph_cache
+from ..dependencies import get_neo4j_client
 
 logger = logging.getLogger(__name__)
 
@@ -14,65 +17,62 @@ router = APIRouter()
 @router.get("/network")
 async def get_threat_network(
     actor_name: Optional[str] = Query(None, description="Starting actor name"),
-    depth: int = Query(2, description="Graph depth to traverse")
+    depth: int = Query(2, ge=1, le=6, description="Graph depth to traverse"),
+    relationship_types: Optional[List[str]] = Query(None, description="Relationship types to follow (e.g. USES)"),
+    fanout: Optional[int] = Query(None, ge=1, le=1000, description="Neighbours expanded per node per hop"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of nodes"),
+    use_apoc: bool = Query(False, description="Use APOC subgraphAll for the traversal"),
+    request: Request = None,
+    response: Response = None,
+    neo4j: AsyncNeo4jClient = Depends(get_neo4j_client)
 ):
     """
     Get threat actor network graph.
     
+    Views are served from the process-wide graph cache and carry an ETag;
+    a matching If-None-Match gets 304 Not Modified.
+    
     Args:
         actor_name: Optional starting actor name
         depth: Graph depth to traverse
+        relationship_types: Relationship types to follow (all types if omitted)
+        fanout: Neighbours expanded per node per hop
+        limit: Maximum number of nodes
+        use_apoc: Use APOC subgraphAll for the traversal
+        request: Incoming request (for If-None-Match)
+        response: Outgoing response (for ETag)
+        neo4j: Shared async Neo4j client
         
     Returns:
-        Network graph with nodes and relationships
+        Network graph with distinct nodes and edges
     """
     try:
-        neo4j = Neo4jClient()
-        
-        # Get network
-        network = neo4j.get_threat_network(actor_name=actor_name, depth=depth)
-        
-        # Format for visualization
-        nodes = []
-        edges = []
-        node_ids = set()
-        
-        for path in network:
-            for node in path.get('nodes', []):
-                node_id = node.get('ioc_id') or node.get('name') or str(hash(str(node)))
-                if node_id not in node_ids:
-                    nodes.append({
-                        "id": node_id,
-                        "label": node.get('ioc_value') or node.get('name') or node_id,
-                        "type": node.get('ioc_type') or node.get('label') or 'unknown',
-                        "data": node
-                    })
-                    node_ids.add(node_id)
-            
-            for rel in path.get('relationships', []):
-                # Extract source and target from relationship
-                source = str(rel.get('start_node_id', ''))
-                target = str(rel.get('end_node_id', ''))
-                
-                if source and target:
-                    edges.append({
-                        "source": source,
-                        "target": target,
-                        "type": rel.get('type', 'RELATED'),
-                        "data": dict(rel)
-                    })
+        relationship_pattern(relationship_types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        cache = get_graph_cache()
+        key = graph_key(actor_name, depth, relationship_types, fanout, limit, use_apoc)
+        graph = cache.get(key)
         
-        neo4j.close()
+        if graph is None:
+            generation = cache.generation
+            subgraph = await neo4j.get_threat_subgraph(**key._asdict())
+            graph = CompactGraph.from_subgraph(subgraph)
+            # Empty results may come from a failed query, so they are not cached
+            if graph.node_ids:
+                cache.put(key, graph, generation)
         
-        return {
-            "nodes": nodes,
-            "edges": edges,
-            "stats": {
-                "num_nodes": len(nodes),
-                "num_edges": len(edges)
-            }
-        }
+        headers = {"ETag": graph.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "") if request else ""
+        if graph.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
         
+        response.headers.update(headers)
+        return graph.to_payload()
+    
     except Exception as e:
         logger.error(f"Error getting threat network: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
@@ -1,10 +1,12 @@
 """Threats endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Optional
 import logging
 
-from ...utils.elastic import ElasticsearchClient
+from ...utils.elastic import CursorExpiredError, STATS_INTERVALS
+from ...utils.elastic_async import AsyncElasticsearchClient
+from ..dependencies import get_async_es_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +17,10 @@ router = APIRouter()
 async def get_threats(
     threat_type: Optional[str] = Query(None, description="Filter by threat type"),
     min_confidence: float = Query(0.7, description="Minimum confidence score"),
-    limit: int = Query(100, description="Maximum results")
+    limit: int = Query(100, ge=1, le=10000, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch (from next_cursor)"),
+    paginate: bool = Query(False, description="Return a next_cursor to page through all results"),
+    es_client: AsyncElasticsearchClient = Depends(get_async_es_client)
 ):
     """
     Get active threats.
@@ -23,49 +28,44 @@ async def get_threats(
     Args:
         threat_type: Optional threat type filter
         min_confidence: Minimum confidence score
-        limit: Maximum results
+        limit: Results per page
+        cursor: Cursor returned as ``next_cursor`` by the previous page
+        paginate: Return a ``next_cursor`` (only then is a point-in-time opened)
+        es_client: Shared async Elasticsearch client
         
     Returns:
-        List of threat IOC dictionaries
+        Page of threat IOC dictionaries and the cursor of the next page (None on the last page)
     """
     try:
-        es_client = ElasticsearchClient()
-        threats = es_client.search_threats(
+        threats, next_cursor = await es_client.search_threats_page(
             threat_type=threat_type,
             min_confidence=min_confidence,
-            limit=limit
+            page_size=limit,
+            cursor=cursor,
+            paginate=paginate
         )
-        return {"threats": threats, "count": len(threats)}
+        return {"threats": threats, "count": len(threats), "next_cursor": next_cursor}
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting threats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/threats/stats")
-async def get_threat_stats():
-    """Get threat statistics."""
+async def get_threat_stats(
+    min_confidence: float = Query(0.8, description="Minimum confidence score"),
+    interval: str = Query("day", pattern=f"^({'|'.join(STATS_INTERVALS)})$",
+                          description="First-seen histogram interval (minute, hour, day, week, month, quarter, year)"),
+    es_client: AsyncElasticsearchClient = Depends(get_async_es_client)
+):
+    """Get threat statistics (aggregated by Elasticsearch over all matching IOCs)."""
     try:
-        es_client = ElasticsearchClient()
-        
-        # Get all high-confidence threats
-        high_confidence = es_client.search_threats(min_confidence=0.8, limit=1000)
-        
-        # Count by threat type
-        threat_types = {}
-        sources = {}
-        
-        for threat in high_confidence:
-            threat_type = threat.get('threat_type', 'unknown')
-            source = threat.get('source', 'unknown')
-            
-            threat_types[threat_type] = threat_types.get(threat_type, 0) + 1
-            sources[source] = sources.get(source, 0) + 1
-        
-        return {
-            "total_threats": len(high_confidence),
-            "by_threat_type": threat_types,
-            "by_source": sources
-        }
+        return await es_client.threat_stats(min_confidence=min_confidence, interval=interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting threat stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,19 @@
 """IOC timeline endpoints"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import logging
 
 # Optional imports - allow server to start without networkx
 try:
-    from ...utils.elastic import ElasticsearchClient
+    from ...utils.elastic import CursorExpiredError
+    from ...utils.elastic_async import AsyncElasticsearchClient
     ELASTICSEARCH_AVAILABLE = True
 except ImportError:
     ELASTICSEARCH_AVAILABLE = False
-    ElasticsearchClient = None
+    AsyncElasticsearchClient = None
+    CursorExpiredError = None
 
 try:
     from ...models.correlation_engine import ThreatCorrelationEngine
@@ -20,6 +22,8 @@ except ImportError:
     CORRELATION_ENGINE_AVAILABLE = False
     ThreatCorrelationEngine = None
 
+from ..dependencies import get_async_es_client
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -29,7 +33,11 @@ router = APIRouter()
 async def get_ioc_timeline(
     hours: int = Query(24, description="Hours to look back"),
     threat_type: Optional[str] = Query(None, description="Filter by threat type"),
-    min_confidence: float = Query(0.7, description="Minimum confidence score")
+    min_confidence: float = Query(0.7, description="Minimum confidence score"),
+    limit: int = Query(1000, ge=1, le=10000, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch (from next_cursor)"),
+    paginate: bool = Query(False, description="Return a next_cursor to page through all results"),
+    es_client: "AsyncElasticsearchClient" = Depends(get_async_es_client)
 ):
     """
     Get IOC timeline.
@@ -38,55 +46,56 @@ async def get_ioc_timeline(
         hours: Hours to look back
         threat_type: Optional threat type filter
         min_confidence: Minimum confidence score
+        limit: Results per page
+        cursor: Cursor returned as ``next_cursor`` by the previous page
+        paginate: Return a ``next_cursor`` (only then is a point-in-time opened)
+        es_client: Shared async Elasticsearch client
         
     Returns:
-        Timeline of IOCs sorted by time
+        Page of the timeline of IOCs sorted by time, and the cursor of the next page
     """
     if not ELASTICSEARCH_AVAILABLE:
         raise HTTPException(status_code=503, detail="Elasticsearch not available")
     
     try:
-        es_client = ElasticsearchClient()
-        
-        # Get threats
-        threats = es_client.search_threats(
+        # Only the partitions overlapping the window are searched
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        filtered_timeline, next_cursor = await es_client.search_by_time_range_page(
+            start_time,
+            end_time,
+            page_size=limit,
+            cursor=cursor,
             threat_type=threat_type,
             min_confidence=min_confidence,
-            limit=1000
-        )
-        
-        # Sort by first_seen
-        timeline = sorted(
-            threats,
-            key=lambda x: x.get('first_seen', ''),
-            reverse=True
+            paginate=paginate
         )
         
-        # Filter by time window
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        filtered_timeline = [
-            ioc for ioc in timeline
-            if datetime.fromisoformat(ioc.get('first_seen', '').replace('Z', '+00:00')) >= cutoff_time
-        ]
-        
         return {
             "timeline": filtered_timeline,
             "count": len(filtered_timeline),
-            "hours": hours
+            "hours": hours,
+            "next_cursor": next_cursor
         }
-        
+    
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting timeline: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/timeline/campaign/{campaign_id}")
-async def get_campaign_timeline(campaign_id: str):
+async def get_campaign_timeline(campaign_id: str,
+                                es_client: "AsyncElasticsearchClient" = Depends(get_async_es_client)):
     """
     Get timeline for a specific campaign.
     
     Args:
         campaign_id: Campaign identifier
+        es_client: Shared async Elasticsearch client
         
     Returns:
         Timeline of IOCs in campaign
@@ -95,11 +104,10 @@ async def get_campaign_timeline(campaign_id: str):
         raise HTTPException(status_code=503, detail="Required dependencies not available")
     
     try:
-        es_client = ElasticsearchClient()
         correlation_engine = ThreatCorrelationEngine()
         
         # Get all threats
-        iocs = es_client.search_threats(min_confidence=0.7, limit=1000)
+        iocs = await es_client.search_threats(min_confidence=0.7, limit=1000)
         
         # Get campaign timeline
         timeline = correlation_engine.get_campaign_timeline(campaign_id, iocs)
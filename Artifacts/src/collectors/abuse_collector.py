@@ -2,10 +2,12 @@
 
 import os
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from datetime import datetime
 import logging
 
+from .http_cache import configure_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,7 +18,7 @@ class AbuseCollector:
         """Initialize Abuse.ch collector."""
         self.malwarebazaar_url = 'https://mb-api.abuse.ch/api/v1'
         self.urlhaus_url = 'https://urlhaus-api.abuse.ch/v1'
-        self.session = requests.Session()
+        self.session = configure_session(requests.Session(), 'abuse_ch')
     
     def collect_malwarebazaar(self, limit: int = 100) -> List[Dict]:
         """
@@ -28,8 +30,21 @@ class AbuseCollector:
         Returns:
             List of normalized IOC dictionaries
         """
-        iocs = []
+        iocs = list(self.iter_malwarebazaar(limit=limit))
         
+        logger.info(f"Collected {len(iocs)} IOCs from MalwareBazaar")
+        return iocs
+    
+    def iter_malwarebazaar(self, limit: int = 100) -> Iterator[Dict]:
+        """
+        Yield malware sample IOCs from MalwareBazaar one at a time.
+        
+        Args:
+            limit: Maximum number of samples to retrieve
+            
+        Yields:
+            Raw IOC dictionaries
+        """
         try:
             # Get recent samples
             url = f"{self.malwarebazaar_url}/get"
@@ -66,7 +81,7 @@ class AbuseCollector:
                             'sha1': sha1
                         }
                     }
-                    iocs.append(ioc)
+                    yield ioc
                 
                 # Also add MD5 and SHA1 as separate IOCs
                 for hash_value, hash_type in [(md5, 'md5'), (sha1, 'sha1')]:
@@ -80,13 +95,10 @@ class AbuseCollector:
                             'confidence': 0.95,
                             'related_hashes': {'sha256': sha256}
                         }
-                        iocs.append(ioc)
-                        
+                        yield ioc
+        
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching MalwareBazaar data: {e}")
-        
-        logger.info(f"Collected {len(iocs)} IOCs from MalwareBazaar")
-        return iocs
     
     def collect_urlhaus(self, limit: int = 100) -> List[Dict]:
         """
@@ -98,8 +110,21 @@ class AbuseCollector:
         Returns:
             List of normalized IOC dictionaries
         """
-        iocs = []
+        iocs = list(self.iter_urlhaus(limit=limit))
+        
+        logger.info(f"Collected {len(iocs)} IOCs from URLhaus")
+        return iocs
+    
+    def iter_urlhaus(self, limit: int = 100) -> Iterator[Dict]:
+        """
+        Yield malicious URL IOCs from URLhaus one at a time.
         
+        Args:
+            limit: Maximum number of URLs to retrieve
+            
+        Yields:
+            Raw IOC dictionaries
+        """
         try:
             # Get recent URLs
             url = f"{self.urlhaus_url}/urls/recent/limit/{limit}/"
@@ -134,7 +159,7 @@ class AbuseCollector:
                     'threat': url_entry.get('threat', ''),
                     'related_domain': domain
                 }
-                iocs.append(url_ioc)
+                yield url_ioc
                 
                 # Also add domain as separate IOC if it's different
                 if domain and domain not in url_value:
@@ -147,13 +172,10 @@ class AbuseCollector:
                         'confidence': 0.85,
                         'related_urls': [url_value]
                     }
-                    iocs.append(domain_ioc)
-                    
+                    yield domain_ioc
+        
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching URLhaus data: {e}")
-        
-        logger.info(f"Collected {len(iocs)} IOCs from URLhaus")
-        return iocs
     
     def collect_all(self, limit: int = 100) -> List[Dict]:
         """
@@ -177,4 +199,17 @@ class AbuseCollector:
         
         logger.info(f"Collected total {len(all_iocs)} IOCs from Abuse.ch")
         return all_iocs
+    
+    def iter_all(self, limit: int = 100) -> Iterator[Dict]:
+        """
+        Yield IOCs from all Abuse.ch feeds one at a time.
+        
+        Args:
+            limit: Maximum number of IOCs per feed
+            
+        Yields:
+            Raw IOC dictionaries
+        """
+        yield from self.iter_malwarebazaar(limit=limit)
+        yield from self.iter_urlhaus(limit=limit)
 
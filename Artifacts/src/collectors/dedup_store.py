@@ -0,0 +1,105 @@
+"""Persistent IOC deduplication index shared across collection runs"""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEDUP_DB = os.path.join('data', 'state', 'dedup.sqlite3')
+
+
+class DedupStore:
+    """SQLite index of merged IOC records keyed by ioc_id"""
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize dedup store.
+        
+        Args:
+            path: Database file (defaults to IOC_DEDUP_DB env var or data/state/dedup.sqlite3);
+                ':memory:' keeps the index for the lifetime of the object only
+        """
+        self.path = path or os.getenv('IOC_DEDUP_DB', DEFAULT_DEDUP_DB)
+        
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS iocs ('
+            ' ioc_id TEXT PRIMARY KEY,'
+            ' record TEXT NOT NULL,'
+            " updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+            ') WITHOUT ROWID'
+        )
+        self._conn.commit()
+    
+    def get_many(self, ioc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up merged records by ID.
+        
+        Args:
+            ioc_ids: IOC IDs to look up
+            
+        Returns:
+            Dictionary of ioc_id to stored record (missing IDs are omitted)
+        """
+        ids = list(dict.fromkeys(ioc_ids))
+        found = {}
+        
+        with self._lock:
+            # Stay well under SQLite's bound parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT ioc_id, record FROM iocs WHERE ioc_id IN ({placeholders})', chunk
+                ).fetchall()
+                for ioc_id, record in rows:
+                    found[ioc_id] = json.loads(record)
+        
+        return found
+    
+    def put_many(self, records: Iterable[Dict[str, Any]]):
+        """
+        Insert or replace merged records in one transaction.
+        
+        Args:
+            records: Merged IOC dictionaries (must have ``ioc_id``)
+        """
+        rows = [(record['ioc_id'], json.dumps(record, default=str)) for record in records]
+        if not rows:
+            return
+        
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO iocs (ioc_id, record) VALUES (?, ?) "
+                    "ON CONFLICT(ioc_id) DO UPDATE SET record = excluded.record, "
+                    "updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')",
+                    rows
+                )
+    
+    def count(self) -> int:
+        """Number of IOCs in the index."""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM iocs').fetchone()[0]
+    
+    def clear(self):
+        """Forget every IOC so the next run emits everything again."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM iocs')
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
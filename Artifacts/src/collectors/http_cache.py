@@ -0,0 +1,342 @@
+"""Shared HTTP layer for threat feed collectors with an on-disk response cache"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Dict, Optional, Any
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'http')
+
+# Seconds a cached response is served without contacting the feed. Once
+# stale, it is revalidated with its ETag/Last-Modified before being reused.
+DEFAULT_TTLS = {
+    'otx': 300,
+    'abuse_ch': 300,
+    'phishtank': 3600,  # The online-valid dump is regenerated hourly
+    'nvd': 900
+}
+
+# Feed queries are reads, including MalwareBazaar's form POSTs
+CACHEABLE_METHODS = ('GET', 'POST')
+
+# Response headers that no longer apply once the body is stored decoded
+_DROPPED_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection')
+
+
+class ResponseCache:
+    """On-disk store of response bodies and validators, keyed by method, URL and body"""
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize response cache.
+        
+        Args:
+            cache_dir: Cache directory (defaults to HTTP_CACHE_DIR env var or data/cache/http)
+        """
+        self.cache_dir = cache_dir or os.getenv('HTTP_CACHE_DIR', DEFAULT_CACHE_DIR)
+    
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> str:
+        """Cache key for a prepared request (query parameters are part of the URL)."""
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha256(f"{request.method} {request.url}\n".encode('utf-8'))
+        digest.update(body)
+        return digest.hexdigest()
+    
+    def _paths(self, key: str):
+        return (os.path.join(self.cache_dir, f"{key}.json"),
+                os.path.join(self.cache_dir, f"{key}.body"))
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of a cached response.
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            Metadata dictionary with ``body_path`` set, or None if not cached
+        """
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if not os.path.exists(body_path):
+            return None
+        
+        meta['body_path'] = body_path
+        return meta
+    
+    def touch(self, key: str, meta: Dict[str, Any]):
+        """Mark a cached response as fresh again after a 304 revalidation."""
+        meta = {k: v for k, v in meta.items() if k != 'body_path'}
+        meta['stored_at'] = time.time()
+        self._write_meta(key, meta)
+    
+    def open_writer(self, key: str, meta: Dict[str, Any]) -> Optional['_BodyWriter']:
+        """
+        Start writing a response body to the cache.
+        
+        Args:
+            key: Cache key
+            meta: Response metadata stored once the body is complete
+            
+        Returns:
+            Body writer, or None if the cache directory is not writable
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        except OSError as e:
+            logger.warning(f"HTTP cache disabled for this response: {e}")
+            return None
+        return _BodyWriter(self, key, meta, os.fdopen(fd, 'wb'), tmp_path)
+    
+    def _store(self, key: str, meta: Dict[str, Any], tmp_path: str):
+        """Move a completed body into place and write its metadata."""
+        _, body_path = self._paths(key)
+        try:
+            os.replace(tmp_path, body_path)
+            self._write_meta(key, meta)
+        except OSError as e:
+            logger.warning(f"Error storing HTTP cache entry: {e}")
+    
+    def _write_meta(self, key: str, meta: Dict[str, Any]):
+        meta_path, _ = self._paths(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    
+    def clear(self):
+        """Remove every cached response."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.json', '.body', '.part')):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+
+class _BodyWriter:
+    """Temporary cache file that is only published once the whole body was written"""
+    
+    def __init__(self, cache: ResponseCache, key: str, meta: Dict[str, Any], file, tmp_path: str):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.file = file
+        self.tmp_path = tmp_path
+    
+    def write(self, data: bytes):
+        if self.file is not None and data:
+            self.file.write(data)
+    
+    def commit(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        self.cache._store(self.key, self.meta, self.tmp_path)
+    
+    def discard(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class _TeeBody:
+    """Wrap a urllib3 response so the decoded body is copied to the cache as it is read"""
+    
+    def __init__(self, raw, writer: _BodyWriter):
+        self._raw = raw
+        self._writer = writer
+    
+    def stream(self, amt: int = 2 ** 16, decode_content: bool = True):
+        for chunk in self._raw.stream(amt, decode_content=True):
+            self._writer.write(chunk)
+            yield chunk
+        self._writer.commit()
+    
+    def read(self, amt: Optional[int] = None, decode_content: bool = True, **kwargs) -> bytes:
+        data = self._raw.read(amt, decode_content=True, **kwargs)
+        self._writer.write(data)
+        if not data or amt is None:
+            self._writer.commit()
+        return data
+    
+    def close(self):
+        # A body closed before it was read to the end is never cached
+        self._writer.discard()
+        self._raw.close()
+    
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class _CachedBody:
+    """File-backed stand-in for a urllib3 response body"""
+    
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+    
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        if self._file is None:
+            return b''
+        data = self._file.read() if amt is None else self._file.read(amt)
+        if not data or amt is None:
+            self.close()
+        return data
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def release_conn(self):
+        self.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that serves fresh responses from disk and revalidates stale ones"""
+    
+    def __init__(self,
+                 cache: Optional[ResponseCache] = None,
+                 ttl: float = 300,
+                 **kwargs):
+        """
+        Initialize caching adapter.
+        
+        Args:
+            cache: Response cache (None disables caching)
+            ttl: Seconds a cached response is reused without revalidation
+            **kwargs: Passed to HTTPAdapter (pool_connections, pool_maxsize, max_retries)
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttl = ttl
+    
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if self.cache is None or request.method not in CACHEABLE_METHODS:
+            return super().send(request, **kwargs)
+        
+        key = self.cache.key(request)
+        entry = self.cache.get(key)
+        
+        if entry and time.time() - entry.get('stored_at', 0) < self.ttl:
+            return self._cached_response(request, entry)
+        
+        if entry:
+            if entry.get('etag'):
+                request.headers.setdefault('If-None-Match', entry['etag'])
+            if entry.get('last_modified'):
+                request.headers.setdefault('If-Modified-Since', entry['last_modified'])
+        
+        response = super().send(request, **kwargs)
+        
+        if response.status_code == 304 and entry:
+            response.close()
+            self.cache.touch(key, entry)
+            logger.debug(f"Revalidated cached response for {request.url}")
+            return self._cached_response(request, entry)
+        
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if response.status_code == 200 and 'no-store' not in cache_control:
+            meta = {
+                'url': request.url,
+                'method': request.method,
+                'headers': {k: v for k, v in response.headers.items() if k not in _DROPPED_HEADERS},
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'stored_at': time.time()
+            }
+            writer = self.cache.open_writer(key, meta)
+            if writer is not None:
+                response.raw = _TeeBody(response.raw, writer)
+        
+        return response
+    
+    def _cached_response(self, request: requests.PreparedRequest, entry: Dict[str, Any]) -> requests.Response:
+        """Build a response whose body streams from the cached file."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _CachedBody(entry['body_path'])
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+def configure_session(session: requests.Session,
+                      feed: str,
+                      ttl: Optional[float] = None,
+                      cache_dir: Optional[str] = None,
+                      pool_maxsize: int = 10) -> requests.Session:
+    """
+    Mount the shared caching transport on a collector's session.
+    
+    Caching can be turned off with HTTP_CACHE_ENABLED=false, and a feed's TTL
+    overridden with HTTP_CACHE_TTL_<FEED> (e.g. HTTP_CACHE_TTL_PHISHTANK=600).
+    
+    Args:
+        session: Session to configure
+        feed: Feed name used to pick the TTL
+        ttl: Seconds a cached response is reused without revalidation
+        cache_dir: Cache directory (defaults to HTTP_CACHE_DIR env var or data/cache/http)
+        pool_maxsize: Connections kept open per host
+        
+    Returns:
+        The configured session
+    """
+    enabled = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+    if ttl is None:
+        ttl = float(os.getenv(f"HTTP_CACHE_TTL_{feed.upper()}", DEFAULT_TTLS.get(feed, 300)))
+    
+    adapter = CachingAdapter(cache=ResponseCache(cache_dir) if enabled else None,
+                             ttl=ttl,
+                             pool_connections=4,
+                             pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    # urllib3 decodes brotli transparently when the brotli package is installed
+    encodings = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+    session.headers.update({'Accept-Encoding': encodings})
+    return session
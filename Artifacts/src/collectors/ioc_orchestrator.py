@@ -1,80 +1,313 @@
 """Orchestrator for collecting IOCs from all sources"""
 
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
+import os
+import queue
+import threading
+import time
 
 from .otx_collector import OTXCollector
 from .abuse_collector import AbuseCollector
 from .phishtank_collector import PhishTankCollector
 from .nvd_collector import NVDCollector
 from .base_collector import BaseCollector, IOCDeduplicator
+from .watermarks import WatermarkStore
+from .dedup_store import DedupStore
 
 logger = logging.getLogger(__name__)
 
+# Queue marker sent by a source worker when it has finished
+_DONE = object()
+
+# Source names in the order their results are merged
+SOURCES = ('otx', 'abuse_ch', 'phishtank', 'nvd')
+
 
 class IOCOrchestrator:
     """Orchestrate IOC collection from all sources"""
     
-    def __init__(self):
-        """Initialize IOC orchestrator with all collectors."""
+    def __init__(self,
+                 max_workers: int = 4,
+                 source_timeout: Optional[float] = 300.0,
+                 queue_size: int = 1000,
+                 watermarks: Optional[WatermarkStore] = None,
+                 dedup_store: Optional[DedupStore] = None):
+        """
+        Initialize IOC orchestrator with all collectors.
+        
+        Args:
+            max_workers: Maximum number of sources collected in parallel
+            source_timeout: Seconds to wait for a single source before giving up on it
+                (None waits indefinitely)
+            queue_size: Maximum number of normalized IOCs buffered between the
+                source workers and the consumer
+            watermarks: Watermark store used by incremental runs (defaults to the
+                JSON state file configured by IOC_WATERMARK_FILE)
+            dedup_store: Persistent dedup index, so each run only returns IOCs that
+                are new or changed since earlier runs (defaults to the SQLite file
+                configured by IOC_DEDUP_DB, or no index if it is unset)
+        """
         self.otx = OTXCollector()
         self.abuse = AbuseCollector()
         self.phishtank = PhishTankCollector()
         self.nvd = NVDCollector()
         self.base_collector = BaseCollector()
-        self.deduplicator = IOCDeduplicator()
+        # A store opened here is closed by close(); a store passed in belongs to the caller
+        self._owned_store = None
+        if dedup_store is None and os.getenv('IOC_DEDUP_DB'):
+            dedup_store = self._owned_store = DedupStore()
+        self.deduplicator = IOCDeduplicator(store=dedup_store)
+        self.max_workers = max_workers
+        self.source_timeout = source_timeout
+        self.queue_size = queue_size
+        self.watermarks = watermarks
+        self.source_reports: Dict[str, Dict] = {}
+        self._cursors: Dict[str, Dict] = {}
+        # Watermarks of finished sources, written by commit() once the IOCs are indexed
+        self._pending_watermarks: Dict[str, Tuple[Dict, datetime, int]] = {}
     
-    def collect_all(self, limit_per_source: int = 100) -> List[Dict]:
+    def _source_tasks(self,
+                      limit_per_source: int,
+                      incremental: bool = False,
+                      days: int = 7) -> Dict[str, Callable[[], Iterator[Dict]]]:
         """
-        Collect IOCs from all sources.
+        Build the raw IOC generator factory for every source, keyed by source name.
         
-        Args:
-            limit_per_source: Maximum IOCs per source
-            
-        Returns:
-            List of normalized and deduplicated IOC dictionaries
+        For incremental runs, OTX and NVD resume from their stored watermark and
+        only fetch what changed since then. The cursors they fill in are kept in
+        ``self._cursors`` until the source finishes.
         """
-        all_iocs = []
+        self._cursors = {}
+        self._pending_watermarks = {}
+        otx_since = None
+        nvd_since = None
         
-        # Collect from OTX
-        try:
-            logger.info("Collecting IOCs from OTX...")
-            otx_iocs = self.otx.collect_all(limit=limit_per_source)
-            normalized_otx = [self.base_collector.normalize_ioc(ioc) for ioc in otx_iocs]
-            all_iocs.extend(normalized_otx)
-            logger.info(f"Collected {len(normalized_otx)} IOCs from OTX")
-        except Exception as e:
-            logger.error(f"Error collecting from OTX: {e}")
+        if incremental:
+            if self.watermarks is None:
+                self.watermarks = WatermarkStore()
+            
+            for name in ('otx', 'nvd'):
+                stored = self.watermarks.get(name)
+                self._cursors[name] = {
+                    'page': stored.get('page'),
+                    'modified_since': self.watermarks.get_since(name)
+                }
+            
+            otx_since = self._cursors['otx']['modified_since']
+            # First NVD run covers the same window as a full refresh
+            nvd_since = (self._cursors['nvd']['modified_since'] or
+                         datetime.utcnow() - timedelta(days=days))
+            self._cursors['nvd']['modified_since'] = nvd_since
         
-        # Collect from Abuse.ch
-        try:
-            logger.info("Collecting IOCs from Abuse.ch...")
-            abuse_iocs = self.abuse.collect_all(limit=limit_per_source)
-            normalized_abuse = [self.base_collector.normalize_ioc(ioc) for ioc in abuse_iocs]
-            all_iocs.extend(normalized_abuse)
-            logger.info(f"Collected {len(normalized_abuse)} IOCs from Abuse.ch")
-        except Exception as e:
-            logger.error(f"Error collecting from Abuse.ch: {e}")
+        return {
+            'otx': lambda: self.otx.iter_all(limit=limit_per_source,
+                                             modified_since=otx_since,
+                                             cursor=self._cursors.get('otx')),
+            'abuse_ch': lambda: self.abuse.iter_all(limit=limit_per_source),
+            'phishtank': lambda: self.phishtank.iter_all(limit=limit_per_source),
+            'nvd': lambda: self.nvd.iter_all(days=days,
+                                             limit=limit_per_source,
+                                             modified_since=nvd_since,
+                                             cursor=self._cursors.get('nvd')),
+        }
+    
+    def _run_source(self,
+                    name: str,
+                    task: Callable[[], Iterator[Dict]],
+                    out: queue.Queue,
+                    started: Dict[str, float],
+                    stop: threading.Event,
+                    cancelled: set):
+        """Stream normalized IOCs from a single source into the shared queue."""
+        started[name] = time.monotonic()
+        logger.info(f"Collecting IOCs from {name}...")
+        
+        def put(item) -> bool:
+            # Block while the consumer is behind, but give up once it has gone away
+            while not stop.is_set() and name not in cancelled:
+                try:
+                    out.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
         
-        # Collect from PhishTank
         try:
-            logger.info("Collecting IOCs from PhishTank...")
-            phishtank_iocs = self.phishtank.collect_all(limit=limit_per_source)
-            normalized_phishtank = [self.base_collector.normalize_ioc(ioc) for ioc in phishtank_iocs]
-            all_iocs.extend(normalized_phishtank)
-            logger.info(f"Collected {len(normalized_phishtank)} IOCs from PhishTank")
+            for raw_ioc in task():
+                if not put((name, self.base_collector.normalize_ioc(raw_ioc))):
+                    return
+            put((name, _DONE))
         except Exception as e:
-            logger.error(f"Error collecting from PhishTank: {e}")
+            put((name, e))
+    
+    def iter_normalized(self,
+                        limit_per_source: int = 100,
+                        concurrent: bool = True,
+                        max_workers: Optional[int] = None,
+                        source_timeout: Optional[float] = None,
+                        incremental: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """
+        Stream normalized IOCs from all sources as they are collected.
+        
+        Each source runs in a worker thread and pushes normalized IOCs into a
+        bounded queue, so buffering is capped by ``queue_size`` regardless of
+        feed size. Per-source results are written to ``self.source_reports``.
+        
+        Args:
+            limit_per_source: Maximum IOCs per source
+            concurrent: Collect sources in parallel (False collects one after another)
+            max_workers: Override the maximum number of parallel sources
+            source_timeout: Override the per-source timeout in seconds
+            incremental: Only fetch what changed since each feed's stored watermark.
+                Watermarks of finished feeds are only advanced by ``commit``, which
+                the consumer calls once the IOCs have been indexed
+                
+        Yields:
+            Tuples of (source name, normalized IOC dictionary)
+        """
+        run_started = datetime.utcnow()
+        tasks = self._source_tasks(limit_per_source, incremental=incremental)
+        workers = 1 if not concurrent else max(1, min(max_workers or self.max_workers, len(tasks)))
+        timeout = source_timeout if source_timeout is not None else self.source_timeout
+        
+        self.source_reports = {}
+        started: Dict[str, float] = {}
+        counts = {name: 0 for name in tasks}
+        active = set(tasks)
+        cancelled = set()
+        stop = threading.Event()
+        out = queue.Queue(maxsize=self.queue_size)
         
-        # Collect from NVD
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ioc-collector')
         try:
-            logger.info("Collecting CVEs from NVD...")
-            nvd_iocs = self.nvd.collect_all(days=7, limit=limit_per_source)
-            normalized_nvd = [self.base_collector.normalize_ioc(ioc) for ioc in nvd_iocs]
-            all_iocs.extend(normalized_nvd)
-            logger.info(f"Collected {len(normalized_nvd)} CVEs from NVD")
-        except Exception as e:
-            logger.error(f"Error collecting from NVD: {e}")
+            for name, task in tasks.items():
+                executor.submit(self._run_source, name, task, out, started, stop, cancelled)
+            
+            while active:
+                try:
+                    name, item = out.get(timeout=0.5)
+                except queue.Empty:
+                    name, item = None, None
+                
+                now = time.monotonic()
+                
+                if name in active:
+                    if item is _DONE or isinstance(item, Exception):
+                        active.discard(name)
+                        elapsed = now - started.get(name, now)
+                        report = {
+                            'status': 'ok' if item is _DONE else 'error',
+                            'count': counts[name],
+                            'elapsed': round(elapsed, 3)
+                        }
+                        if item is _DONE:
+                            logger.info(f"Collected {counts[name]} IOCs from {name} in {elapsed:.1f}s")
+                            # Handed downstream, but not yet indexed; see commit()
+                            if name in self._cursors:
+                                self._pending_watermarks[name] = (self._cursors[name], run_started, counts[name])
+                        else:
+                            report['error'] = str(item)
+                            logger.error(f"Error collecting from {name}: {item}")
+                        self.source_reports[name] = report
+                    else:
+                        counts[name] += 1
+                        yield name, item
+                
+                if timeout is None:
+                    continue
+                
+                # Abandon sources that have been running longer than the timeout
+                for name in list(active):
+                    if name in started and now - started[name] > timeout:
+                        active.discard(name)
+                        cancelled.add(name)
+                        self.source_reports[name] = {
+                            'status': 'timeout',
+                            'count': counts[name],
+                            'elapsed': round(now - started[name], 3),
+                            'error': f"timed out after {timeout}s"
+                        }
+                        logger.error(f"Timed out collecting from {name} after {timeout}s")
+        finally:
+            # Do not block on abandoned sources; their HTTP timeouts will end them
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def commit(self):
+        """
+        Advance the watermarks of the sources that finished in the last run and
+        record the emitted IOCs in the dedup store.
+        
+        Call this only after every collected IOC has been indexed; if indexing
+        failed, skip it so the next run fetches and emits the same IOCs again.
+        """
+        for name, (cursor, run_started, count) in self._pending_watermarks.items():
+            self.watermarks.commit(name, cursor, run_started, count)
+        self._pending_watermarks = {}
+        self.deduplicator.commit()
+    
+    def close(self):
+        """Close the dedup store opened from IOC_DEDUP_DB, if any."""
+        if self._owned_store is not None:
+            self._owned_store.close()
+            self._owned_store = None
+    
+    def iter_all(self, limit_per_source: int = 100, **kwargs) -> Iterator[Dict]:
+        """
+        Stream normalized, incrementally deduplicated IOCs from all sources.
+        
+        An IOC is yielded again when a later duplicate changes its merged
+        record, so this is meant for consumers that upsert by ``ioc_id``.
+        
+        Args:
+            limit_per_source: Maximum IOCs per source
+            **kwargs: Passed through to ``iter_normalized``
+            
+        Yields:
+            New or updated IOC dictionaries
+        """
+        normalized = (ioc for _, ioc in self.iter_normalized(limit_per_source, **kwargs))
+        return self.deduplicator.iter_deduplicate(normalized)
+    
+    def collect_all(self,
+                    limit_per_source: int = 100,
+                    concurrent: bool = True,
+                    max_workers: Optional[int] = None,
+                    source_timeout: Optional[float] = None,
+                    incremental: bool = False) -> List[Dict]:
+        """
+        Collect IOCs from all sources.
+        
+        Sources are collected in parallel by default, so a full refresh takes as
+        long as the slowest feed rather than the sum of all of them. Per-source
+        results are available in ``self.source_reports`` after the call.
+        
+        Args:
+            limit_per_source: Maximum IOCs per source
+            concurrent: Collect sources in parallel (False collects one after another)
+            max_workers: Override the maximum number of parallel sources
+            source_timeout: Override the per-source timeout in seconds
+            incremental: Only fetch what changed since each feed's stored watermark
+                (call ``commit`` once the returned IOCs are indexed)
+                
+        Returns:
+            List of normalized and deduplicated IOC dictionaries
+        """
+        results: Dict[str, List[Dict]] = {}
+        for name, ioc in self.iter_normalized(limit_per_source,
+                                              concurrent=concurrent,
+                                              max_workers=max_workers,
+                                              source_timeout=source_timeout,
+                                              incremental=incremental):
+            results.setdefault(name, []).append(ioc)
+        
+        # Merge in source order so deduplication does not depend on completion order
+        all_iocs = []
+        for name in SOURCES:
+            all_iocs.extend(results.get(name, []))
         
         # Deduplicate
         logger.info(f"Deduplicating {len(all_iocs)} IOCs...")
@@ -82,4 +315,3 @@ class IOCOrchestrator:
         logger.info(f"Final count: {len(deduplicated)} unique IOCs")
         
         return deduplicated
-
@@ -0,0 +1,242 @@
+"""Memory-compact representation of normalized IOCs"""
+
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Bits of IOCRecord.ts_flags: the timestamp was written with a '+00:00' offset
+_FIRST_SEEN_UTC_OFFSET = 1
+_LAST_SEEN_UTC_OFFSET = 2
+
+_STANDARD_FIELDS = ('ioc_value', 'ioc_type', 'source', 'threat_type', 'first_seen',
+                    'last_seen', 'confidence', 'tags', 'metadata', 'ioc_id')
+
+# Marks a timestamp in IOCRecord.raw_timestamps that is rebuilt from its epoch value
+_REBUILD = object()
+
+# Metadata strings longer than this are unlikely to repeat and are not interned
+_MAX_INTERNED_LENGTH = 64
+
+
+# Distinct tag tuples and metadata key tuples shared between records; the
+# least recently used are dropped beyond this, so the table cannot grow without bound
+_MAX_SHARED_TUPLES = 65536
+
+
+def _intern(value: Any) -> Any:
+    # Interned strings are freed once no record references them
+    return sys.intern(value) if isinstance(value, str) and len(value) <= _MAX_INTERNED_LENGTH else value
+
+
+@lru_cache(maxsize=_MAX_SHARED_TUPLES)
+def _shared_tuple(values: tuple) -> tuple:
+    return values
+
+
+def _shared(values: tuple) -> tuple:
+    try:
+        return _shared_tuple(values)
+    except TypeError:
+        return values
+
+
+def _encode_timestamp(timestamp: Any) -> Tuple[int, bool, Optional[Any]]:
+    """
+    Encode a normalized timestamp string as epoch microseconds.
+    
+    Returns:
+        Tuple of (epoch microseconds, written with '+00:00' offset, raw value
+        to keep when the value cannot be rebuilt exactly, else _REBUILD)
+    """
+    if not isinstance(timestamp, str) or not timestamp.endswith('Z'):
+        return 0, False, timestamp
+    
+    text = timestamp[:-1]
+    utc_offset = text.endswith('+00:00')
+    try:
+        dt = datetime.fromisoformat(text[:-6] if utc_offset else text)
+    except ValueError:
+        return 0, False, timestamp
+    
+    if dt.tzinfo is not None:
+        # Other offsets: keep the epoch for comparisons, but also the original text
+        micros = (dt.replace(tzinfo=None) - dt.utcoffset() - _EPOCH) // _MICROSECOND
+        return micros, False, timestamp
+    
+    micros = (dt - _EPOCH) // _MICROSECOND
+    if _decode_timestamp(micros, utc_offset) != timestamp:
+        return micros, False, timestamp
+    return micros, utc_offset, _REBUILD
+
+
+def _decode_timestamp(micros: int, utc_offset: bool) -> str:
+    text = (_EPOCH + timedelta(microseconds=micros)).isoformat()
+    return f"{text}+00:00Z" if utc_offset else f"{text}Z"
+
+
+@dataclass(slots=True, eq=True)
+class IOCRecord:
+    """
+    Compact, slotted form of a normalized IOC dictionary.
+    
+    ``source``, ``ioc_type``, ``threat_type``, tags and short metadata strings
+    are interned, and tag lists and metadata key sets are shared tuples, so
+    millions of records hold one copy of each. Metadata values are kept in a
+    tuple aligned with the shared keys instead of a dict per record.
+    Timestamps are epoch microseconds (UTC) and ``ioc_id`` is the raw 32-byte
+    SHA-256 digest. ``from_dict``/``to_dict`` round-trip losslessly: values
+    that do not fit the compact fields (non-UTC offsets, unparseable or
+    ``None`` timestamps, non-hex IDs, metadata that is not a dict, tags that
+    are not a list, extra keys) are kept as given, and absent fields stay
+    absent.
+    """
+    
+    ioc_id: Union[bytes, str]
+    ioc_value: str
+    ioc_type: str
+    source: str
+    threat_type: str
+    first_seen: int
+    last_seen: int
+    confidence: float
+    tags: Tuple[str, ...] = ()
+    metadata_keys: Tuple[str, ...] = ()
+    metadata_values: Tuple[Any, ...] = ()
+    ts_flags: int = 0
+    raw_timestamps: Optional[Tuple[Any, Any]] = None
+    extra: Optional[Dict[str, Any]] = None
+    missing_fields: Tuple[str, ...] = ()
+    
+    @classmethod
+    def from_dict(cls, ioc: Dict[str, Any]) -> 'IOCRecord':
+        """
+        Build a record from a normalized IOC dictionary.
+        
+        Args:
+            ioc: Normalized IOC dictionary (see BaseCollector.normalize_ioc)
+            
+        Returns:
+            IOCRecord holding the same data
+        """
+        ioc_id = ioc.get('ioc_id', '')
+        if isinstance(ioc_id, str) and len(ioc_id) == 64:
+            try:
+                raw_id = bytes.fromhex(ioc_id)
+                if raw_id.hex() == ioc_id:
+                    ioc_id = raw_id
+            except ValueError:
+                pass
+        
+        first_seen, first_offset, first_raw = _encode_timestamp(ioc.get('first_seen'))
+        last_seen, last_offset, last_raw = _encode_timestamp(ioc.get('last_seen'))
+        ts_flags = (_FIRST_SEEN_UTC_OFFSET if first_offset else 0) | (_LAST_SEEN_UTC_OFFSET if last_offset else 0)
+        
+        extra = {k: v for k, v in ioc.items() if k not in _STANDARD_FIELDS}
+        
+        # Values of other shapes are kept as given (to_dict applies extra last)
+        metadata = ioc.get('metadata', {})
+        if not isinstance(metadata, dict):
+            extra['metadata'] = metadata
+            metadata = {}
+        tags = ioc.get('tags', [])
+        if not isinstance(tags, list):
+            extra['tags'] = tags
+            tags = []
+        
+        return cls(
+            ioc_id=ioc_id,
+            ioc_value=ioc.get('ioc_value', ''),
+            ioc_type=_intern(ioc.get('ioc_type', 'unknown')),
+            source=_intern(ioc.get('source', 'unknown')),
+            threat_type=_intern(ioc.get('threat_type', 'unknown')),
+            first_seen=first_seen,
+            last_seen=last_seen,
+            confidence=ioc.get('confidence', 0.5),
+            tags=_shared(tuple(_intern(tag) for tag in tags)),
+            metadata_keys=_shared(tuple(_intern(k) for k in metadata)),
+            metadata_values=tuple(_intern(v) for v in metadata.values()),
+            ts_flags=ts_flags,
+            raw_timestamps=(first_raw, last_raw) if first_raw is not _REBUILD or last_raw is not _REBUILD else None,
+            extra=extra or None,
+            missing_fields=_shared(tuple(field for field in _STANDARD_FIELDS if field not in ioc))
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert back to the normalized IOC dictionary shape.
+        
+        Returns:
+            Normalized IOC dictionary equal to the one the record was built from
+        """
+        first_raw, last_raw = self.raw_timestamps or (_REBUILD, _REBUILD)
+        
+        ioc = {
+            'ioc_value': self.ioc_value,
+            'ioc_type': self.ioc_type,
+            'source': self.source,
+            'threat_type': self.threat_type,
+            'first_seen': first_raw if first_raw is not _REBUILD else
+            _decode_timestamp(self.first_seen, bool(self.ts_flags & _FIRST_SEEN_UTC_OFFSET)),
+            'last_seen': last_raw if last_raw is not _REBUILD else
+            _decode_timestamp(self.last_seen, bool(self.ts_flags & _LAST_SEEN_UTC_OFFSET)),
+            'confidence': self.confidence,
+            'tags': list(self.tags),
+            'metadata': self.metadata,
+            'ioc_id': self.ioc_id.hex() if isinstance(self.ioc_id, bytes) else self.ioc_id
+        }
+        for field in self.missing_fields:
+            del ioc[field]
+        if self.extra:
+            ioc.update(self.extra)
+        return ioc
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata as a new dictionary."""
+        return dict(zip(self.metadata_keys, self.metadata_values))
+    
+    @property
+    def hex_id(self) -> str:
+        """IOC ID as the 64-character hex string used in the index."""
+        return self.ioc_id.hex() if isinstance(self.ioc_id, bytes) else self.ioc_id
+    
+    @property
+    def first_seen_datetime(self) -> datetime:
+        """First-seen time as a naive UTC datetime."""
+        return _EPOCH + timedelta(microseconds=self.first_seen)
+    
+    @property
+    def last_seen_datetime(self) -> datetime:
+        """Last-seen time as a naive UTC datetime."""
+        return _EPOCH + timedelta(microseconds=self.last_seen)
+
+
+def to_records(iocs: Iterable[Dict[str, Any]]) -> List[IOCRecord]:
+    """
+    Convert normalized IOC dictionaries to compact records.
+    
+    Args:
+        iocs: Normalized IOC dictionaries
+        
+    Returns:
+        List of IOCRecord objects
+    """
+    return [IOCRecord.from_dict(ioc) for ioc in iocs]
+
+
+def from_records(records: Iterable[IOCRecord]) -> List[Dict[str, Any]]:
+    """
+    Convert compact records back to normalized IOC dictionaries.
+    
+    Args:
+        records: IOCRecord objects
+        
+    Returns:
+        List of normalized IOC dictionaries
+    """
+    return [record.to_dict() for record in records]
@@ -0,0 +1,108 @@
+"""Incremental JSON decoding for large threat feed dumps"""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Optional
+
+
+def iter_json_array(chunks: Iterable[bytes],
+                    key: Optional[str] = None,
+                    encoding: str = 'utf-8') -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array as the document is read.
+    
+    Only the element being decoded is held in memory, and nothing past the
+    last element requested is read from ``chunks``, so a consumer that stops
+    early also stops the download. A top-level object is accepted as a
+    fallback when ``key`` is given: it is decoded whole and the array under
+    ``key`` is yielded.
+    
+    Args:
+        chunks: Byte chunks of the document (e.g. ``response.iter_content()``)
+        key: Array key to read when the document is an object instead of an array
+        encoding: Text encoding of the document
+        
+    Yields:
+        Decoded array elements
+        
+    Raises:
+        ValueError: If the document is not a JSON array (or object with ``key``)
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    eof = False
+    
+    def fill() -> bool:
+        # Append the next chunk to the buffer, returning False at end of input
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[pos:] + text_decoder.decode(chunk)
+                pos = 0
+                return True
+        buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+        pos = 0
+        eof = True
+        return False
+    
+    def next_char() -> str:
+        # Skip whitespace and return the next significant character ('' at end of input)
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return ''
+    
+    first = next_char()
+    if first == '\ufeff':  # Byte order mark
+        pos += 1
+        first = next_char()
+    
+    if first == '{' and key is not None:
+        while fill():
+            pass
+        document = json.loads(buffer[pos:])
+        yield from document.get(key, [])
+        return
+    
+    if first != '[':
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    
+    expect_value = True
+    while True:
+        char = next_char()
+        if char == ']':
+            return
+        if char == '':
+            raise ValueError("Unexpected end of JSON array")
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {pos}")
+            pos += 1
+            expect_value = True
+            continue
+        
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A value ending at the buffer edge (e.g. a number) may continue in the next chunk
+            if end == len(buffer) and fill():
+                continue
+            break
+        
+        pos = end
+        expect_value = False
+        yield value
@@ -2,27 +2,70 @@
 
 import os
 import requests
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator, Tuple
 from datetime import datetime, timedelta
 import logging
-import time
+
+from .rate_limiter import TokenBucket
+from .http_cache import configure_session
 
 logger = logging.getLogger(__name__)
 
+# Longest date range NVD accepts in a single query
+MAX_DATE_RANGE_DAYS = 120
+
+# Largest resultsPerPage NVD accepts
+MAX_RESULTS_PER_PAGE = 2000
+
+# Documented NVD quotas: requests per rolling 30 second window
+RATE_LIMIT_PERIOD = 30
+RATE_LIMIT_WITHOUT_KEY = 5
+RATE_LIMIT_WITH_KEY = 50
+
+# Quotas are enforced per client, so all collectors share one limiter per key
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: str = '') -> TokenBucket:
+    """
+    Get the process-wide NVD rate limiter for an API key.
+    
+    Args:
+        api_key: NVD API key ('' for anonymous access)
+        
+    Returns:
+        Shared TokenBucket sized to the documented quota
+    """
+    with _rate_limiters_lock:
+        if api_key not in _rate_limiters:
+            capacity = RATE_LIMIT_WITH_KEY if api_key else RATE_LIMIT_WITHOUT_KEY
+            _rate_limiters[api_key] = TokenBucket(capacity, RATE_LIMIT_PERIOD)
+        return _rate_limiters[api_key]
+
 
 class NVDCollector:
     """Collect CVEs from NIST NVD"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 max_retries: int = 5):
         """
         Initialize NVD collector.
         
         Args:
             api_key: NVD API key (optional, improves rate limits)
+            rate_limiter: Rate limiter to use (defaults to the shared limiter for the key)
+            max_retries: Retries per page after a 429/503 response
         """
         self.api_key = api_key or os.getenv('NVD_API_KEY', '')
         self.base_url = 'https://services.nvd.nist.gov/rest/json'
-        self.session = requests.Session()
+        self.session = configure_session(requests.Session(), 'nvd')
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.api_key)
+        self.max_retries = max_retries
         
         if self.api_key:
             self.session.headers.update({'apiKey': self.api_key})
@@ -38,103 +81,280 @@ class NVDCollector:
         Returns:
             List of normalized CVE dictionaries
         """
-        iocs = []
+        iocs = list(self.iter_recent_cves(days=days, limit=limit))
         
-        try:
-            # Calculate date range
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            start_date_str = start_date.strftime('%Y-%m-%dT00:00:00.000')
-            end_date_str = end_date.strftime('%Y-%m-%dT23:59:59.999')
-            
-            # NVD API v2.0
-            url = f"{self.base_url}/cves/2.0"
-            params = {
-                'pubStartDate': start_date_str,
-                'pubEndDate': end_date_str,
-                'resultsPerPage': min(limit, 2000)  # Max 2000 per request
-            }
-            
-            # Rate limiting: NVD allows 5 requests per 30 seconds without API key
-            # With API key: 50 requests per 30 seconds
-            response = self.session.get(url, params=params, timeout=60)
+        logger.info(f"Collected {len(iocs)} CVEs from NVD")
+        return iocs
+    
+    def collect_cves(self,
+                     start_date: datetime,
+                     end_date: Optional[datetime] = None,
+                     date_field: str = 'pub',
+                     limit: Optional[int] = None) -> List[Dict]:
+        """
+        Backfill every CVE in a date range from NVD.
+        
+        Args:
+            start_date: Start of the range (naive UTC)
+            end_date: End of the range (defaults to now)
+            date_field: 'pub' to filter on publication date, 'lastMod' on last modification
+            limit: Maximum number of CVEs to retrieve (None for all)
             
-            # Handle rate limiting
-            if response.status_code == 429:
-                logger.warning("NVD rate limit hit, waiting 30 seconds...")
-                time.sleep(30)
-                response = self.session.get(url, params=params, timeout=60)
+        Returns:
+            List of normalized CVE dictionaries
+        """
+        iocs = list(self.iter_cves(start_date, end_date or datetime.utcnow(),
+                                   date_field=date_field, limit=limit))
+        
+        logger.info(f"Collected {len(iocs)} CVEs from NVD")
+        return iocs
+    
+    def iter_recent_cves(self,
+                         days: int = 7,
+                         limit: int = 100,
+                         modified_since: Optional[datetime] = None,
+                         cursor: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Yield recent CVEs from NVD one at a time.
+        
+        Without ``modified_since`` CVEs published in the last ``days`` days are
+        returned. With it, only CVEs modified since that time are fetched
+        (``lastModStartDate``), which is how incremental runs fetch deltas.
+        
+        Args:
+            days: Number of days to look back
+            limit: Maximum number of CVEs to retrieve
+            modified_since: Only return CVEs modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update (see iter_cves)
             
-            response.raise_for_status()
-            data = response.json()
+        Yields:
+            Raw CVE IOC dictionaries
+        """
+        end_date = datetime.utcnow()
+        
+        if modified_since:
+            return self.iter_cves(modified_since, end_date, date_field='lastMod', limit=limit, cursor=cursor)
+        
+        start_date = (end_date - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.iter_cves(start_date, end_date, date_field='pub', limit=limit, cursor=cursor)
+    
+    def iter_cves(self,
+                  start_date: datetime,
+                  end_date: datetime,
+                  date_field: str = 'pub',
+                  limit: Optional[int] = None,
+                  cursor: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Harvest every CVE in a date range, following ``startIndex`` pagination.
+        
+        The range is split into windows of at most 120 days (the longest range
+        NVD accepts). Requests go through the shared rate limiter, and the next
+        page is fetched in the background while the current one is parsed, so a
+        backfill runs as fast as the API quota allows.
+        
+        When a cursor dictionary is given, ``cursor['page']`` is the
+        ``startIndex`` to resume from within the window starting at
+        ``cursor['modified_since']``. It is updated as pages are consumed, along
+        with the newest ``lastModified`` seen and whether the range was fully
+        drained (``exhausted``).
+        
+        Args:
+            start_date: Start of the range (naive UTC)
+            end_date: End of the range (naive UTC)
+            date_field: 'pub' to filter on publication date, 'lastMod' on last modification
+            limit: Maximum number of CVEs to retrieve (None for all)
+            cursor: Optional cursor dictionary to resume from and update
             
-            vulnerabilities = data.get('vulnerabilities', [])
+        Yields:
+            Raw CVE IOC dictionaries
             
-            for vuln_entry in vulnerabilities[:limit]:
-                cve_data = vuln_entry.get('cve', {})
-                cve_id = cve_data.get('id', '')
+        Raises:
+            requests.exceptions.RequestException: If a page cannot be fetched
+                (after the retries of ``_fetch_page``); CVEs yielded before the
+                error stay valid and the cursor points at the failed page
+        """
+        cursor = cursor if cursor is not None else {}
+        cursor['exhausted'] = False
+        resume_index = cursor.get('page') or 0
+        count = 0
+        
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nvd-prefetch')
+        try:
+            for window_start, window_end in self._date_windows(start_date, end_date):
+                cursor['modified_since'] = window_start
+                start_index = resume_index
+                resume_index = 0
+                
+                if limit is not None and count >= limit:
+                    cursor['page'] = start_index
+                    return
                 
-                if not cve_id:
-                    continue
+                future = executor.submit(self._fetch_page, window_start, window_end, date_field,
+                                         start_index, self._page_size(limit, count))
                 
-                # Extract CVSS scores
-                metrics = cve_data.get('metrics', {})
-                cvss_v3 = metrics.get('cvssMetricV31', [{}])[0] if metrics.get('cvssMetricV31') else {}
-                cvss_v2 = metrics.get('cvssMetricV2', [{}])[0] if metrics.get('cvssMetricV2') else {}
+                while future is not None:
+                    data = future.result()
+                    vulnerabilities = data.get('vulnerabilities', [])
+                    total_results = data.get('totalResults', start_index + len(vulnerabilities))
+                    next_index = start_index + len(vulnerabilities)
+                    
+                    # Prefetch the next page while this one is being consumed
+                    wanted = limit is None or count + len(vulnerabilities) < limit
+                    if vulnerabilities and next_index < total_results and wanted:
+                        future = executor.submit(self._fetch_page, window_start, window_end, date_field,
+                                                 next_index, self._page_size(limit, count + len(vulnerabilities)))
+                    else:
+                        future = None
+                    
+                    for offset, vuln_entry in enumerate(vulnerabilities):
+                        if limit is not None and count >= limit:
+                            cursor['page'] = start_index + offset
+                            return
+                        
+                        cve_data = vuln_entry.get('cve', {})
+                        last_modified = cve_data.get('lastModified', '')
+                        if last_modified and last_modified > cursor.get('max_modified', ''):
+                            cursor['max_modified'] = last_modified
+                        
+                        ioc = self._parse_cve(cve_data)
+                        if ioc:
+                            count += 1
+                            yield ioc
+                    
+                    start_index = next_index
+                    cursor['page'] = start_index
+                    
+                    if future is None and next_index < total_results:
+                        # Stopped on the limit with pages left in this window
+                        return
                 
-                base_score_v3 = cvss_v3.get('cvssData', {}).get('baseScore', 0.0)
-                base_score_v2 = cvss_v2.get('cvssData', {}).get('baseScore', 0.0)
-                base_score = base_score_v3 or base_score_v2 or 0.0
+                cursor['page'] = 0
+            
+            cursor['exhausted'] = True
+        
+        except requests.exceptions.RequestException as e:
+            # Re-raised so callers (e.g. the orchestrator) report the run as failed
+            # and keep the previous watermark instead of skipping the missed pages
+            logger.error(f"Error fetching NVD data: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error processing NVD data: {e}")
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _date_windows(start_date: datetime, end_date: datetime) -> Iterator[Tuple[datetime, datetime]]:
+        """Split a date range into windows NVD accepts in a single query."""
+        window_start = start_date
+        while window_start < end_date:
+            window_end = min(window_start + timedelta(days=MAX_DATE_RANGE_DAYS), end_date)
+            yield window_start, window_end
+            window_start = window_end
+    
+    @staticmethod
+    def _page_size(limit: Optional[int], count: int) -> int:
+        """Page size for the next request, never fetching more than the limit needs."""
+        if limit is None:
+            return MAX_RESULTS_PER_PAGE
+        return max(1, min(limit - count, MAX_RESULTS_PER_PAGE))
+    
+    def _fetch_page(self,
+                    window_start: datetime,
+                    window_end: datetime,
+                    date_field: str,
+                    start_index: int,
+                    page_size: int) -> Dict:
+        """
+        Fetch one page of CVEs, waiting on the rate limiter and backing off on 429/503.
+        
+        Returns:
+            Parsed JSON response
+        """
+        url = f"{self.base_url}/cves/2.0"
+        params = {
+            f'{date_field}StartDate': window_start.strftime('%Y-%m-%dT%H:%M:%S.000'),
+            f'{date_field}EndDate': window_end.strftime('%Y-%m-%dT%H:%M:%S.999'),
+            'resultsPerPage': page_size
+        }
+        if start_index:
+            params['startIndex'] = start_index
+        
+        backoff = self.rate_limiter.period / self.rate_limiter.capacity
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, params=params, timeout=60)
+            
+            if response.status_code not in (429, 503) or attempt == self.max_retries:
+                break
+            
+            # Honour Retry-After when given, otherwise back off exponentially
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else backoff * (2 ** attempt)
+            logger.warning(f"NVD returned {response.status_code}, retrying in {delay:.0f}s")
+            self.rate_limiter.penalize(delay)
+        
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    def _parse_cve(cve_data: Dict) -> Optional[Dict]:
+        """Convert an NVD CVE record into a raw IOC dictionary."""
+        cve_id = cve_data.get('id', '')
                 
-                # Classify threat type based on CVSS score
-                threat_type = 'high_risk' if base_score >= 7.0 else 'medium_risk' if base_score >= 4.0 else 'low_risk'
+        if not cve_id:
+            return None
+        
+        # Extract CVSS scores
+        metrics = cve_data.get('metrics', {})
+        cvss_v3 = metrics.get('cvssMetricV31', [{}])[0] if metrics.get('cvssMetricV31') else {}
+        cvss_v2 = metrics.get('cvssMetricV2', [{}])[0] if metrics.get('cvssMetricV2') else {}
                 
-                # Extract descriptions
-                descriptions = cve_data.get('descriptions', [])
-                description = ''
-                for desc in descriptions:
-                    if desc.get('lang', 'en') == 'en':
-                        description = desc.get('value', '')
-                        break
+        base_score_v3 = cvss_v3.get('cvssData', {}).get('baseScore', 0.0)
+        base_score_v2 = cvss_v2.get('cvssData', {}).get('baseScore', 0.0)
+        base_score = base_score_v3 or base_score_v2 or 0.0
                 
-                # Extract affected products
-                configurations = cve_data.get('configurations', [])
-                affected_products = []
-                for config in configurations:
-                    nodes = config.get('nodes', [])
-                    for node in nodes:
-                        cpe_match = node.get('cpeMatch', [])
-                        for match in cpe_match:
-                            criteria = match.get('criteria', '')
-                            if criteria:
-                                affected_products.append(criteria)
+        # Classify threat type based on CVSS score
+        threat_type = 'high_risk' if base_score >= 7.0 else 'medium_risk' if base_score >= 4.0 else 'low_risk'
                 
-                ioc = {
-                    'ioc_value': cve_id,
-                    'ioc_type': 'cve',
-                    'source': 'nvd',
-                    'threat_type': threat_type,
-                    'first_seen': cve_data.get('published', ''),
-                    'last_seen': cve_data.get('lastModified', ''),
-                    'confidence': min(base_score / 10.0, 1.0) if base_score > 0 else 0.5,
-                    'cvss_score': base_score,
-                    'cvss_severity': cvss_v3.get('cvssData', {}).get('baseSeverity', 'MEDIUM'),
-                    'description': description,
-                    'affected_products': affected_products[:10],  # Limit to first 10
-                    'tags': ['vulnerability', 'cve'],
-                    'references': [ref.get('url', '') for ref in cve_data.get('references', [])][:5]
-                }
+        # Extract descriptions
+        descriptions = cve_data.get('descriptions', [])
+        description = ''
+        for desc in descriptions:
+            if desc.get('lang', 'en') == 'en':
+                description = desc.get('value', '')
+                break
                 
-                iocs.append(ioc)
+        # Extract affected products
+        configurations = cve_data.get('configurations', [])
+        affected_products = []
+        for config in configurations:
+            nodes = config.get('nodes', [])
+            for node in nodes:
+                cpe_match = node.get('cpeMatch', [])
+                for match in cpe_match:
+                    criteria = match.get('criteria', '')
+                    if criteria:
+                        affected_products.append(criteria)
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching NVD data: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error processing NVD data: {e}")
+        ioc = {
+            'ioc_value': cve_id,
+            'ioc_type': 'cve',
+            'source': 'nvd',
+            'threat_type': threat_type,
+            'first_seen': cve_data.get('published', ''),
+            'last_seen': cve_data.get('lastModified', ''),
+            'confidence': min(base_score / 10.0, 1.0) if base_score > 0 else 0.5,
+            'cvss_score': base_score,
+            'cvss_severity': cvss_v3.get('cvssData', {}).get('baseSeverity', 'MEDIUM'),
+            'description': description,
+            'affected_products': affected_products[:10],  # Limit to first 10
+            'tags': ['vulnerability', 'cve'],
+            'references': [ref.get('url', '') for ref in cve_data.get('references', [])][:5]
+        }
         
-        logger.info(f"Collected {len(iocs)} CVEs from NVD")
-        return iocs
+        return ioc
     
     def collect_all(self, days: int = 7, limit: int = 100) -> List[Dict]:
         """
@@ -149,4 +369,23 @@ class NVDCollector:
         """
         iocs = self.collect_recent_cves(days=days, limit=limit)
         return iocs
+    
+    def iter_all(self,
+                 days: int = 7,
+                 limit: int = 100,
+                 modified_since: Optional[datetime] = None,
+                 cursor: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Yield all CVEs from NVD one at a time.
+        
+        Args:
+            days: Number of days to look back
+            limit: Maximum number of CVEs to retrieve
+            modified_since: Only return CVEs modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update
+            
+        Yields:
+            Raw CVE IOC dictionaries
+        """
+        return self.iter_recent_cves(days=days, limit=limit, modified_since=modified_since, cursor=cursor)
 
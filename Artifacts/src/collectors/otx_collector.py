@@ -2,10 +2,12 @@
 
 import os
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Iterable
 from datetime import datetime
 import logging
 
+from .http_cache import configure_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,28 +23,59 @@ class OTXCollector:
         """
         self.api_key = api_key or os.getenv('OTX_API_KEY', '')
         self.base_url = 'https://otx.alienvault.com/api/v1'
-        self.session = requests.Session()
+        self.session = configure_session(requests.Session(), 'otx')
         
         if self.api_key:
             self.session.headers.update({'X-OTX-API-KEY': self.api_key})
     
-    def get_all_pulses(self, limit: int = 100) -> List[Dict]:
+    def get_all_pulses(self,
+                       limit: int = 100,
+                       modified_since: Optional[datetime] = None,
+                       cursor: Optional[Dict] = None) -> List[Dict]:
         """
         Get all pulses (threat intelligence reports) from OTX.
         
         Args:
             limit: Maximum number of pulses to retrieve
+            modified_since: Only return pulses modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update (see iter_pulses)
             
         Returns:
             List of pulse dictionaries
         """
-        pulses = []
-        page = 1
+        return list(self.iter_pulses(limit=limit, modified_since=modified_since, cursor=cursor))
+    
+    def iter_pulses(self,
+                    limit: int = 100,
+                    modified_since: Optional[datetime] = None,
+                    cursor: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Yield pulses page by page, fetching the next page only when needed.
+        
+        When a cursor dictionary is given, paging resumes from ``cursor['page']``
+        and the cursor is updated with the next page to fetch, the newest
+        ``modified`` timestamp seen and whether the feed was fully drained
+        (``exhausted``).
+        
+        Args:
+            limit: Maximum number of pulses to retrieve
+            modified_since: Only return pulses modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update
+            
+        Yields:
+            Pulse dictionaries
+        """
+        cursor = cursor if cursor is not None else {}
+        cursor['exhausted'] = False
+        count = 0
+        page = cursor.get('page') or 1
         
         try:
-            while len(pulses) < limit:
+            while count < limit:
                 url = f"{self.base_url}/pulses/subscribed"
                 params = {'page': page, 'page_size': 50}
+                if modified_since:
+                    params['modified_since'] = modified_since.isoformat()
                 
                 response = self.session.get(url, params=params, timeout=30)
                 response.raise_for_status()
@@ -51,18 +84,30 @@ class OTXCollector:
                 results = data.get('results', [])
                 
                 if not results:
+                    cursor['exhausted'] = True
+                    break
+                
+                remaining = limit - count
+                for pulse in results[:remaining]:
+                    modified = pulse.get('modified', '')
+                    if modified and modified > cursor.get('max_modified', ''):
+                        cursor['max_modified'] = modified
+                    yield pulse
+                    count += 1
+                
+                if len(results) > remaining:
+                    # Page only partly consumed, resume from it next time
                     break
                 
-                pulses.extend(results)
                 page += 1
+                cursor['page'] = page
                 
-                if len(pulses) >= limit:
+                if 'next' in data and not data['next']:
+                    cursor['exhausted'] = True
                     break
                     
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching OTX pulses: {e}")
-            
-        return pulses[:limit]
     
     def extract_iocs(self, pulses: List[Dict]) -> List[Dict]:
         """
@@ -74,8 +119,18 @@ class OTXCollector:
         Returns:
             List of normalized IOC dictionaries
         """
-        iocs = []
+        return list(self.iter_extract_iocs(pulses))
+    
+    def iter_extract_iocs(self, pulses: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield IOCs from pulses one at a time.
         
+        Args:
+            pulses: Iterable of pulse dictionaries
+            
+        Yields:
+            Raw IOC dictionaries
+        """
         for pulse in pulses:
             pulse_id = pulse.get('id', '')
             pulse_name = pulse.get('name', '')
@@ -107,26 +162,46 @@ class OTXCollector:
                     'references': pulse.get('references', [])
                 }
                 
-                iocs.append(normalized)
-        
-        return iocs
+                yield normalized
     
-    def collect_all(self, limit: int = 100) -> List[Dict]:
+    def collect_all(self,
+                    limit: int = 100,
+                    modified_since: Optional[datetime] = None,
+                    cursor: Optional[Dict] = None) -> List[Dict]:
         """
         Collect all IOCs from OTX.
         
         Args:
             limit: Maximum number of pulses to process
+            modified_since: Only collect pulses modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update
             
         Returns:
             List of normalized IOC dictionaries
         """
-        pulses = self.get_all_pulses(limit=limit)
+        pulses = self.get_all_pulses(limit=limit, modified_since=modified_since, cursor=cursor)
         iocs = self.extract_iocs(pulses)
         
         logger.info(f"Collected {len(iocs)} IOCs from OTX")
         return iocs
     
+    def iter_all(self,
+                 limit: int = 100,
+                 modified_since: Optional[datetime] = None,
+                 cursor: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Yield IOCs from OTX pulses as pages are fetched.
+        
+        Args:
+            limit: Maximum number of pulses to process
+            modified_since: Only collect pulses modified after this UTC time
+            cursor: Optional cursor dictionary to resume from and update
+            
+        Yields:
+            Raw IOC dictionaries
+        """
+        return self.iter_extract_iocs(self.iter_pulses(limit=limit, modified_since=modified_since, cursor=cursor))
+    
     @staticmethod
     def _normalize_ioc_type(ioc_type: str) -> str:
         """Normalize IOC type to standard format."""
@@ -2,12 +2,19 @@
 
 import os
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from datetime import datetime
+from urllib.parse import urlparse
 import logging
 
+from .json_stream import iter_json_array
+from .http_cache import configure_session
+
 logger = logging.getLogger(__name__)
 
+# Bytes read from the feed per chunk while streaming
+CHUNK_SIZE = 64 * 1024
+
 
 class PhishTankCollector:
     """Collect phishing URLs from PhishTank"""
@@ -21,7 +28,7 @@ class PhishTankCollector:
         """
         self.api_key = api_key or os.getenv('PHISHTANK_API_KEY', '')
         self.base_url = 'http://data.phishtank.com'
-        self.session = requests.Session()
+        self.session = configure_session(requests.Session(), 'phishtank')
     
     def collect_online_urls(self, limit: int = 100) -> List[Dict]:
         """
@@ -33,25 +40,28 @@ class PhishTankCollector:
         Returns:
             List of normalized IOC dictionaries
         """
-        iocs = []
+        iocs = list(self.iter_online_urls(limit=limit))
         
-        try:
-            # Use public feed (no API key required)
-            url = f"{self.base_url}/data/online-valid.json"
-            
-            response = self.session.get(url, timeout=60)  # Large file, longer timeout
-            response.raise_for_status()
-            
-            data = response.json()
-            phish_entries = data if isinstance(data, list) else data.get('phishes', [])
+        logger.info(f"Collected {len(iocs)} IOCs from PhishTank")
+        return iocs
+    
+    def iter_online_urls(self, limit: int = 100) -> Iterator[Dict]:
+        """
+        Yield currently online phishing URL and domain IOCs one at a time.
+        
+        Args:
+            limit: Maximum number of URLs to retrieve
             
-            for entry in phish_entries[:limit]:
+        Yields:
+            Raw IOC dictionaries
+        """
+        try:
+            for entry in self._iter_feed_entries(limit):
                 phish_url = entry.get('url', '')
                 if not phish_url:
                     continue
                 
                 # Extract domain from URL
-                from urllib.parse import urlparse
                 parsed = urlparse(phish_url)
                 domain = parsed.netloc
                 
@@ -70,7 +80,7 @@ class PhishTankCollector:
                     'target': entry.get('target', ''),
                     'related_domain': domain
                 }
-                iocs.append(url_ioc)
+                yield url_ioc
                 
                 # Also add domain as separate IOC
                 if domain:
@@ -83,13 +93,50 @@ class PhishTankCollector:
                         'confidence': 0.90 if entry.get('verified', 'yes') == 'yes' else 0.65,
                         'related_urls': [phish_url]
                     }
-                    iocs.append(domain_ioc)
-                    
+                    yield domain_ioc
+        
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching PhishTank data: {e}")
+        except ValueError as e:
+            logger.error(f"Error parsing PhishTank data: {e}")
+    
+    def _iter_feed_entries(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream entries of the online-valid dump, reading no further than ``limit``.
         
-        logger.info(f"Collected {len(iocs)} IOCs from PhishTank")
-        return iocs
+        An unchanged dump is served from the shared HTTP cache, which only
+        stores the body once it has been read to the end.
+        
+        Args:
+            limit: Maximum number of entries to read (None for all)
+            
+        Yields:
+            Raw PhishTank entry dictionaries
+        """
+        url = f"{self.base_url}/data/online-valid.json"
+        
+        response = self.session.get(url, stream=True, timeout=60)  # Large file, longer timeout
+        try:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            yield from self._take(iter_json_array(chunks, key='phishes'), limit)
+        finally:
+            response.close()
+    
+    @staticmethod
+    def _take(entries: Iterator[Dict], limit: Optional[int]) -> Iterator[Dict]:
+        """Yield at most ``limit`` entries without pulling any more from the stream."""
+        if limit is None:
+            yield from entries
+            return
+        
+        if limit <= 0:
+            return
+        
+        for count, entry in enumerate(entries, 1):
+            yield entry
+            if count >= limit:
+                return
     
     def collect_all(self, limit: int = 100) -> List[Dict]:
         """
@@ -103,4 +150,16 @@ class PhishTankCollector:
         """
         iocs = self.collect_online_urls(limit=limit)
         return iocs
+    
+    def iter_all(self, limit: int = 100) -> Iterator[Dict]:
+        """
+        Yield all phishing URL IOCs from PhishTank one at a time.
+        
+        Args:
+            limit: Maximum number of URLs to retrieve
+            
+        Yields:
+            Raw IOC dictionaries
+        """
+        return self.iter_online_urls(limit=limit)
 
@@ -0,0 +1,120 @@
+"""Thread-safe request rate limiting for threat feed APIs"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket sized for rolling-window API quotas.
+    
+    The bucket holds ``capacity`` tokens and every request spends one. A spent
+    token is returned ``period`` seconds after it was taken (plus ``margin``),
+    so no rolling window of ``period`` seconds ever sees more than ``capacity``
+    requests. This is the shape of quotas like NVD's "5 requests per 30
+    seconds" and lets callers burst up to the full budget without tripping it.
+    """
+    
+    def __init__(self,
+                 capacity: int,
+                 period: float,
+                 margin: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize token bucket.
+        
+        Args:
+            capacity: Requests allowed per period
+            period: Length of the rolling window in seconds
+            margin: Extra seconds before a spent token is returned, to absorb clock skew
+            clock: Monotonic clock function (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        
+        self.capacity = capacity
+        self.period = period
+        self.margin = margin
+        self._clock = clock
+        self._sleep = sleep
+        self._spent = deque()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _expire(self, now: float):
+        """Return tokens whose window has passed."""
+        while self._spent and now - self._spent[0] >= self.period + self.margin:
+            self._spent.popleft()
+    
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+        
+        Returns:
+            0.0 if a token was taken, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = self._clock()
+            
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            
+            self._expire(now)
+            if len(self._spent) < self.capacity:
+                self._spent.append(now)
+                return 0.0
+            
+            return self._spent[0] + self.period + self.margin - now
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a token is available.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if a token was taken, False on timeout
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            
+            self._sleep(wait)
+    
+    def penalize(self, seconds: float):
+        """
+        Stop handing out tokens for a while, e.g. after the server returned 429.
+        
+        Args:
+            seconds: Seconds to block all callers
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+        logger.warning(f"Rate limiter paused for {seconds:.1f}s")
+    
+    @property
+    def available(self) -> int:
+        """Number of tokens that can be taken right now."""
+        with self._lock:
+            now = self._clock()
+            if now < self._blocked_until:
+                return 0
+            self._expire(now)
+            return self.capacity - len(self._spent)
@@ -0,0 +1,148 @@
+"""Persistent per-feed collection watermarks for incremental IOC collection"""
+
+import os
+import json
+import threading
+from typing import Dict, Optional, Any
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATERMARK_FILE = os.path.join('data', 'state', 'watermarks.json')
+
+
+class WatermarkStore:
+    """Store the last collection cursor for each feed in a local JSON state file"""
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize watermark store.
+        
+        Args:
+            path: State file path (defaults to IOC_WATERMARK_FILE env var or data/state/watermarks.json)
+        """
+        self.path = path or os.getenv('IOC_WATERMARK_FILE', DEFAULT_WATERMARK_FILE)
+        self._lock = threading.Lock()
+        self._state = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load state from disk, starting empty if the file is missing or corrupt."""
+        if not os.path.exists(self.path):
+            return {}
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable watermark file {self.path}: {e}")
+            return {}
+    
+    def _save(self):
+        """Atomically write state to disk."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+    
+    def get(self, source: str) -> Dict[str, Any]:
+        """
+        Get the watermark for a source.
+        
+        Args:
+            source: Source name
+            
+        Returns:
+            Copy of the stored watermark (empty if the source was never collected)
+        """
+        with self._lock:
+            return dict(self._state.get(source, {}))
+    
+    def get_since(self, source: str) -> Optional[datetime]:
+        """
+        Get the modified-since timestamp to resume a source from.
+        
+        Args:
+            source: Source name
+            
+        Returns:
+            Naive UTC datetime, or None if the source has no watermark
+        """
+        since = self.get(source).get('modified_since')
+        if not since:
+            return None
+        
+        try:
+            return datetime.fromisoformat(since)
+        except ValueError:
+            logger.warning(f"Ignoring invalid watermark for {source}: {since}")
+            return None
+    
+    def update(self, source: str, **fields):
+        """
+        Update and persist the watermark for a source.
+        
+        Args:
+            source: Source name
+            **fields: Watermark fields to set
+        """
+        with self._lock:
+            self._state.setdefault(source, {}).update(fields)
+            try:
+                self._save()
+            except OSError as e:
+                logger.error(f"Error saving watermarks to {self.path}: {e}")
+    
+    def commit(self, source: str, cursor: Dict[str, Any], run_started: datetime, count: int = 0):
+        """
+        Advance a source's watermark after a successful collection run.
+        
+        When the feed was fully drained the watermark moves to the start of
+        this run. When the run stopped early (e.g. on ``limit``) the previous
+        ``modified_since`` is kept and the page/offset to resume from is stored.
+        
+        Args:
+            source: Source name
+            cursor: Cursor dictionary filled in by the collector
+            run_started: Naive UTC time the run started
+            count: Number of IOCs collected in this run
+        """
+        fields = {
+            'last_run': run_started.isoformat(),
+            'last_count': count
+        }
+        
+        if cursor.get('max_modified'):
+            fields['last_modified'] = cursor['max_modified']
+        
+        if cursor.get('exhausted'):
+            fields['modified_since'] = run_started.isoformat()
+            fields['page'] = None
+        else:
+            since = cursor.get('modified_since')
+            fields['modified_since'] = since.isoformat() if isinstance(since, datetime) else since
+            fields['page'] = cursor.get('page')
+        
+        self.update(source, **fields)
+    
+    def reset(self, source: Optional[str] = None):
+        """
+        Forget watermarks so the next run collects the full window again.
+        
+        Args:
+            source: Source to reset (None resets all sources)
+        """
+        with self._lock:
+            if source is None:
+                self._state = {}
+            else:
+                self._state.pop(source, None)
+            try:
+                self._save()
+            except OSError as e:
+                logger.error(f"Error saving watermarks to {self.path}: {e}")
@@ -2,14 +2,57 @@
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Tuple, Set
+from bisect import bisect_right
+from itertools import combinations
+from typing import List, Dict, Tuple, Set, Iterable, Iterator, Callable
 from datetime import datetime, timedelta
 from collections import defaultdict
 import networkx as nx
 import logging
 
+from .similarity_kernel import SimilarityKernel, SIMILARITY_WEIGHTS
+
 logger = logging.getLogger(__name__)
 
+# Slack for float rounding when bounding scores (errs towards scoring more pairs)
+_BOUND_EPSILON = 1e-9
+
+# Extra seconds added to the time window when sweeping, for the same reason
+_WINDOW_SLACK_SECONDS = 1.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Candidate pairs per block when they are not scored by SimilarityKernel
+_PAIR_BLOCK_SIZE = 1024
+
+# A blocking signal: (estimated number of pairs, function returning the positions
+# that may correlate with a position; may include the position itself and repeats)
+Block = Tuple[int, Callable[[int], Iterable[int]]]
+
+
+def _group_cost(groups: Iterable[List[int]]) -> int:
+    return sum(len(members) * (len(members) - 1) // 2 for members in groups)
+
+
+def _metadata(ioc: Dict) -> Dict:
+    """metadata of an IOC, or an empty dict if it is missing or not a dict."""
+    metadata = ioc.get('metadata')
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def _related_hashes(metadata: Dict) -> List:
+    """Values of metadata's related_hashes mapping (empty if it is not a dict)."""
+    related = metadata.get('related_hashes')
+    return list(related.values()) if isinstance(related, dict) else []
+
+
+def _parse_first_seen(ioc: Dict):
+    """first_seen parsed exactly as _temporal_similarity does, or None if that fails."""
+    try:
+        return datetime.fromisoformat(ioc.get('first_seen', '').replace('Z', '+00:00'))
+    except Exception:
+        return None
+
 
 class ThreatCorrelationEngine:
     """Correlate related IOCs into campaigns and threat actor groups"""
@@ -89,8 +132,15 @@ class ThreatCorrelationEngine:
         
         return updated_iocs, campaign_mapping
     
-    def _build_correlation_graph(self, iocs: List[Dict]) -> nx.Graph:
-        """Build correlation graph from IOCs."""
+    def _build_correlation_graph(self, iocs: List[Dict], exhaustive: bool = False) -> nx.Graph:
+        """
+        Build correlation graph from IOCs.
+        
+        Only candidate pairs that can reach ``similarity_threshold`` are
+        scored (see _candidate_pairs), in blocks with SimilarityKernel; the
+        graph is identical to scoring every pair with _calculate_similarity,
+        which ``exhaustive`` does.
+        """
         graph = nx.Graph()
         
         # Add nodes
@@ -99,24 +149,230 @@ class ThreatCorrelationEngine:
             if ioc_id:
                 graph.add_node(ioc_id, **ioc)
         
-        # Add edges based on correlations
-        for i, ioc1 in enumerate(iocs):
-            ioc1_id = ioc1.get('ioc_id', '')
-            if not ioc1_id:
+        indexed = [i for i, ioc in enumerate(iocs) if ioc.get('ioc_id', '')]
+        if exhaustive:
+            correlated = self._score_scalar(iocs, combinations(indexed, 2))
+        else:
+            correlated = self._score_vectorized(iocs, indexed)
+        
+        # Add edges based on correlations, in the same order as a nested loop
+        for i, j, similarity in correlated:
+            graph.add_edge(iocs[i]['ioc_id'], iocs[j]['ioc_id'], similarity=similarity, weight=similarity)
+        
+        return graph
+    
+    def _score_scalar(self, iocs: List[Dict], pairs: Iterable[Tuple[int, int]]) -> Iterable[Tuple[int, int, float]]:
+        """Pairs reaching the threshold, scored one at a time with _calculate_similarity."""
+        for i, j in pairs:
+            similarity = self._calculate_similarity(iocs[i], iocs[j])
+            if similarity >= self.similarity_threshold:
+                yield i, j, similarity
+    
+    def _score_vectorized(self, iocs: List[Dict], indexed: List[int]) -> Iterable[Tuple[int, int, float]]:
+        """
+        Candidate pairs reaching the threshold, scored in blocks with SimilarityKernel.
+        
+        The kernel is fed the position arrays of one candidate block at a
+        time (see _candidate_blocks). Scores are identical to
+        _calculate_similarity; IOCs the kernel cannot encode (unhashable
+        source or threat_type) are scored one pair at a time.
+        """
+        try:
+            kernel = SimilarityKernel(iocs, self.time_window_hours)
+        except TypeError as e:
+            logger.debug(f"Scoring pairs individually: {e}")
+            yield from self._score_scalar(iocs, self._candidate_pairs(iocs, indexed))
+            return
+        
+        for left, right in self._candidate_blocks(iocs, indexed, kernel.block_size):
+            similarity = kernel.score(left, right)
+            for k in np.flatnonzero(similarity >= self.similarity_threshold):
+                yield int(left[k]), int(right[k]), float(similarity[k])
+    
+    def _candidate_pairs(self, iocs: List[Dict], indexed: List[int]) -> Iterator[Tuple[int, int]]:
+        """Candidate pairs one at a time (see _candidate_blocks)."""
+        for left, right in self._candidate_blocks(iocs, indexed, _PAIR_BLOCK_SIZE):
+            yield from zip(left.tolist(), right.tolist())
+    
+    def _candidate_blocks(self,
+                          iocs: List[Dict],
+                          indexed: List[int],
+                          block_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Index pairs that may reach the similarity threshold.
+        
+        Each similarity component is non-zero only for pairs sharing a block:
+        first_seen within the time window (or unparseable, which scores 0.5),
+        equal source, equal threat_type, a common tag, or a related_domain /
+        related_hashes link. A pair sharing none of a set of blocks scores at
+        most the weight of the other components, so any set whose weight
+        exceeds ``1 - similarity_threshold`` covers every correlated pair. The
+        cheapest such set is used; if none beats all pairs, all pairs are
+        generated.
+        
+        Pairs are generated one IOC at a time from the block indexes (each
+        IOC's partners after it, sorted), so memory grows with the block
+        size rather than with the number of pairs.
+        
+        Args:
+            iocs: List of IOC dictionaries
+            indexed: Positions of IOCs with an ioc_id, ascending
+            block_size: Pairs per yielded block (a block may exceed it by one IOC's partners)
+            
+        Yields:
+            Arrays of (i, j) positions with i < j, in ascending pair order
+        """
+        total = len(indexed) * (len(indexed) - 1) // 2
+        blocks = {
+            'temporal': self._temporal_block(iocs, indexed),
+            'source': self._value_block(iocs, indexed, 'source'),
+            'threat_type': self._value_block(iocs, indexed, 'threat_type'),
+            'tags': self._tag_block(iocs, indexed),
+            'relationship': self._relationship_block(iocs, indexed)
+        }
+        
+        budget = 1.0 - self.similarity_threshold + _BOUND_EPSILON
+        best_cost, best_names = total, None
+        for size in range(1, len(blocks) + 1):
+            for names in combinations(blocks, size):
+                if sum(SIMILARITY_WEIGHTS[name] for name in names) <= budget:
+                    continue
+                cost = sum(blocks[name][0] for name in names)
+                if cost < best_cost:
+                    best_cost, best_names = cost, names
+        
+        if best_names is not None:
+            logger.debug(f"Scoring at most {best_cost} of {total} pairs (blocks: {', '.join(best_names)})")
+            partner_lists = [blocks[name][1] for name in best_names]
+        all_ids = np.array(indexed, dtype=np.int64)
+        
+        left, right, pending = [], [], 0
+        for p, i in enumerate(indexed):
+            if best_names is None:
+                partners = all_ids[p + 1:]
+            else:
+                partners = np.unique(np.concatenate([np.asarray(partners_of(i), dtype=np.int64)
+                                                     for partners_of in partner_lists]))
+                partners = partners[partners > i]
+            if not len(partners):
+                continue
+            
+            left.append(np.full(len(partners), i, dtype=np.int64))
+            right.append(partners)
+            pending += len(partners)
+            if pending >= block_size:
+                yield np.concatenate(left), np.concatenate(right)
+                left, right, pending = [], [], 0
+        
+        if pending:
+            yield np.concatenate(left), np.concatenate(right)
+    
+    def _temporal_block(self, iocs: List[Dict], indexed: List[int]) -> Block:
+        """Pairs whose first_seen values are within the time window or cannot be compared."""
+        naive, aware, wildcards = [], [], []
+        seen_at = {}
+        for i in indexed:
+            dt = _parse_first_seen(iocs[i])
+            if dt is None:
+                wildcards.append(i)
+            elif dt.tzinfo is None:
+                seen_at[i] = (True, (dt - _EPOCH).total_seconds())
+                naive.append((seen_at[i][1], i))
+            else:
+                seen_at[i] = (False, dt.timestamp())
+                aware.append((seen_at[i][1], i))
+        naive.sort()
+        aware.sort()
+        window = self.time_window_hours * 3600 + _WINDOW_SLACK_SECONDS
+        
+        def window_cost(entries):
+            times = [t for t, _ in entries]
+            return sum(bisect_right(times, t + window) - p - 1 for p, t in enumerate(times))
+        
+        def columns(entries):
+            return (np.array([t for t, _ in entries], dtype=np.float64),
+                    np.array([i for _, i in entries], dtype=np.int64))
+        
+        naive_times, naive_ids = columns(naive)
+        aware_times, aware_ids = columns(aware)
+        wildcard_ids = np.array(wildcards, dtype=np.int64)
+        all_ids = np.array(indexed, dtype=np.int64)
+        
+        def partners(i):
+            if i not in seen_at:
+                return all_ids
+            is_naive, t = seen_at[i]
+            times, ids, other = ((naive_times, naive_ids, aware_ids) if is_naive
+                                 else (aware_times, aware_ids, naive_ids))
+            lo = np.searchsorted(times, t - window, side='left')
+            hi = np.searchsorted(times, t + window, side='right')
+            # Subtracting naive and aware datetimes fails, which also scores 0.5
+            return np.concatenate([ids[lo:hi], other, wildcard_ids])
+        
+        cost = (window_cost(naive) + window_cost(aware) + len(naive) * len(aware) +
+                len(wildcards) * len(indexed))
+        return cost, partners
+    
+    def _value_block(self, iocs: List[Dict], indexed: List[int], field: str) -> Block:
+        """Pairs with equal values of a field."""
+        groups = defaultdict(list)
+        value_of = {}
+        wildcards = []
+        for i in indexed:
+            value = iocs[i].get(field)
+            try:
+                groups[value].append(i)
+            except TypeError:
+                wildcards.append(i)
+                continue
+            value_of[i] = value
+        
+        def partners(i):
+            if i not in value_of:
+                return indexed
+            return groups[value_of[i]] + wildcards
+        
+        return _group_cost(groups.values()) + len(wildcards) * len(indexed), partners
+    
+    def _tag_block(self, iocs: List[Dict], indexed: List[int]) -> Block:
+        """Pairs sharing at least one tag (inverted index on tags)."""
+        postings = defaultdict(list)
+        for i in indexed:
+            for tag in set(iocs[i].get('tags', [])):
+                postings[tag].append(i)
+        
+        def partners(i):
+            return [j for tag in set(iocs[i].get('tags', [])) for j in postings[tag]]
+        
+        return _group_cost(postings.values()), partners
+    
+    def _relationship_block(self, iocs: List[Dict], indexed: List[int]) -> Block:
+        """Pairs linked by related_domain or related_hashes metadata."""
+        by_value = defaultdict(list)
+        for i in indexed:
+            by_value[str(iocs[i].get('ioc_value', '')).lower()].append(i)
+        
+        linked = defaultdict(set)
+        for i in indexed:
+            ioc_type = iocs[i].get('ioc_type', '')
+            metadata = _metadata(iocs[i])
+            if ioc_type in ('domain', 'ip'):
+                related = [metadata.get('related_domain')]
+            elif ioc_type == 'hash':
+                related = _related_hashes(metadata)
+            else:
                 continue
             
-            for j, ioc2 in enumerate(iocs[i+1:], start=i+1):
-                ioc2_id = ioc2.get('ioc_id', '')
-                if not ioc2_id:
+            for value in related:
+                if not isinstance(value, str):
                     continue
-                
-                # Calculate similarity
-                similarity = self._calculate_similarity(ioc1, ioc2)
-                
-                if similarity >= self.similarity_threshold:
-                    graph.add_edge(ioc1_id, ioc2_id, similarity=similarity, weight=similarity)
+                for j in by_value.get(value, []):
+                    if j != i:
+                        linked[i].add(j)
+                        linked[j].add(i)
         
-        return graph
+        cost = sum(len(partners) for partners in linked.values()) // 2
+        return cost, lambda i: list(linked.get(i, ()))
     
     def _calculate_similarity(self, ioc1: Dict, ioc2: Dict) -> float:
         """
@@ -128,26 +384,26 @@ class ThreatCorrelationEngine:
         
         # Temporal similarity (same time window)
         time_sim = self._temporal_similarity(ioc1, ioc2)
-        similarity += 0.3 * time_sim
+        similarity += SIMILARITY_WEIGHTS['temporal'] * time_sim
         
         # Source similarity (same source)
         source_sim = 1.0 if ioc1.get('source') == ioc2.get('source') else 0.0
-        similarity += 0.2 * source_sim
+        similarity += SIMILARITY_WEIGHTS['source'] * source_sim
         
         # Threat type similarity
         threat_sim = 1.0 if ioc1.get('threat_type') == ioc2.get('threat_type') else 0.0
-        similarity += 0.2 * threat_sim
+        similarity += SIMILARITY_WEIGHTS['threat_type'] * threat_sim
         
         # Tag overlap
         tags1 = set(ioc1.get('tags', []))
         tags2 = set(ioc2.get('tags', []))
         if tags1 or tags2:
             tag_sim = len(tags1 & tags2) / len(tags1 | tags2) if (tags1 | tags2) else 0.0
-            similarity += 0.2 * tag_sim
+            similarity += SIMILARITY_WEIGHTS['tags'] * tag_sim
         
         # Domain/IP relationship
         relationship_sim = self._relationship_similarity(ioc1, ioc2)
-        similarity += 0.1 * relationship_sim
+        similarity += SIMILARITY_WEIGHTS['relationship'] * relationship_sim
         
         return min(similarity, 1.0)
     
@@ -177,8 +433,8 @@ class ThreatCorrelationEngine:
         # Domain-IP relationship (simplified - would need DNS lookups in production)
         if (type1 == 'domain' and type2 == 'ip') or (type1 == 'ip' and type2 == 'domain'):
             # Check if IP is mentioned in metadata
-            metadata1 = ioc1.get('metadata', {})
-            metadata2 = ioc2.get('metadata', {})
+            metadata1 = _metadata(ioc1)
+            metadata2 = _metadata(ioc2)
             
             if 'related_domain' in metadata1 and metadata1['related_domain'] == value2:
                 return 1.0
@@ -187,13 +443,10 @@ class ThreatCorrelationEngine:
         
         # Hash relationships
         if type1 == 'hash' and type2 == 'hash':
-            metadata1 = ioc1.get('metadata', {})
-            metadata2 = ioc2.get('metadata', {})
-            
-            related1 = metadata1.get('related_hashes', {})
-            related2 = metadata2.get('related_hashes', {})
+            related1 = _related_hashes(_metadata(ioc1))
+            related2 = _related_hashes(_metadata(ioc2))
             
-            if value1 in related2.values() or value2 in related1.values():
+            if value1 in related2 or value2 in related1:
                 return 1.0
         
         return 0.0
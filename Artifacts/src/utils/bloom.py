@@ -0,0 +1,440 @@
+"""Bloom filter over known IOC IDs for fast negative membership checks"""
+
+import os
+import math
+import time
+import struct
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Any
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOOM_FILE = os.path.join('data', 'state', 'ioc_bloom.bin')
+
+_MAGIC = b'IOCB'
+_VERSION = 2
+_HEADER = struct.Struct('<4sBQQQdd')
+# Version 1 files carry no build time
+_HEADER_V1 = struct.Struct('<4sBQQQd')
+_MASK64 = (1 << 64) - 1
+
+# IDs added this long before a rebuild started are replayed into the new filter,
+# covering documents the rebuild scan could not see yet (index refresh lag)
+_REPLAY_WINDOW = 300.0
+
+
+def _hash_pair(ioc_id: str):
+    """Two 64-bit hashes of an IOC ID for double hashing."""
+    try:
+        digest = bytes.fromhex(ioc_id)
+        if len(digest) < 16:
+            raise ValueError
+    except (ValueError, TypeError):
+        # Not a SHA-256 hex ID, hash it first
+        digest = hashlib.sha256(str(ioc_id).encode()).digest()
+    h1, h2 = struct.unpack_from('<QQ', digest)
+    return h1, h2 | 1
+
+
+class BloomFilter:
+    """
+    Bloom filter keyed by IOC ID.
+    
+    IOC IDs are already SHA-256 digests, so the filter derives its bit
+    positions from the ID itself (double hashing on two 64-bit words)
+    instead of hashing again.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Initialize Bloom filter.
+        
+        Args:
+            capacity: Expected number of IOC IDs
+            error_rate: Target false-positive rate at capacity
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        
+        capacity = max(1, int(capacity))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        # Epoch seconds as of which the filter holds every indexed ID (set by whoever builds it)
+        self.built_at: Optional[float] = None
+    
+    def _positions(self, ioc_id: str) -> Iterator[int]:
+        h1, h2 = _hash_pair(ioc_id)
+        for i in range(self.num_hashes):
+            yield ((h1 + i * h2) & _MASK64) % self.num_bits
+    
+    def add(self, ioc_id: str):
+        """Add an IOC ID."""
+        bits = self.bits
+        for position in self._positions(ioc_id):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def add_many(self, ioc_ids: Iterable[str], batch_size: int = 100000) -> int:
+        """
+        Add IOC IDs in vectorized batches.
+        
+        Args:
+            ioc_ids: IOC IDs to add
+            batch_size: IDs hashed per NumPy batch
+            
+        Returns:
+            Number of IDs added
+        """
+        added = 0
+        batch = []
+        for ioc_id in ioc_ids:
+            batch.append(_hash_pair(ioc_id))
+            if len(batch) >= batch_size:
+                added += self._add_hashes(batch)
+                batch = []
+        if batch:
+            added += self._add_hashes(batch)
+        return added
+    
+    def _add_hashes(self, hashes) -> int:
+        pairs = np.array(hashes, dtype=np.uint64)
+        h1, h2 = pairs[:, 0], pairs[:, 1]
+        num_bits = np.uint64(self.num_bits)
+        
+        # uint64 arithmetic wraps like the & _MASK64 in _positions
+        for i in range(self.num_hashes):
+            positions = (h1 + np.uint64(i) * h2) % num_bits
+            np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.intp),
+                             np.left_shift(np.uint64(1), positions & np.uint64(7)).astype(np.uint8))
+        
+        self.count += len(hashes)
+        return len(hashes)
+    
+    def __contains__(self, ioc_id: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(ioc_id))
+    
+    @property
+    def estimated_error_rate(self) -> float:
+        """False-positive rate expected at the current fill."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the filter."""
+        header = _HEADER.pack(_MAGIC, _VERSION, self.num_bits, self.num_hashes, self.count, self.error_rate,
+                              self.built_at or 0.0)
+        return header + self.bits.tobytes()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        """
+        Deserialize a filter written by ``to_bytes``.
+        
+        Raises:
+            ValueError: If the data is not a serialized filter
+        """
+        if len(data) < _HEADER_V1.size:
+            raise ValueError("Truncated Bloom filter data")
+        
+        magic, version = data[:4], data[4]
+        if magic != _MAGIC or version not in (1, _VERSION):
+            raise ValueError("Unsupported Bloom filter format")
+        
+        header = _HEADER if version == _VERSION else _HEADER_V1
+        if len(data) < header.size:
+            raise ValueError("Truncated Bloom filter data")
+        _, _, num_bits, num_hashes, count, error_rate, *built_at = header.unpack_from(data)
+        
+        bits = np.frombuffer(data, dtype=np.uint8, offset=header.size).copy()
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("Truncated Bloom filter data")
+        
+        bloom = cls.__new__(cls)
+        bloom.capacity = max(1, count)
+        bloom.error_rate = error_rate
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        bloom.bits = bits
+        bloom.built_at = (built_at[0] or None) if built_at else None
+        return bloom
+
+
+class IOCBloomIndex:
+    """
+    Periodically rebuilt Bloom filter over every IOC ID in Elasticsearch.
+    
+    Lookups consult the filter first and only go to the backend when the ID
+    may be present. IDs indexed by this process are added as they are
+    written, but IOCs written by other processes (other workers, scripts)
+    only become visible with the next rebuild. A negative answer is
+    therefore only trusted while the filter is at most ``rebuild_interval``
+    seconds old (5 minutes by default); past that, and until a filter has
+    been built or loaded, every lookup goes to the backend.
+    """
+    
+    def __init__(self,
+                 path: Optional[str] = None,
+                 error_rate: Optional[float] = None,
+                 rebuild_interval: Optional[float] = None):
+        """
+        Initialize IOC Bloom index.
+        
+        Args:
+            path: Serialized filter file (defaults to IOC_BLOOM_FILE env var or data/state/ioc_bloom.bin)
+            error_rate: Target false-positive rate (defaults to IOC_BLOOM_ERROR_RATE env var or 0.001)
+            rebuild_interval: Seconds between rebuilds, which is also the longest writes from
+                other processes can go unseen (defaults to IOC_BLOOM_REBUILD_SECONDS env var or 300)
+        """
+        self.path = path or os.getenv('IOC_BLOOM_FILE', DEFAULT_BLOOM_FILE)
+        self.error_rate = error_rate or float(os.getenv('IOC_BLOOM_ERROR_RATE', '0.001'))
+        self.rebuild_interval = rebuild_interval or float(os.getenv('IOC_BLOOM_REBUILD_SECONDS', '300'))
+        
+        self._filter: Optional[BloomFilter] = None
+        self._built_at: Optional[float] = None
+        self._last_attempt: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._recent = deque()
+        self._stats = {'checks': 0, 'avoided': 0, 'backend_lookups': 0, 'false_positives': 0}
+        
+        self.load()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether a filter is loaded."""
+        return self._filter is not None
+    
+    @property
+    def fresh(self) -> bool:
+        """Whether the filter is recent enough for its negative answers to be trusted."""
+        built_at = self._built_at
+        return built_at is not None and time.time() - built_at <= self.rebuild_interval
+    
+    def might_contain(self, ioc_id: str) -> bool:
+        """
+        Check whether an IOC ID may be known.
+        
+        Args:
+            ioc_id: IOC ID to check
+            
+        Returns:
+            False if the ID is definitely unknown (the backend can be skipped)
+        """
+        bloom = self._filter
+        if bloom is None or not self.fresh:
+            return True
+        
+        maybe = ioc_id in bloom
+        with self._lock:
+            self._stats['checks'] += 1
+            if not maybe:
+                self._stats['avoided'] += 1
+        return maybe
+    
+    def record_lookup(self, found: bool):
+        """
+        Record the outcome of a backend lookup the filter let through.
+        
+        Args:
+            found: Whether the backend found the IOC
+        """
+        if self._filter is None:
+            return
+        
+        with self._lock:
+            self._stats['backend_lookups'] += 1
+            if not found:
+                self._stats['false_positives'] += 1
+    
+    def add(self, ioc_id: str):
+        """Add a newly indexed IOC ID so it is visible before the next rebuild."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(ioc_id)
+            self._recent.append((time.time(), ioc_id))
+            
+            cutoff = time.time() - _REPLAY_WINDOW
+            while self._recent and (self._recent[0][0] < cutoff and not self._rebuilding):
+                self._recent.popleft()
+    
+    def track(self, iocs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Pass IOCs through while adding their IDs to the filter.
+        
+        Args:
+            iocs: IOC dictionaries about to be indexed
+            
+        Yields:
+            The same IOC dictionaries
+        """
+        for ioc in iocs:
+            ioc_id = ioc.get('ioc_id')
+            if ioc_id:
+                self.add(ioc_id)
+            yield ioc
+    
+    @property
+    def rebuild_due(self) -> bool:
+        """Whether the filter is missing or older than the rebuild interval."""
+        if self._rebuilding:
+            return False
+        
+        now = time.time()
+        # Do not hammer an unavailable backend: retry failed rebuilds at most every 5 minutes
+        if self._last_attempt is not None and now - self._last_attempt < min(self.rebuild_interval, 300.0):
+            return False
+        return self._built_at is None or now - self._built_at > self.rebuild_interval
+    
+    def rebuild(self, es_client) -> int:
+        """
+        Rebuild the filter from every IOC ID in Elasticsearch and save it.
+        
+        Args:
+            es_client: ElasticsearchClient to read IOC IDs from
+            
+        Returns:
+            Number of IDs in the new filter
+        """
+        with self._lock:
+            if self._rebuilding:
+                return self._filter.count if self._filter else 0
+            self._rebuilding = True
+            self._last_attempt = time.time()
+        
+        started = time.time()
+        try:
+            capacity = es_client.count_iocs()
+            # Leave headroom for IOCs added before the next rebuild
+            bloom = BloomFilter(capacity=int(capacity * 1.2) + 1000, error_rate=self.error_rate)
+            bloom.add_many(es_client.iter_ioc_ids())
+            
+            with self._lock:
+                cutoff = started - _REPLAY_WINDOW
+                for added_at, ioc_id in self._recent:
+                    if added_at >= cutoff:
+                        bloom.add(ioc_id)
+                # IDs written elsewhere after the scan started may be missing
+                bloom.built_at = started
+                self._filter = bloom
+                self._built_at = started
+            
+            self.save()
+            logger.info(f"Rebuilt IOC Bloom filter with {bloom.count} IDs in {time.time() - started:.1f}s")
+            return bloom.count
+        finally:
+            with self._lock:
+                self._rebuilding = False
+    
+    def rebuild_in_background(self, es_client) -> bool:
+        """
+        Start a rebuild in a daemon thread unless one is already running.
+        
+        Returns:
+            True if a rebuild was started
+        """
+        if self._rebuilding:
+            return False
+        
+        def run():
+            try:
+                self.rebuild(es_client)
+            except Exception as e:
+                logger.error(f"Error rebuilding IOC Bloom filter: {e}")
+        
+        threading.Thread(target=run, name='ioc-bloom-rebuild', daemon=True).start()
+        return True
+    
+    def save(self):
+        """Atomically write the filter to disk."""
+        bloom = self._filter
+        if bloom is None:
+            return
+        
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(bloom.to_bytes())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error saving IOC Bloom filter to {self.path}: {e}")
+    
+    def load(self) -> bool:
+        """
+        Load the filter saved by a previous rebuild.
+        
+        Returns:
+            True if a filter was loaded
+        """
+        if not os.path.exists(self.path):
+            return False
+        
+        try:
+            with open(self.path, 'rb') as f:
+                bloom = BloomFilter.from_bytes(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable IOC Bloom filter {self.path}: {e}")
+            return False
+        
+        with self._lock:
+            self._filter = bloom
+            # The build time saved with the filter, not the file's mtime (which copying
+            # or touching the file changes); files without one are treated as stale
+            self._built_at = bloom.built_at
+        logger.info(f"Loaded IOC Bloom filter with {bloom.count} IDs")
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get filter statistics.
+        
+        Returns:
+            Dictionary with filter size, fill and the number of backend
+            round-trips it avoided
+        """
+        bloom = self._filter
+        with self._lock:
+            stats = dict(self._stats)
+        
+        stats.update({
+            'ready': bloom is not None,
+            'rebuilding': self._rebuilding,
+            'fresh': self.fresh,
+            'target_error_rate': self.error_rate,
+            'built_at': datetime.utcfromtimestamp(self._built_at).isoformat() + 'Z' if self._built_at else None
+        })
+        if bloom is not None:
+            stats.update({
+                'ids': bloom.count,
+                'capacity': bloom.capacity,
+                'bits': bloom.num_bits,
+                'hashes': bloom.num_hashes,
+                'estimated_error_rate': bloom.estimated_error_rate
+            })
+        return stats
+
+
+_ioc_bloom_index: Optional[IOCBloomIndex] = None
+_ioc_bloom_index_lock = threading.Lock()
+
+
+def get_ioc_bloom_index() -> IOCBloomIndex:
+    """Get the process-wide IOC Bloom index, loading the saved filter on first use."""
+    global _ioc_bloom_index
+    with _ioc_bloom_index_lock:
+        if _ioc_bloom_index is None:
+            _ioc_bloom_index = IOCBloomIndex()
+        return _ioc_bloom_index
@@ -1,20 +1,558 @@
 """Elasticsearch integration for IOC indexing"""
 
 import os
-from typing import List, Dict, Optional
+import json
+import time
+import base64
+import binascii
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable, Iterator, Callable, Tuple
 from datetime import datetime
 import logging
 
 try:
-    from elasticsearch import Elasticsearch
-    from elasticsearch.helpers import bulk
+    from elasticsearch import Elasticsearch, BadRequestError, NotFoundError
+    from elasticsearch.helpers import streaming_bulk, scan
     ELASTICSEARCH_AVAILABLE = True
 except ImportError:
     ELASTICSEARCH_AVAILABLE = False
     logging.warning("Elasticsearch not available. Install with: pip install elasticsearch")
 
+from ..collectors.base_collector import BaseCollector
+
 logger = logging.getLogger(__name__)
 
+INDEX_NAME = 'iocs'
+
+# Time-partitioned layout (ELASTICSEARCH_PARTITIONED=true): one iocs-YYYY.MM
+# index per month of first_seen, created from an index template. Searches go
+# through the read alias (every partition); IOCs without a usable first_seen
+# go to the current month's index through the write alias.
+PARTITION_PREFIX = 'iocs-'
+PARTITION_PATTERN = 'iocs-*'
+READ_ALIAS = 'iocs-read'
+WRITE_ALIAS = 'iocs-write'
+TEMPLATE_NAME = 'iocs'
+
+IOC_MAPPINGS = {
+    "properties": {
+        "ioc_value": {
+            "type": "keyword",
+            "fields": {
+                # Substring matches (*term*) without scanning every term
+                "wildcard": {"type": "wildcard"},
+                # Domain suffixes: mail.evil.com is indexed as mail.evil.com, evil.com, com
+                "domain": {
+                    "type": "text",
+                    "analyzer": "domain_suffix",
+                    "search_analyzer": "lowercase_keyword"
+                }
+            }
+        },
+        "ioc_type": {"type": "keyword"},
+        "ioc_id": {"type": "keyword"},
+        "source": {"type": "keyword"},
+        "threat_type": {"type": "keyword"},
+        "first_seen": {"type": "date"},
+        "last_seen": {"type": "date"},
+        "confidence": {"type": "float"},
+        "tags": {"type": "keyword"},
+        "description": {"type": "text"},
+        "metadata": {
+            "type": "object",
+            "enabled": True,
+            "properties": {
+                "description": {"type": "text"}
+            }
+        },
+        "mitre_tactics": {"type": "keyword"},
+        "threat_actors": {"type": "keyword"},
+        "related_iocs": {"type": "keyword"}
+    }
+}
+
+IOC_SETTINGS = {
+    "number_of_shards": 1,
+    "number_of_replicas": 0,
+    "refresh_interval": "5s",
+    "analysis": {
+        "tokenizer": {
+            "domain_suffix": {"type": "path_hierarchy", "delimiter": ".", "reverse": True}
+        },
+        "analyzer": {
+            "domain_suffix": {"type": "custom", "tokenizer": "domain_suffix", "filter": ["lowercase"]},
+            "lowercase_keyword": {"type": "custom", "tokenizer": "keyword", "filter": ["lowercase"]}
+        }
+    }
+}
+
+# Fields highlighted in full-text search results
+SEARCH_HIGHLIGHT_FIELDS = ('ioc_value', 'ioc_value.domain', 'description', 'metadata.description')
+
+# Bulk indexing defaults (overridable with the ES_BULK_* env vars)
+BULK_CHUNK_SIZE = 500
+BULK_CHUNK_BYTES = 10 * 1024 * 1024
+BULK_THREADS = 4
+BULK_MAX_RETRIES = 5
+
+# Indicators resolved per _mget / msearch request by lookup_many
+LOOKUP_CHUNK_SIZE = 1000
+
+# How long a point-in-time stays open between two pages of a cursor
+PIT_KEEP_ALIVE = '2m'
+
+# Calendar intervals accepted for the threat stats histogram
+STATS_INTERVALS = ('minute', 'hour', 'day', 'week', 'month', 'quarter', 'year')
+
+# Held while an index is in bulk-load mode, so two loads in one process cannot overlap
+_bulk_load_lock = threading.Lock()
+
+
+def connection_config(host: Optional[str] = None,
+                      port: int = 9200,
+                      username: Optional[str] = None,
+                      password: Optional[str] = None,
+                      pool_size: Optional[int] = None) -> Dict:
+    """
+    Build client keyword arguments shared by the sync and async clients.
+    
+    Args:
+        host: Elasticsearch host (defaults to ELASTICSEARCH_HOST env var or localhost)
+        port: Elasticsearch port
+        username: Username (optional)
+        password: Password (optional)
+        pool_size: Keep-alive connections per node (defaults to ELASTICSEARCH_POOL_SIZE
+            env var or 10)
+            
+    Returns:
+        Keyword arguments for Elasticsearch / AsyncElasticsearch
+    """
+    host = host or os.getenv('ELASTICSEARCH_HOST', 'localhost')
+    if '://' not in host:
+        # elasticsearch-py 8 requires a scheme in the node URL
+        host = f"http://{host}"
+    
+    config = {
+        'hosts': [f"{host}:{port}"],
+        'request_timeout': 30,
+        'connections_per_node': pool_size or int(os.getenv('ELASTICSEARCH_POOL_SIZE', '10'))
+    }
+    
+    if username or password:
+        config['http_auth'] = (username or os.getenv('ELASTICSEARCH_USER', ''),
+                              password or os.getenv('ELASTICSEARCH_PASSWORD', ''))
+    
+    return config
+
+
+def build_ioc_query(ioc_value: str, ioc_type: Optional[str] = None) -> Dict:
+    """Query matching an IOC by exact value (and optionally type)."""
+    query = {
+        "query": {
+            "bool": {
+                "must": [
+                    {"term": {"ioc_value": ioc_value}}
+                ]
+            }
+        }
+    }
+        
+    if ioc_type:
+        query["query"]["bool"]["must"].append({"term": {"ioc_type": ioc_type}})
+    
+    return query
+
+
+def build_threats_query(threat_type: Optional[str] = None,
+                        min_confidence: float = 0.0,
+                        limit: int = 100) -> Dict:
+    """Query for threats above a confidence, most confident first."""
+    query = {
+        "query": {
+            "bool": {
+                "must": [
+                    {"range": {"confidence": {"gte": min_confidence}}}
+                ]
+            }
+        },
+        "sort": [{"confidence": {"order": "desc"}}],
+        "size": limit
+    }
+        
+    if threat_type:
+        query["query"]["bool"]["must"].append({"term": {"threat_type": threat_type}})
+    
+    return query
+
+
+def build_time_range_query(start_time,
+                           end_time,
+                           limit: int = 100,
+                           threat_type: Optional[str] = None,
+                           min_confidence: float = 0.0) -> Dict:
+    """Query for IOCs first seen within a time range, newest first."""
+    query = {
+        "query": {
+            "bool": {
+                "must": [
+                    {
+                        "range": {
+                            "first_seen": {
+                                "gte": start_time.isoformat(),
+                                "lte": end_time.isoformat()
+                            }
+                        }
+                    }
+                ]
+            }
+        },
+        "sort": [{"first_seen": {"order": "desc"}}],
+        "size": limit
+    }
+    
+    if min_confidence:
+        query["query"]["bool"]["must"].append({"range": {"confidence": {"gte": min_confidence}}})
+    if threat_type:
+        query["query"]["bool"]["must"].append({"term": {"threat_type": threat_type}})
+    
+    return query
+
+
+def build_text_search_query(text: str,
+                            ioc_type: Optional[str] = None,
+                            min_confidence: float = 0.0,
+                            limit: int = 100) -> Dict:
+    """
+    Full-text IOC query, best matches first, with highlighting.
+    
+    An IOC matches when its value equals ``text``, contains it, ends with it
+    as a domain suffix, or its description matches it.
+    """
+    escaped = text.replace('\\', '\\\\').replace('*', '\\*').replace('?', '\\?')
+    
+    query = {
+        "query": {
+            "bool": {
+                "filter": [
+                    {"range": {"confidence": {"gte": min_confidence}}}
+                ],
+                "should": [
+                    {"term": {"ioc_value": {"value": text, "boost": 10}}},
+                    {"term": {"ioc_value.domain": {"value": text.lower(), "boost": 5}}},
+                    {"wildcard": {"ioc_value.wildcard": {"value": f"*{escaped}*", "case_insensitive": True}}},
+                    {"multi_match": {"query": text, "fields": ["description", "metadata.description"]}}
+                ],
+                "minimum_should_match": 1
+            }
+        },
+        "sort": [{"_score": {"order": "desc"}}, {"confidence": {"order": "desc"}}],
+        "highlight": {"fields": {field: {} for field in SEARCH_HIGHLIGHT_FIELDS}},
+        "size": limit
+    }
+    
+    if ioc_type:
+        query["query"]["bool"]["filter"].append({"term": {"ioc_type": ioc_type}})
+    
+    return query
+
+
+def build_stats_query(min_confidence: float = 0.0,
+                      interval: str = 'day',
+                      max_terms: int = 50) -> Dict:
+    """
+    Aggregation-only query (no hits) for threat statistics.
+    
+    Raises:
+        ValueError: If ``interval`` is not one of STATS_INTERVALS
+    """
+    if interval not in STATS_INTERVALS:
+        raise ValueError(f"Invalid interval {interval!r}, expected one of {', '.join(STATS_INTERVALS)}")
+    
+    return {
+        "size": 0,
+        "track_total_hits": True,
+        "query": {
+            "range": {"confidence": {"gte": min_confidence}}
+        },
+        "aggs": {
+            "by_threat_type": {"terms": {"field": "threat_type", "size": max_terms}},
+            "by_source": {"terms": {"field": "source", "size": max_terms}},
+            "over_time": {
+                "date_histogram": {
+                    "field": "first_seen",
+                    "calendar_interval": interval,
+                    "min_doc_count": 1
+                }
+            },
+            "confidence": {"percentiles": {"field": "confidence", "percents": [50, 90, 99]}}
+        }
+    }
+
+
+def parse_stats(response: Dict) -> Dict:
+    """Flatten the aggregations of a ``build_stats_query`` response."""
+    aggs = response.get('aggregations', {})
+    
+    def buckets(name):
+        return {b['key']: b['doc_count'] for b in aggs.get(name, {}).get('buckets', [])}
+    
+    total = response.get('hits', {}).get('total', 0)
+    return {
+        "total_threats": total.get('value', 0) if isinstance(total, dict) else total,
+        "by_threat_type": buckets('by_threat_type'),
+        "by_source": buckets('by_source'),
+        "over_time": {b.get('key_as_string', b['key']): b['doc_count']
+                      for b in aggs.get('over_time', {}).get('buckets', [])},
+        "confidence_percentiles": aggs.get('confidence', {}).get('values', {})
+    }
+
+
+class CursorExpiredError(ValueError):
+    """Cursor whose point-in-time has expired or been closed."""
+
+
+def encode_cursor(pit_id: str, search_after: List) -> str:
+    """Opaque page cursor holding a point-in-time ID and the last hit's sort values."""
+    payload = json.dumps({'pit': pit_id, 'after': search_after}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List]:
+    """
+    Decode a cursor made by ``encode_cursor``.
+    
+    Returns:
+        Tuple of (point-in-time ID, search_after values)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        pit_id, search_after = payload['pit'], payload['after']
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    
+    if not isinstance(pit_id, str) or not isinstance(search_after, list):
+        raise ValueError("Invalid cursor")
+    return pit_id, search_after
+
+
+def cursor_error(error: Exception) -> Exception:
+    """
+    Error to raise when resuming from a cursor failed.
+    
+    Elasticsearch answers 404 for a point-in-time that expired or was closed
+    and 400 for one it cannot parse; any other error is passed through.
+    """
+    if ELASTICSEARCH_AVAILABLE and isinstance(error, NotFoundError):
+        return CursorExpiredError("Cursor has expired; fetch the first page again")
+    if ELASTICSEARCH_AVAILABLE and isinstance(error, BadRequestError):
+        return ValueError("Invalid cursor")
+    return error
+
+
+def build_page_query(query: Dict,
+                     page_size: int,
+                     pit_id: Optional[str],
+                     search_after: Optional[List] = None,
+                     keep_alive: str = PIT_KEEP_ALIVE) -> Dict:
+    """
+    Turn a search query into one page of a point-in-time, search_after walk.
+    
+    ``_shard_doc`` is appended to the sort as a unique tiebreaker, so pages
+    never skip or repeat hits with equal sort values.
+    """
+    body = dict(query)
+    body['size'] = page_size
+    body['sort'] = list(query.get('sort', [])) + [{"_shard_doc": "asc"}]
+    body['pit'] = {"id": pit_id, "keep_alive": keep_alive}
+    body['track_total_hits'] = False
+    if search_after:
+        body['search_after'] = search_after
+    return body
+
+
+def page_result(response: Dict, page_size: int, pit_id: str) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Documents of one page and the cursor of the next.
+    
+    Returns:
+        Tuple of (documents, next cursor or None on the last page)
+    """
+    hits = response.get('hits', {}).get('hits', [])
+    if len(hits) < page_size:
+        return [hit_document(hit) for hit in hits], None
+    # Elasticsearch may hand back a new PIT ID; always continue with the latest
+    return [hit_document(hit) for hit in hits], encode_cursor(response.get('pit_id', pit_id), hits[-1]['sort'])
+
+
+def plan_lookups(indicators: List[Dict],
+                 chunk_size: int = LOOKUP_CHUNK_SIZE) -> Tuple[List[List[Tuple[int, str]]], List[List[int]]]:
+    """
+    Split indicators into ID lookups (typed) and value searches (untyped).
+    
+    Args:
+        indicators: Dictionaries with ``ioc_value`` and optional ``ioc_type`` (aliases allowed)
+        chunk_size: Indicators per request
+        
+    Returns:
+        Tuple of (chunks of (position, ioc_id) pairs, chunks of positions to search by value)
+    """
+    # IDs are derived from the normalized type, so aliases (ipv4, sha256, ...) must be mapped first
+    typed = [(n, BaseCollector._ioc_id(BaseCollector._normalize_type(i['ioc_type']), i.get('ioc_value', '')))
+             for n, i in enumerate(indicators) if i.get('ioc_type')]
+    untyped = [n for n, i in enumerate(indicators) if not i.get('ioc_type')]
+    return ([typed[i:i + chunk_size] for i in range(0, len(typed), chunk_size)],
+            [untyped[i:i + chunk_size] for i in range(0, len(untyped), chunk_size)])
+
+
+def build_ids_query(ioc_ids: List[str]) -> Dict:
+    """Query fetching documents by ID (used where _mget cannot span partitions)."""
+    return {"query": {"ids": {"values": ioc_ids}}, "size": len(ioc_ids)}
+
+
+def lookup_results(indicators: List[Dict]) -> List[Dict]:
+    """Empty lookup results aligned with ``indicators``."""
+    return [{'ioc_value': i.get('ioc_value', ''), 'ioc_type': i.get('ioc_type'), 'found': False, 'matches': []}
+            for i in indicators]
+
+
+def partitioning_enabled() -> bool:
+    """Whether IOCs are stored in monthly partitions (ELASTICSEARCH_PARTITIONED env var)."""
+    return os.getenv('ELASTICSEARCH_PARTITIONED', 'false').lower() in ('1', 'true', 'yes')
+
+
+def partition_index(timestamp) -> Optional[str]:
+    """
+    Monthly partition holding IOCs first seen at ``timestamp``.
+    
+    Args:
+        timestamp: Datetime or ISO 8601 string
+        
+    Returns:
+        Index name such as ``iocs-2024.05``, or None if the timestamp is unusable
+    """
+    if isinstance(timestamp, datetime):
+        return f"{PARTITION_PREFIX}{timestamp.year:04d}.{timestamp.month:02d}"
+    
+    if isinstance(timestamp, str) and len(timestamp) >= 7 and timestamp[4] == '-':
+        year, month = timestamp[:4], timestamp[5:7]
+        if year.isdigit() and month.isdigit() and 1 <= int(month) <= 12:
+            return f"{PARTITION_PREFIX}{year}.{month}"
+    
+    return None
+
+
+def partitions_for_range(start_time: datetime, end_time: datetime) -> List[str]:
+    """
+    Monthly partitions covering a time range.
+    
+    Args:
+        start_time: Start datetime
+        end_time: End datetime
+        
+    Returns:
+        Index names from the month of ``start_time`` to the month of ``end_time``
+    """
+    year, month = start_time.year, start_time.month
+    indices = []
+    while (year, month) <= (end_time.year, end_time.month):
+        indices.append(f"{PARTITION_PREFIX}{year:04d}.{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return indices
+
+
+def write_index(ioc: Dict, partitioned: bool) -> str:
+    """Index (or alias) an IOC is written to."""
+    if not partitioned:
+        return INDEX_NAME
+    return partition_index(ioc.get('first_seen')) or WRITE_ALIAS
+
+
+def stale_copy_actions(response: Dict, targets: Dict[str, str]) -> List[Dict]:
+    """
+    Delete actions for copies of IOCs left behind in another partition.
+    
+    A merge can move an IOC's first_seen into an earlier month, so the same
+    ``_id`` is then written to a different partition than before; without
+    these deletes the old copy would stay searchable next to the new one.
+    
+    Args:
+        response: ``ids`` search over every partition for the IOCs being written
+        targets: Partition each IOC is being written to, by ioc_id
+        
+    Returns:
+        Bulk delete actions for every copy outside its target partition
+    """
+    return [{'_op_type': 'delete', '_index': hit['_index'], '_id': hit['_id']}
+            for hit in response.get('hits', {}).get('hits', [])
+            if hit['_id'] in targets and hit['_index'] != targets[hit['_id']]]
+
+
+def search_index(start_time: datetime, end_time: datetime, partitioned: bool) -> str:
+    """Indices a time-range search has to read."""
+    if not partitioned:
+        return INDEX_NAME
+    return ','.join(partitions_for_range(start_time, end_time))
+
+
+def ioc_action(index_name: str, ioc: Dict) -> Dict:
+    """Bulk index action for an IOC, keyed by its ioc_id."""
+    return {
+        '_index': index_name,
+        '_id': ioc.get('ioc_id', ioc.get('ioc_value', '')),
+        '_source': ioc
+    }
+
+
+def hit_document(hit: Dict) -> Dict:
+    """Document of a search hit, with its highlighted fragments under ``highlight`` if any."""
+    if 'highlight' in hit:
+        return dict(hit['_source'], highlight=hit['highlight'])
+    return hit['_source']
+
+
+def hit_sources(response: Dict) -> List[Dict]:
+    """Documents of a search response."""
+    hits = response.get('hits', {}).get('hits', [])
+    return [hit_document(hit) for hit in hits]
+
+
+def chunk_actions(actions: Iterable[Dict],
+                  chunk_size: int,
+                  max_chunk_bytes: int) -> Iterator[Tuple[List[Dict], int]]:
+    """
+    Group bulk actions into chunks bounded by document count and request size.
+    
+    Args:
+        actions: Bulk actions (consumed lazily)
+        chunk_size: Maximum documents per chunk
+        max_chunk_bytes: Maximum approximate request body size per chunk
+        
+    Yields:
+        Tuples of (actions, approximate body size in bytes)
+    """
+    chunk = []
+    chunk_bytes = 0
+    
+    for action in actions:
+        # Action line + source line, newline-terminated
+        size = len(json.dumps(action['_source'], default=str).encode('utf-8')) + len(action['_id']) + 64
+        if chunk and (len(chunk) >= chunk_size or chunk_bytes + size > max_chunk_bytes):
+            yield chunk, chunk_bytes
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(action)
+        chunk_bytes += size
+    
+    if chunk:
+        yield chunk, chunk_bytes
+
 
 class ElasticsearchClient:
     """Elasticsearch client for IOC indexing"""
@@ -23,7 +561,8 @@ class ElasticsearchClient:
                  host: Optional[str] = None,
                  port: int = 9200,
                  username: Optional[str] = None,
-                 password: Optional[str] = None):
+                 password: Optional[str] = None,
+                 pool_size: Optional[int] = None):
         """
         Initialize Elasticsearch client.
         
@@ -32,32 +571,38 @@ class ElasticsearchClient:
             port: Elasticsearch port
             username: Username (optional)
             password: Password (optional)
+            pool_size: Keep-alive connections per node (defaults to ELASTICSEARCH_POOL_SIZE
+                env var or 10)
         """
         if not ELASTICSEARCH_AVAILABLE:
             raise ImportError("Elasticsearch not installed. Install with: pip install elasticsearch")
         
-        host = host or os.getenv('ELASTICSEARCH_HOST', 'localhost')
-        
-        # Build connection config
-        config = {
-            'hosts': [f"{host}:{port}"],
-            'timeout': 30
-        }
-        
-        if username or password:
-            config['http_auth'] = (username or os.getenv('ELASTICSEARCH_USER', ''),
-                                  password or os.getenv('ELASTICSEARCH_PASSWORD', ''))
-        
-        self.client = Elasticsearch(**config)
-        self.index_name = 'iocs'
+        self.client = Elasticsearch(**connection_config(host, port, username, password, pool_size))
+        self.partitioned = partitioning_enabled()
+        self.index_name = READ_ALIAS if self.partitioned else INDEX_NAME
+    
+    def close(self):
+        """Close all pooled connections."""
+        self.client.close()
     
     def create_index(self, force: bool = False):
         """
         Create IOC index with proper mapping.
         
+        In partitioned mode this installs the index template and creates the
+        current month's partition behind the write alias instead.
+        
         Args:
             force: Force recreate if index exists
         """
+        if self.partitioned:
+            self.ensure_template()
+            if force:
+                logger.warning(f"Deleting existing partitions: {PARTITION_PATTERN}")
+                self.client.indices.delete(index=PARTITION_PATTERN, ignore_unavailable=True)
+            self.rollover()
+            return
+        
         if self.client.indices.exists(index=self.index_name):
             if force:
                 logger.warning(f"Deleting existing index: {self.index_name}")
@@ -68,28 +613,8 @@ class ElasticsearchClient:
         
         # Define index mapping
         mapping = {
-            "mappings": {
-                "properties": {
-                    "ioc_value": {"type": "keyword"},
-                    "ioc_type": {"type": "keyword"},
-                    "ioc_id": {"type": "keyword"},
-                    "source": {"type": "keyword"},
-                    "threat_type": {"type": "keyword"},
-                    "first_seen": {"type": "date"},
-                    "last_seen": {"type": "date"},
-                    "confidence": {"type": "float"},
-                    "tags": {"type": "keyword"},
-                    "metadata": {"type": "object", "enabled": True},
-                    "mitre_tactics": {"type": "keyword"},
-                    "threat_actors": {"type": "keyword"},
-                    "related_iocs": {"type": "keyword"}
-                }
-            },
-            "settings": {
-                "number_of_shards": 1,
-                "number_of_replicas": 0,
-                "refresh_interval": "5s"
-            }
+            "mappings": IOC_MAPPINGS,
+            "settings": IOC_SETTINGS
         }
         
         try:
@@ -100,6 +625,129 @@ class ElasticsearchClient:
             logger.error(f"Error creating index: {e}")
             raise
     
+    def ensure_template(self):
+        """Install (or update) the index template applied to every monthly partition."""
+        try:
+            self.client.indices.put_index_template(
+                name=TEMPLATE_NAME,
+                index_patterns=[PARTITION_PATTERN],
+                template={
+                    "mappings": IOC_MAPPINGS,
+                    "settings": IOC_SETTINGS,
+                    "aliases": {READ_ALIAS: {}}
+                }
+            )
+            logger.info(f"Installed index template: {TEMPLATE_NAME}")
+        except Exception as e:
+            logger.error(f"Error installing index template: {e}")
+            raise
+    
+    def rollover(self, now: Optional[datetime] = None) -> str:
+        """
+        Point the write alias at the partition for the current month.
+        
+        Creates the partition if needed; run it at (or shortly after) the
+        start of every month. Earlier partitions stay behind the read alias.
+        
+        Args:
+            now: Time whose month to roll over to (defaults to now, UTC)
+            
+        Returns:
+            Name of the partition now behind the write alias
+        """
+        index = partition_index(now or datetime.utcnow())
+        
+        try:
+            if not self.client.indices.exists(index=index):
+                # The template adds the mappings and the read alias
+                self.client.indices.create(index=index)
+                logger.info(f"Created partition: {index}")
+            
+            actions = [{"add": {"index": index, "alias": WRITE_ALIAS, "is_write_index": True}}]
+            if self.client.indices.exists_alias(name=WRITE_ALIAS):
+                current = self.client.indices.get_alias(name=WRITE_ALIAS)
+                actions = [
+                    {"remove": {"index": name, "alias": WRITE_ALIAS}}
+                    for name in current if name != index
+                ] + actions
+            
+            self.client.indices.update_aliases(actions=actions)
+            logger.info(f"Write alias {WRITE_ALIAS} now points at {index}")
+            return index
+        except Exception as e:
+            logger.error(f"Error rolling over IOC partitions: {e}")
+            raise
+    
+    @contextmanager
+    def bulk_load(self, force_merge: bool = False, max_num_segments: int = 1):
+        """
+        Tune the index for a large offline ingest for the duration of the block.
+        
+        Refreshes are disabled and replicas dropped while the block runs, so
+        every document is indexed once and segments are not flushed every few
+        seconds. On exit (also on error) each index gets its own previous
+        settings back, is refreshed and, optionally, force-merged. Documents
+        indexed inside the block are not searchable until it exits, so this
+        is meant for re-ingest jobs, not for collection behind the API.
+        
+        Args:
+            force_merge: Force-merge the index after loading
+            max_num_segments: Segments per shard to merge down to
+            
+        Yields:
+            This client
+            
+        Raises:
+            RuntimeError: If a bulk load is already running in this process,
+                or an index already has refreshes disabled (e.g. by a load in
+                another process), whose settings must not be taken as the ones
+                to restore
+        """
+        if not _bulk_load_lock.acquire(blocking=False):
+            raise RuntimeError("A bulk load is already running")
+        
+        try:
+            # Settings per concrete index (every partition behind the alias)
+            previous = {}
+            response = self.client.indices.get_settings(index=self.index_name)
+            for index, settings in response.items():
+                index_settings = settings.get('settings', {}).get('index', {})
+                # None resets a setting to the cluster default
+                previous[index] = {
+                    'refresh_interval': index_settings.get('refresh_interval'),
+                    'number_of_replicas': index_settings.get('number_of_replicas')
+                }
+            
+            disabled = [index for index, settings in previous.items() if str(settings['refresh_interval']) == '-1']
+            if disabled:
+                raise RuntimeError(f"Refresh is already disabled on {', '.join(disabled)}; "
+                                   f"another bulk load may be running")
+            
+            try:
+                for index in previous:
+                    self.client.indices.put_settings(index=index, settings={
+                        'index': {'refresh_interval': '-1', 'number_of_replicas': 0}
+                    })
+                logger.info(f"Bulk-load mode enabled on {self.index_name}")
+                
+                yield self
+            finally:
+                for index, settings in previous.items():
+                    try:
+                        self.client.indices.put_settings(index=index, settings={'index': settings})
+                    except Exception as e:
+                        logger.error(f"Error restoring settings of {index} after bulk load: {e}")
+                try:
+                    self.client.indices.refresh(index=self.index_name)
+                    if force_merge:
+                        self.client.indices.forcemerge(index=self.index_name,
+                                                       max_num_segments=max_num_segments)
+                    logger.info(f"Bulk-load mode disabled on {self.index_name}")
+                except Exception as e:
+                    logger.error(f"Error refreshing index after bulk load: {e}")
+        finally:
+            _bulk_load_lock.release()
+    
     def index_ioc(self, ioc: Dict) -> bool:
         """
         Index a single IOC.
@@ -111,47 +759,193 @@ class ElasticsearchClient:
             True if successful
         """
         try:
-            doc = {
-                '_index': self.index_name,
-                '_id': ioc.get('ioc_id', ioc.get('ioc_value', '')),
-                '_source': ioc
-            }
-            
-            self.client.index(**doc)
+            action = ioc_action(write_index(ioc, self.partitioned), ioc)
+            stale = self.stale_copies({action['_id']: action['_index']}) if self.partitioned else []
+            self.client.index(**action)
+            for copy in stale:
+                self.client.delete(index=copy['_index'], id=copy['_id'])
             return True
         except Exception as e:
             logger.error(f"Error indexing IOC {ioc.get('ioc_value', '')}: {e}")
             return False
     
-    def bulk_index(self, iocs: List[Dict]) -> int:
+    def stale_copies(self, targets: Dict[str, str]) -> List[Dict]:
+        """
+        Find copies of IOCs in partitions other than the one they are being written to.
+        
+        IOCs routed through the write alias are skipped: their concrete
+        partition is only known once they are written.
+        
+        Args:
+            targets: Partition each IOC is being written to, by ioc_id
+            
+        Returns:
+            Bulk delete actions for the stale copies (see ``stale_copy_actions``)
+        """
+        targets = {ioc_id: index for ioc_id, index in targets.items() if index != WRITE_ALIAS}
+        if not targets:
+            return []
+        
+        response = self.client.search(index=READ_ALIAS, body=dict(build_ids_query(list(targets)), _source=False),
+                                      ignore_unavailable=True)
+        return stale_copy_actions(response, targets)
+    
+    def bulk_index(self, iocs: Iterable[Dict], chunk_size: Optional[int] = None) -> int:
         """
         Bulk index multiple IOCs.
         
+        Accepts any iterable, including generators; see ``stream_index``.
+        
         Args:
-            iocs: List of IOC dictionaries
+            iocs: Iterable of IOC dictionaries
+            chunk_size: Number of documents per bulk request
             
         Returns:
             Number of successfully indexed IOCs
         """
-        if not iocs:
+        if isinstance(iocs, list) and not iocs:
             return 0
         
-        actions = []
-        for ioc in iocs:
-            action = {
-                '_index': self.index_name,
-                '_id': ioc.get('ioc_id', ioc.get('ioc_value', '')),
-                '_source': ioc
+        return self.stream_index(iocs, chunk_size=chunk_size)['indexed']
+    
+    def stream_index(self,
+                     iocs: Iterable[Dict],
+                     chunk_size: Optional[int] = None,
+                     max_chunk_bytes: Optional[int] = None,
+                     thread_count: Optional[int] = None,
+                     max_retries: Optional[int] = None,
+                     initial_backoff: float = 2,
+                     max_backoff: float = 60,
+                     on_chunk: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Index IOCs from a stream with parallel bulk requests.
+        
+        IOCs are read lazily and grouped into chunks bounded by document count
+        and request size. Chunks are sent by ``thread_count`` workers, and at
+        most two chunks per worker are buffered, so a slow cluster slows the
+        producer down instead of letting the backlog grow in memory. Documents
+        rejected with 429 (or a whole request rejected with 429) are retried
+        with exponential backoff.
+        
+        In partitioned mode each chunk also deletes the copies its IOCs left
+        in other partitions, whether written by an earlier run (found with an
+        ``ids`` search) or earlier in this stream.
+        
+        Args:
+            iocs: Iterable of IOC dictionaries (e.g. a generator)
+            chunk_size: Maximum documents per bulk request (ES_BULK_CHUNK_SIZE, default 500)
+            max_chunk_bytes: Maximum request size (ES_BULK_CHUNK_BYTES, default 10MB)
+            thread_count: Parallel bulk requests (ES_BULK_THREADS, default 4)
+            max_retries: Retries of rejected documents (ES_BULK_MAX_RETRIES, default 5)
+            initial_backoff: Seconds before the first retry, doubled on each retry
+            max_backoff: Maximum seconds between retries
+            on_chunk: Called with the metrics dictionary of every completed chunk
+            
+        Returns:
+            Totals: indexed, failed, chunks, bytes, seconds, docs_per_second and
+            error (the message if reading or sending the stream broke off, else
+            None; IOCs read but not yet sent then count in neither indexed nor
+            failed, so callers must check it before treating the stream as done)
+        """
+        chunk_size = chunk_size or int(os.getenv('ES_BULK_CHUNK_SIZE', BULK_CHUNK_SIZE))
+        max_chunk_bytes = max_chunk_bytes or int(os.getenv('ES_BULK_CHUNK_BYTES', BULK_CHUNK_BYTES))
+        thread_count = thread_count or int(os.getenv('ES_BULK_THREADS', BULK_THREADS))
+        if max_retries is None:
+            max_retries = int(os.getenv('ES_BULK_MAX_RETRIES', BULK_MAX_RETRIES))
+        
+        totals = {'indexed': 0, 'failed': 0, 'chunks': 0, 'bytes': 0, 'error': None}
+        started = time.monotonic()
+        
+        def send_chunk(number: int, chunk: List[Dict], chunk_bytes: int, moved: List[Dict]) -> Dict:
+            chunk_started = time.monotonic()
+            failed = 0
+            try:
+                operations = chunk
+                if self.partitioned:
+                    # Deletes follow the writes; a copy and its delete share a shard, so they apply in order
+                    deletes = {(a['_index'], a['_id']): a
+                               for a in moved + self.stale_copies({a['_id']: a['_index'] for a in chunk})}
+                    operations = chunk + list(deletes.values())
+                
+                for ok, item in streaming_bulk(self.client, operations,
+                                               chunk_size=len(operations),
+                                               max_chunk_bytes=max(max_chunk_bytes, chunk_bytes * 2),
+                                               max_retries=max_retries,
+                                               initial_backoff=initial_backoff,
+                                               max_backoff=max_backoff,
+                                               raise_on_error=False,
+                                               raise_on_exception=False,
+                                               yield_ok=False):
+                    if not ok and 'delete' in item:
+                        if item['delete'].get('status') != 404:
+                            logger.warning(f"Bulk chunk {number} could not delete a stale copy: {item}")
+                    elif not ok:
+                        failed += 1
+                        if failed == 1:
+                            logger.warning(f"Bulk chunk {number} rejected a document: {item}")
+            except Exception as e:
+                logger.error(f"Error indexing bulk chunk {number}: {e}")
+                failed = len(chunk)
+            
+            seconds = time.monotonic() - chunk_started
+            return {
+                'chunk': number,
+                'documents': len(chunk),
+                'indexed': len(chunk) - failed,
+                'failed': failed,
+                'bytes': chunk_bytes,
+                'seconds': seconds,
+                'docs_per_second': len(chunk) / seconds if seconds > 0 else 0.0
             }
-            actions.append(action)
+        
+        def record(metrics: Dict):
+            totals['indexed'] += metrics['indexed']
+            totals['failed'] += metrics['failed']
+            totals['chunks'] += 1
+            totals['bytes'] += metrics['bytes']
+            logger.debug(f"Bulk chunk {metrics['chunk']}: {metrics['indexed']} indexed, "
+                         f"{metrics['failed']} failed, {metrics['bytes']} bytes, "
+                         f"{metrics['docs_per_second']:.0f} docs/s")
+            if on_chunk is not None:
+                on_chunk(metrics)
+        
+        actions = (ioc_action(write_index(ioc, self.partitioned), ioc) for ioc in iocs)
+        pending = deque()
+        # Partition each IOC was last written to in this stream
+        written: Dict[str, str] = {}
         
         try:
-            success, failed = bulk(self.client, actions, raise_on_error=False)
-            logger.info(f"Indexed {success} IOCs, {len(failed)} failed")
-            return success
+            with ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix='es-bulk') as executor:
+                for number, (chunk, chunk_bytes) in enumerate(
+                        chunk_actions(actions, chunk_size, max_chunk_bytes), start=1):
+                    moved = []
+                    if self.partitioned:
+                        for action in chunk:
+                            previous = written.get(action['_id'])
+                            if previous not in (None, WRITE_ALIAS, action['_index']):
+                                moved.append({'_op_type': 'delete', '_index': previous, '_id': action['_id']})
+                            written[action['_id']] = action['_index']
+                    
+                    # Backpressure: wait for the oldest chunk before reading further; a
+                    # chunk that moves IOCs waits for every earlier write to them
+                    while pending and (moved or len(pending) >= thread_count * 2):
+                        record(pending.popleft().result())
+                    pending.append(executor.submit(send_chunk, number, chunk, chunk_bytes, moved))
+                
+                while pending:
+                    record(pending.popleft().result())
         except Exception as e:
             logger.error(f"Error bulk indexing: {e}")
-            return 0
+            totals['error'] = str(e)
+            # Chunks already sent still count
+            while pending:
+                record(pending.popleft().result())
+        
+        totals['seconds'] = time.monotonic() - started
+        totals['docs_per_second'] = totals['indexed'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+        logger.info(f"Indexed {totals['indexed']} IOCs, {totals['failed']} failed "
+                    f"({totals['chunks']} chunks, {totals['docs_per_second']:.0f} docs/s)")
+        return totals
     
     def search_ioc(self, ioc_value: str, ioc_type: Optional[str] = None) -> List[Dict]:
         """
@@ -164,28 +958,72 @@ class ElasticsearchClient:
         Returns:
             List of matching IOC dictionaries
         """
-        query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"ioc_value": ioc_value}}
-                    ]
-                }
-            }
-        }
-        
-        if ioc_type:
-            query["query"]["bool"]["must"].append({"term": {"ioc_type": ioc_type}})
+        query = build_ioc_query(ioc_value, ioc_type)
         
         try:
             # Elasticsearch 8.x still supports body parameter for backward compatibility
             response = self.client.search(index=self.index_name, body=query)
-            hits = response.get('hits', {}).get('hits', [])
-            return [hit['_source'] for hit in hits]
+            return hit_sources(response)
         except Exception as e:
             logger.error(f"Error searching IOC: {e}")
             return []
     
+    def lookup_many(self, indicators: Iterable[Dict], chunk_size: int = LOOKUP_CHUNK_SIZE) -> List[Dict]:
+        """
+        Look up many indicators in a few round-trips.
+        
+        Indicators with a type are resolved by ``ioc_id`` (the document ID)
+        with ``_mget``; indicators without one are searched by value with
+        ``msearch``. Both are sent ``chunk_size`` indicators at a time.
+        
+        Args:
+            indicators: Dictionaries with ``ioc_value`` and optional ``ioc_type``
+            chunk_size: Indicators per request
+            
+        Returns:
+            One result per indicator, in order, with ``found`` and the matching
+            IOC dictionaries under ``matches``
+        """
+        indicators = list(indicators)
+        results = lookup_results(indicators)
+        id_chunks, value_chunks = plan_lookups(indicators, chunk_size)
+        
+        for chunk in id_chunks:
+            ioc_ids = [ioc_id for _, ioc_id in chunk]
+            try:
+                if self.partitioned:
+                    # _mget needs a concrete index; an ids query works across the read alias
+                    response = self.client.search(index=self.index_name, body=build_ids_query(ioc_ids))
+                    docs = {hit['_id']: hit['_source'] for hit in response.get('hits', {}).get('hits', [])}
+                else:
+                    response = self.client.mget(index=self.index_name, ids=ioc_ids)
+                    docs = {doc['_id']: doc['_source'] for doc in response.get('docs', []) if doc.get('found')}
+            except Exception as e:
+                logger.error(f"Error looking up IOCs by ID: {e}")
+                continue
+            
+            for n, ioc_id in chunk:
+                if ioc_id in docs:
+                    results[n]['matches'] = [docs[ioc_id]]
+        
+        for chunk in value_chunks:
+            searches = []
+            for n in chunk:
+                searches.extend([{}, build_ioc_query(indicators[n].get('ioc_value', ''))])
+            try:
+                response = self.client.msearch(index=self.index_name, searches=searches)
+            except Exception as e:
+                logger.error(f"Error searching IOCs by value: {e}")
+                continue
+            
+            for n, item in zip(chunk, response.get('responses', [])):
+                if 'error' not in item:
+                    results[n]['matches'] = hit_sources(item)
+        
+        for result in results:
+            result['found'] = bool(result['matches'])
+        return results
+    
     def search_threats(self, 
                       threat_type: Optional[str] = None,
                       min_confidence: float = 0.0,
@@ -201,26 +1039,12 @@ class ElasticsearchClient:
         Returns:
             List of matching IOC dictionaries
         """
-        query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"range": {"confidence": {"gte": min_confidence}}}
-                    ]
-                }
-            },
-            "sort": [{"confidence": {"order": "desc"}}],
-            "size": limit
-        }
-        
-        if threat_type:
-            query["query"]["bool"]["must"].append({"term": {"threat_type": threat_type}})
+        query = build_threats_query(threat_type, min_confidence, limit)
         
         try:
             # Elasticsearch 8.x still supports body parameter for backward compatibility
             response = self.client.search(index=self.index_name, body=query)
-            hits = response.get('hits', {}).get('hits', [])
-            return [hit['_source'] for hit in hits]
+            return hit_sources(response)
         except Exception as e:
             logger.error(f"Error searching threats: {e}")
             return []
@@ -228,46 +1052,192 @@ class ElasticsearchClient:
     def search_by_time_range(self, 
                             start_time, 
                             end_time, 
-                            limit: int = 100) -> List[Dict]:
+                            limit: int = 100,
+                            threat_type: Optional[str] = None,
+                            min_confidence: float = 0.0) -> List[Dict]:
         """
         Search IOCs by time range.
         
+        In partitioned mode only the monthly partitions overlapping the range
+        are searched.
+        
         Args:
             start_time: Start datetime
             end_time: End datetime
             limit: Maximum results
+            threat_type: Optional threat type filter
+            min_confidence: Minimum confidence score
             
         Returns:
             List of matching IOC dictionaries
         """
-        query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {
-                            "range": {
-                                "first_seen": {
-                                    "gte": start_time.isoformat(),
-                                    "lte": end_time.isoformat()
-                                }
-                            }
-                        }
-                    ]
-                }
-            },
-            "sort": [{"first_seen": {"order": "desc"}}],
-            "size": limit
-        }
+        query = build_time_range_query(start_time, end_time, limit, threat_type, min_confidence)
         
         try:
             # Elasticsearch 8.x still supports body parameter for backward compatibility
-            response = self.client.search(index=self.index_name, body=query)
-            hits = response.get('hits', {}).get('hits', [])
-            return [hit['_source'] for hit in hits]
+            response = self.client.search(index=search_index(start_time, end_time, self.partitioned),
+                                          body=query, ignore_unavailable=True)
+            return hit_sources(response)
         except Exception as e:
             logger.error(f"Error searching by time range: {e}")
             return []
     
+    def search_page(self,
+                    query: Dict,
+                    page_size: int = 100,
+                    cursor: Optional[str] = None,
+                    index: Optional[str] = None,
+                    paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of a query, walking results with search_after over a point-in-time.
+        
+        Without ``paginate`` or ``cursor`` this is a plain search of the first
+        page and no cursor is returned. With ``paginate`` the first page opens
+        a point-in-time on ``index``; every later page resumes from the
+        cursor, so all pages see the same snapshot and each costs the same
+        however deep the walk is. The point-in-time is closed after the last
+        page and otherwise expires ``PIT_KEEP_ALIVE`` after the latest page.
+        
+        Args:
+            query: Search query (its sort defines the page order)
+            page_size: Hits per page
+            cursor: Cursor returned with the previous page (None for the first page)
+            index: Index or alias to search (defaults to the IOC index)
+            paginate: Return a cursor for the next page of a first-page request
+            
+        Returns:
+            Tuple of (documents, cursor of the next page or None on the last page)
+            
+        Raises:
+            CursorExpiredError: If the point-in-time of ``cursor`` has expired
+            ValueError: If ``cursor`` is malformed
+        """
+        if cursor is None and not paginate:
+            try:
+                response = self.client.search(index=index or self.index_name, body=dict(query, size=page_size),
+                                              ignore_unavailable=True)
+                return hit_sources(response), None
+            except Exception as e:
+                logger.error(f"Error fetching result page: {e}")
+                return [], None
+        
+        pit_id, search_after = decode_cursor(cursor) if cursor else (None, None)
+        
+        try:
+            if pit_id is None:
+                pit_id = self.client.open_point_in_time(index=index or self.index_name,
+                                                        keep_alive=PIT_KEEP_ALIVE,
+                                                        ignore_unavailable=True)['id']
+            
+            response = self.client.search(body=build_page_query(query, page_size, pit_id, search_after))
+            documents, next_cursor = page_result(response, page_size, pit_id)
+            
+            if next_cursor is None:
+                self.client.close_point_in_time(id=response.get('pit_id', pit_id))
+            return documents, next_cursor
+        except Exception as e:
+            # A failed resume must not look like the end of the results
+            if cursor:
+                raise cursor_error(e) from e
+            logger.error(f"Error fetching result page: {e}")
+            return [], None
+    
+    def search_threats_page(self,
+                            threat_type: Optional[str] = None,
+                            min_confidence: float = 0.0,
+                            page_size: int = 100,
+                            cursor: Optional[str] = None,
+                            paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Page through threats by type and confidence (see ``search_page``).
+        
+        Returns:
+            Tuple of (IOC dictionaries, cursor of the next page or None)
+        """
+        return self.search_page(build_threats_query(threat_type, min_confidence, page_size),
+                                page_size=page_size, cursor=cursor, paginate=paginate)
+    
+    def search_text_page(self,
+                         text: str,
+                         ioc_type: Optional[str] = None,
+                         min_confidence: float = 0.0,
+                         page_size: int = 100,
+                         cursor: Optional[str] = None,
+                         paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Page through a full-text IOC search (see ``build_text_search_query`` and ``search_page``).
+        
+        Returns:
+            Tuple of (IOC dictionaries with ``highlight``, cursor of the next page or None)
+        """
+        return self.search_page(build_text_search_query(text, ioc_type, min_confidence, page_size),
+                                page_size=page_size, cursor=cursor, paginate=paginate)
+    
+    def search_by_time_range_page(self,
+                                  start_time,
+                                  end_time,
+                                  page_size: int = 100,
+                                  cursor: Optional[str] = None,
+                                  threat_type: Optional[str] = None,
+                                  min_confidence: float = 0.0,
+                                  paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Page through IOCs first seen within a time range (see ``search_page``).
+        
+        Returns:
+            Tuple of (IOC dictionaries, cursor of the next page or None)
+        """
+        query = build_time_range_query(start_time, end_time, page_size, threat_type, min_confidence)
+        return self.search_page(query, page_size=page_size, cursor=cursor,
+                                index=search_index(start_time, end_time, self.partitioned),
+                                paginate=paginate)
+    
+    def threat_stats(self, min_confidence: float = 0.0, interval: str = 'day') -> Dict:
+        """
+        Exact threat statistics over the whole index in one aggregation request.
+        
+        Args:
+            min_confidence: Minimum confidence score
+            interval: Calendar interval of the first-seen histogram (e.g. 'day', 'week')
+            
+        Returns:
+            Dictionary with total_threats, by_threat_type, by_source, over_time
+            and confidence_percentiles
+            
+        Raises:
+            ValueError: If ``interval`` is not one of STATS_INTERVALS
+            Exception: Elasticsearch errors are re-raised, so a failed request
+                is not mistaken for zero threats
+        """
+        body = build_stats_query(min_confidence, interval)
+        try:
+            return parse_stats(self.client.search(index=self.index_name, body=body))
+        except Exception as e:
+            logger.error(f"Error getting threat stats: {e}")
+            raise
+    
+    def count_iocs(self) -> int:
+        """Count indexed IOCs."""
+        try:
+            return self.client.count(index=self.index_name).get('count', 0)
+        except Exception as e:
+            logger.error(f"Error counting IOCs: {e}")
+            return 0
+    
+    def iter_ioc_ids(self, batch_size: int = 5000) -> Iterator[str]:
+        """
+        Yield the ID of every indexed IOC without fetching documents.
+        
+        Args:
+            batch_size: Hits per scroll page
+            
+        Yields:
+            IOC IDs (document ``_id``s)
+        """
+        query = {"query": {"match_all": {}}, "_source": False}
+        for hit in scan(self.client, index=self.index_name, query=query, size=batch_size):
+            yield hit['_id']
+    
     def health_check(self) -> bool:
         """Check Elasticsearch health."""
         try:
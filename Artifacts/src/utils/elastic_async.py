@@ -0,0 +1,509 @@
+"""Async Elasticsearch integration for the API"""
+
+import asyncio
+from typing import List, Dict, Optional, Iterable, AsyncIterable, Union, Tuple
+import logging
+
+from .elastic import (
+    ElasticsearchClient,
+    INDEX_NAME,
+    READ_ALIAS,
+    WRITE_ALIAS,
+    connection_config,
+    partitioning_enabled,
+    write_index,
+    search_index,
+    build_ioc_query,
+    build_threats_query,
+    build_time_range_query,
+    build_stats_query,
+    build_text_search_query,
+    parse_stats,
+    build_page_query,
+    page_result,
+    decode_cursor,
+    cursor_error,
+    PIT_KEEP_ALIVE,
+    LOOKUP_CHUNK_SIZE,
+    plan_lookups,
+    build_ids_query,
+    lookup_results,
+    ioc_action,
+    hit_sources,
+    stale_copy_actions
+)
+
+try:
+    import aiohttp  # noqa: F401  (HTTP transport used by AsyncElasticsearch)
+    from elasticsearch import AsyncElasticsearch
+    from elasticsearch.helpers import async_bulk
+    ASYNC_ELASTICSEARCH_AVAILABLE = True
+except ImportError:
+    ASYNC_ELASTICSEARCH_AVAILABLE = False
+    logging.warning("Async Elasticsearch not available. Install with: pip install 'elasticsearch[async]'")
+
+logger = logging.getLogger(__name__)
+
+
+async def _chunks(actions: Union[Iterable[Dict], AsyncIterable[Dict]], chunk_size: int):
+    """Group actions from a sync or async iterable into lists of up to ``chunk_size``."""
+    chunk = []
+    if hasattr(actions, '__aiter__'):
+        async for action in actions:
+            chunk.append(action)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    else:
+        for action in actions:
+            chunk.append(action)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class AsyncElasticsearchClient:
+    """Non-blocking Elasticsearch client for IOC lookups from async handlers"""
+    
+    def __init__(self,
+                 host: Optional[str] = None,
+                 port: int = 9200,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 pool_size: Optional[int] = None):
+        """
+        Initialize async Elasticsearch client.
+        
+        Args:
+            host: Elasticsearch host (defaults to ELASTICSEARCH_HOST env var or localhost)
+            port: Elasticsearch port
+            username: Username (optional)
+            password: Password (optional)
+            pool_size: Keep-alive connections per node (defaults to ELASTICSEARCH_POOL_SIZE
+                env var or 10)
+        """
+        if not ASYNC_ELASTICSEARCH_AVAILABLE:
+            raise ImportError("Async Elasticsearch not installed. Install with: pip install 'elasticsearch[async]'")
+        
+        self.client = AsyncElasticsearch(**connection_config(host, port, username, password, pool_size))
+        self.partitioned = partitioning_enabled()
+        self.index_name = READ_ALIAS if self.partitioned else INDEX_NAME
+    
+    async def close(self):
+        """Close all pooled connections."""
+        await self.client.close()
+    
+    async def bulk_index(self,
+                         iocs: Union[Iterable[Dict], AsyncIterable[Dict]],
+                         chunk_size: int = 500) -> int:
+        """
+        Bulk index multiple IOCs.
+        
+        Args:
+            iocs: Iterable or async iterable of IOC dictionaries
+            chunk_size: Number of documents per bulk request
+            
+        Returns:
+            Number of successfully indexed IOCs
+        """
+        if isinstance(iocs, list) and not iocs:
+            return 0
+        
+        if hasattr(iocs, '__aiter__'):
+            actions = (ioc_action(write_index(ioc, self.partitioned), ioc) async for ioc in iocs)
+        else:
+            actions = (ioc_action(write_index(ioc, self.partitioned), ioc) for ioc in iocs)
+        
+        try:
+            if not self.partitioned:
+                success, failed = await async_bulk(self.client, actions, chunk_size=chunk_size,
+                                                   stats_only=True, raise_on_error=False)
+            else:
+                # Chunk by chunk, then delete the copies left in other partitions
+                # (see ElasticsearchClient.stream_index)
+                success, failed = 0, 0
+                written: Dict[str, str] = {}
+                async for chunk in _chunks(actions, chunk_size):
+                    deletes = {(a['_index'], a['_id']): a
+                               for a in await self.stale_copies({a['_id']: a['_index'] for a in chunk})}
+                    for action in chunk:
+                        previous = written.get(action['_id'])
+                        if previous not in (None, WRITE_ALIAS, action['_index']):
+                            deletes[(previous, action['_id'])] = {'_op_type': 'delete', '_index': previous,
+                                                                  '_id': action['_id']}
+                        written[action['_id']] = action['_index']
+                    
+                    indexed, rejected = await async_bulk(self.client, chunk, chunk_size=chunk_size,
+                                                         stats_only=True, raise_on_error=False)
+                    success += indexed
+                    failed += rejected
+                    if deletes:
+                        await async_bulk(self.client, list(deletes.values()), stats_only=True,
+                                         raise_on_error=False)
+            logger.info(f"Indexed {success} IOCs, {failed} failed")
+            return success
+        except Exception as e:
+            logger.error(f"Error bulk indexing: {e}")
+            return 0
+    
+    async def stale_copies(self, targets: Dict[str, str]) -> List[Dict]:
+        """Find copies of IOCs in partitions other than their target (see ElasticsearchClient.stale_copies)."""
+        targets = {ioc_id: index for ioc_id, index in targets.items() if index != WRITE_ALIAS}
+        if not targets:
+            return []
+        
+        response = await self.client.search(index=READ_ALIAS, body=dict(build_ids_query(list(targets)), _source=False),
+                                            ignore_unavailable=True)
+        return stale_copy_actions(response, targets)
+    
+    async def search_ioc(self, ioc_value: str, ioc_type: Optional[str] = None) -> List[Dict]:
+        """
+        Search for IOC by value.
+        
+        Args:
+            ioc_value: IOC value to search
+            ioc_type: Optional IOC type filter
+            
+        Returns:
+            List of matching IOC dictionaries
+        """
+        try:
+            response = await self.client.search(index=self.index_name,
+                                                body=build_ioc_query(ioc_value, ioc_type))
+            return hit_sources(response)
+        except Exception as e:
+            logger.error(f"Error searching IOC: {e}")
+            return []
+    
+    async def lookup_many(self, indicators: Iterable[Dict], chunk_size: int = LOOKUP_CHUNK_SIZE) -> List[Dict]:
+        """
+        Look up many indicators in a few round-trips (see ElasticsearchClient.lookup_many).
+        
+        Args:
+            indicators: Dictionaries with ``ioc_value`` and optional ``ioc_type``
+            chunk_size: Indicators per request
+            
+        Returns:
+            One result per indicator, in order, with ``found`` and ``matches``
+        """
+        indicators = list(indicators)
+        results = lookup_results(indicators)
+        id_chunks, value_chunks = plan_lookups(indicators, chunk_size)
+        
+        for chunk in id_chunks:
+            ioc_ids = [ioc_id for _, ioc_id in chunk]
+            try:
+                if self.partitioned:
+                    response = await self.client.search(index=self.index_name, body=build_ids_query(ioc_ids))
+                    docs = {hit['_id']: hit['_source'] for hit in response.get('hits', {}).get('hits', [])}
+                else:
+                    response = await self.client.mget(index=self.index_name, ids=ioc_ids)
+                    docs = {doc['_id']: doc['_source'] for doc in response.get('docs', []) if doc.get('found')}
+            except Exception as e:
+                logger.error(f"Error looking up IOCs by ID: {e}")
+                continue
+            
+            for n, ioc_id in chunk:
+                if ioc_id in docs:
+                    results[n]['matches'] = [docs[ioc_id]]
+        
+        for chunk in value_chunks:
+            searches = []
+            for n in chunk:
+                searches.extend([{}, build_ioc_query(indicators[n].get('ioc_value', ''))])
+            try:
+                response = await self.client.msearch(index=self.index_name, searches=searches)
+            except Exception as e:
+                logger.error(f"Error searching IOCs by value: {e}")
+                continue
+            
+            for n, item in zip(chunk, response.get('responses', [])):
+                if 'error' not in item:
+                    results[n]['matches'] = hit_sources(item)
+        
+        for result in results:
+            result['found'] = bool(result['matches'])
+        return results
+    
+    async def search_threats(self,
+                             threat_type: Optional[str] = None,
+                             min_confidence: float = 0.0,
+                             limit: int = 100) -> List[Dict]:
+        """
+        Search threats by type and confidence.
+        
+        Args:
+            threat_type: Optional threat type filter
+            min_confidence: Minimum confidence score
+            limit: Maximum results
+            
+        Returns:
+            List of matching IOC dictionaries
+        """
+        try:
+            response = await self.client.search(index=self.index_name,
+                                                body=build_threats_query(threat_type, min_confidence, limit))
+            return hit_sources(response)
+        except Exception as e:
+            logger.error(f"Error searching threats: {e}")
+            return []
+    
+    async def search_by_time_range(self,
+                                   start_time,
+                                   end_time,
+                                   limit: int = 100,
+                                   threat_type: Optional[str] = None,
+                                   min_confidence: float = 0.0) -> List[Dict]:
+        """
+        Search IOCs by time range.
+        
+        Args:
+            start_time: Start datetime
+            end_time: End datetime
+            limit: Maximum results
+            threat_type: Optional threat type filter
+            min_confidence: Minimum confidence score
+            
+        Returns:
+            List of matching IOC dictionaries
+        """
+        query = build_time_range_query(start_time, end_time, limit, threat_type, min_confidence)
+        
+        try:
+            response = await self.client.search(index=search_index(start_time, end_time, self.partitioned),
+                                                body=query, ignore_unavailable=True)
+            return hit_sources(response)
+        except Exception as e:
+            logger.error(f"Error searching by time range: {e}")
+            return []
+    
+    async def search_page(self,
+                          query: Dict,
+                          page_size: int = 100,
+                          cursor: Optional[str] = None,
+                          index: Optional[str] = None,
+                          paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of a query (see ElasticsearchClient.search_page).
+        
+        Args:
+            query: Search query (its sort defines the page order)
+            page_size: Hits per page
+            cursor: Cursor returned with the previous page (None for the first page)
+            index: Index or alias to search (defaults to the IOC index)
+            paginate: Return a cursor for the next page of a first-page request
+            
+        Returns:
+            Tuple of (documents, cursor of the next page or None on the last page)
+            
+        Raises:
+            CursorExpiredError: If the point-in-time of ``cursor`` has expired
+            ValueError: If ``cursor`` is malformed
+        """
+        if cursor is None and not paginate:
+            try:
+                response = await self.client.search(index=index or self.index_name,
+                                                    body=dict(query, size=page_size),
+                                                    ignore_unavailable=True)
+                return hit_sources(response), None
+            except Exception as e:
+                logger.error(f"Error fetching result page: {e}")
+                return [], None
+        
+        pit_id, search_after = decode_cursor(cursor) if cursor else (None, None)
+        
+        try:
+            if pit_id is None:
+                response = await self.client.open_point_in_time(index=index or self.index_name,
+                                                                keep_alive=PIT_KEEP_ALIVE,
+                                                                ignore_unavailable=True)
+                pit_id = response['id']
+            
+            response = await self.client.search(body=build_page_query(query, page_size, pit_id, search_after))
+            documents, next_cursor = page_result(response, page_size, pit_id)
+            
+            if next_cursor is None:
+                await self.client.close_point_in_time(id=response.get('pit_id', pit_id))
+            return documents, next_cursor
+        except Exception as e:
+            # A failed resume must not look like the end of the results
+            if cursor:
+                raise cursor_error(e) from e
+            logger.error(f"Error fetching result page: {e}")
+            return [], None
+    
+    async def search_threats_page(self,
+                                  threat_type: Optional[str] = None,
+                                  min_confidence: float = 0.0,
+                                  page_size: int = 100,
+                                  cursor: Optional[str] = None,
+                                  paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through threats by type and confidence (see ``search_page``)."""
+        return await self.search_page(build_threats_query(threat_type, min_confidence, page_size),
+                                      page_size=page_size, cursor=cursor, paginate=paginate)
+    
+    async def search_text_page(self,
+                               text: str,
+                               ioc_type: Optional[str] = None,
+                               min_confidence: float = 0.0,
+                               page_size: int = 100,
+                               cursor: Optional[str] = None,
+                               paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through a full-text IOC search (see ElasticsearchClient.search_text_page)."""
+        return await self.search_page(build_text_search_query(text, ioc_type, min_confidence, page_size),
+                                      page_size=page_size, cursor=cursor, paginate=paginate)
+    
+    async def search_by_time_range_page(self,
+                                        start_time,
+                                        end_time,
+                                        page_size: int = 100,
+                                        cursor: Optional[str] = None,
+                                        threat_type: Optional[str] = None,
+                                        min_confidence: float = 0.0,
+                                        paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through IOCs first seen within a time range (see ``search_page``)."""
+        query = build_time_range_query(start_time, end_time, page_size, threat_type, min_confidence)
+        return await self.search_page(query, page_size=page_size, cursor=cursor,
+                                      index=search_index(start_time, end_time, self.partitioned),
+                                      paginate=paginate)
+    
+    async def threat_stats(self, min_confidence: float = 0.0, interval: str = 'day') -> Dict:
+        """
+        Exact threat statistics over the whole index in one aggregation request.
+        
+        Args:
+            min_confidence: Minimum confidence score
+            interval: Calendar interval of the first-seen histogram (e.g. 'day', 'week')
+            
+        Returns:
+            Dictionary with total_threats, by_threat_type, by_source, over_time
+            and confidence_percentiles
+            
+        Raises:
+            ValueError: If ``interval`` is not one of STATS_INTERVALS
+            Exception: Elasticsearch errors are re-raised (see ElasticsearchClient.threat_stats)
+        """
+        body = build_stats_query(min_confidence, interval)
+        try:
+            return parse_stats(await self.client.search(index=self.index_name, body=body))
+        except Exception as e:
+            logger.error(f"Error getting threat stats: {e}")
+            raise
+    
+    async def count_iocs(self) -> int:
+        """Count indexed IOCs."""
+        try:
+            response = await self.client.count(index=self.index_name)
+            return response.get('count', 0)
+        except Exception as e:
+            logger.error(f"Error counting IOCs: {e}")
+            return 0
+    
+    async def health_check(self) -> bool:
+        """Check Elasticsearch health."""
+        try:
+            health = await self.client.cluster.health()
+            return health.get('status') in ['green', 'yellow']
+        except Exception as e:
+            logger.error(f"Elasticsearch health check failed: {e}")
+            return False
+
+
+class ThreadedElasticsearchClient:
+    """
+    Async facade over the sync client for installs without aiohttp.
+    
+    Each call runs in the default thread pool, so a slow query occupies a
+    worker thread instead of blocking the event loop.
+    """
+    
+    def __init__(self, sync_client: ElasticsearchClient):
+        """
+        Initialize threaded client.
+        
+        Args:
+            sync_client: Sync client whose methods are run off the event loop
+        """
+        self.sync_client = sync_client
+        self.index_name = sync_client.index_name
+    
+    async def close(self):
+        """Nothing to close; the sync client is owned by the caller."""
+    
+    async def bulk_index(self, iocs: Iterable[Dict], chunk_size: int = 500) -> int:
+        """Bulk index multiple IOCs (see ElasticsearchClient.bulk_index)."""
+        return await asyncio.to_thread(self.sync_client.bulk_index, iocs, chunk_size)
+    
+    async def search_ioc(self, ioc_value: str, ioc_type: Optional[str] = None) -> List[Dict]:
+        """Search for IOC by value (see ElasticsearchClient.search_ioc)."""
+        return await asyncio.to_thread(self.sync_client.search_ioc, ioc_value, ioc_type)
+    
+    async def lookup_many(self, indicators: Iterable[Dict], chunk_size: int = LOOKUP_CHUNK_SIZE) -> List[Dict]:
+        """Look up many indicators (see ElasticsearchClient.lookup_many)."""
+        return await asyncio.to_thread(self.sync_client.lookup_many, indicators, chunk_size)
+    
+    async def search_threats(self,
+                             threat_type: Optional[str] = None,
+                             min_confidence: float = 0.0,
+                             limit: int = 100) -> List[Dict]:
+        """Search threats by type and confidence (see ElasticsearchClient.search_threats)."""
+        return await asyncio.to_thread(self.sync_client.search_threats,
+                                       threat_type, min_confidence, limit)
+    
+    async def search_by_time_range(self,
+                                   start_time,
+                                   end_time,
+                                   limit: int = 100,
+                                   threat_type: Optional[str] = None,
+                                   min_confidence: float = 0.0) -> List[Dict]:
+        """Search IOCs by time range (see ElasticsearchClient.search_by_time_range)."""
+        return await asyncio.to_thread(self.sync_client.search_by_time_range,
+                                       start_time, end_time, limit, threat_type, min_confidence)
+    
+    async def search_threats_page(self,
+                                  threat_type: Optional[str] = None,
+                                  min_confidence: float = 0.0,
+                                  page_size: int = 100,
+                                  cursor: Optional[str] = None,
+                                  paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through threats (see ElasticsearchClient.search_threats_page)."""
+        return await asyncio.to_thread(self.sync_client.search_threats_page,
+                                       threat_type, min_confidence, page_size, cursor, paginate)
+    
+    async def search_text_page(self,
+                               text: str,
+                               ioc_type: Optional[str] = None,
+                               min_confidence: float = 0.0,
+                               page_size: int = 100,
+                               cursor: Optional[str] = None,
+                               paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through a full-text IOC search (see ElasticsearchClient.search_text_page)."""
+        return await asyncio.to_thread(self.sync_client.search_text_page,
+                                       text, ioc_type, min_confidence, page_size, cursor, paginate)
+    
+    async def search_by_time_range_page(self,
+                                        start_time,
+                                        end_time,
+                                        page_size: int = 100,
+                                        cursor: Optional[str] = None,
+                                        threat_type: Optional[str] = None,
+                                        min_confidence: float = 0.0,
+                                        paginate: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Page through IOCs by time range (see ElasticsearchClient.search_by_time_range_page)."""
+        return await asyncio.to_thread(self.sync_client.search_by_time_range_page,
+                                       start_time, end_time, page_size, cursor, threat_type,
+                                       min_confidence, paginate)
+    
+    async def threat_stats(self, min_confidence: float = 0.0, interval: str = 'day') -> Dict:
+        """Exact threat statistics (see ElasticsearchClient.threat_stats)."""
+        return await asyncio.to_thread(self.sync_client.threat_stats, min_confidence, interval)
+    
+    async def count_iocs(self) -> int:
+        """Count indexed IOCs."""
+        return await asyncio.to_thread(self.sync_client.count_iocs)
+    
+    async def health_check(self) -> bool:
+        """Check Elasticsearch health."""
+        return await asyncio.to_thread(self.sync_client.health_check)
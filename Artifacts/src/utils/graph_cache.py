@@ -0,0 +1,307 @@
+"""Materialized, cached threat network graph views"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple, Callable, Awaitable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cached views and their lifetime (overridable with GRAPH_CACHE_SIZE / GRAPH_CACHE_TTL)
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_CACHE_TTL = 300
+
+
+class GraphKey(NamedTuple):
+    """Parameters identifying one network view (the keyword arguments of get_threat_subgraph)"""
+    actor_name: Optional[str]
+    depth: int
+    relationship_types: Optional[Tuple[str, ...]]
+    fanout: Optional[int]
+    limit: Optional[int]
+    use_apoc: bool
+
+
+def graph_key(actor_name: Optional[str] = None,
+              depth: int = 2,
+              relationship_types: Optional[List[str]] = None,
+              fanout: Optional[int] = None,
+              limit: Optional[int] = None,
+              use_apoc: bool = False) -> GraphKey:
+    """Cache key for a network view; relationship type order does not matter."""
+    types = tuple(sorted(set(relationship_types))) if relationship_types else None
+    return GraphKey(actor_name, depth, types, fanout, limit, use_apoc)
+
+
+@dataclass(slots=True)
+class CompactGraph:
+    """
+    Network view stored as node tables plus CSR adjacency arrays.
+    
+    Node ``i`` has outgoing edges ``offsets[i]:offsets[i + 1]``; for each edge
+    ``targets`` holds the target node index and ``edge_types`` an index into
+    ``type_names``. Empty property maps are stored as None.
+    """
+    
+    node_ids: Tuple[str, ...]
+    node_labels: Tuple[str, ...]
+    node_types: Tuple[str, ...]
+    node_data: Tuple[Optional[Dict[str, Any]], ...]
+    offsets: array
+    targets: array
+    edge_types: array
+    type_names: Tuple[str, ...]
+    edge_ids: Tuple[str, ...]
+    edge_data: Tuple[Optional[Dict[str, Any]], ...]
+    truncated: bool
+    etag: str = ''
+    
+    @classmethod
+    def from_subgraph(cls, subgraph: Dict) -> 'CompactGraph':
+        """
+        Build a view from get_threat_subgraph output.
+        
+        Args:
+            subgraph: Dictionary with ``nodes``, ``relationships`` and ``truncated``
+            
+        Returns:
+            CompactGraph with a content-derived ETag
+        """
+        nodes = subgraph.get('nodes', [])
+        index = {node['id']: i for i, node in enumerate(nodes)}
+        
+        node_labels = []
+        node_types = []
+        for node in nodes:
+            properties = node.get('properties') or {}
+            labels = node.get('labels') or []
+            node_labels.append(str(properties.get('ioc_value') or properties.get('name')
+                                   or properties.get('campaign_id') or node['id']))
+            node_types.append(sys.intern(properties.get('ioc_type') or (labels[0] if labels else 'unknown')))
+        
+        # Group edges by source node; edges to nodes outside the view are dropped
+        edges = [(index[rel['source']], index[rel['target']], rel)
+                 for rel in subgraph.get('relationships', [])
+                 if rel['source'] in index and rel['target'] in index]
+        edges.sort(key=lambda edge: edge[0])
+        
+        offsets = array('I', [0] * (len(nodes) + 1))
+        for source, _, _ in edges:
+            offsets[source + 1] += 1
+        for i in range(len(nodes)):
+            offsets[i + 1] += offsets[i]
+        
+        type_codes: Dict[str, int] = {}
+        edge_types = array('H', (type_codes.setdefault(rel['type'], len(type_codes)) for _, _, rel in edges))
+        
+        graph = cls(
+            node_ids=tuple(node['id'] for node in nodes),
+            node_labels=tuple(node_labels),
+            node_types=tuple(node_types),
+            node_data=tuple(node.get('properties') or None for node in nodes),
+            offsets=offsets,
+            targets=array('I', (target for _, target, _ in edges)),
+            edge_types=edge_types,
+            type_names=tuple(type_codes),
+            edge_ids=tuple(rel['id'] for _, _, rel in edges),
+            edge_data=tuple(rel.get('properties') or None for _, _, rel in edges),
+            truncated=bool(subgraph.get('truncated'))
+        )
+        graph.etag = '"' + hashlib.sha1(
+            json.dumps(graph.to_payload(), sort_keys=True, default=str).encode()
+        ).hexdigest() + '"'
+        return graph
+    
+    def neighbours(self, node_id: str) -> List[str]:
+        """IDs of the nodes a node has outgoing edges to."""
+        i = self.node_ids.index(node_id)
+        return [self.node_ids[t] for t in self.targets[self.offsets[i]:self.offsets[i + 1]]]
+    
+    def to_payload(self) -> Dict:
+        """
+        Network response body.
+        
+        Returns:
+            Dictionary with ``nodes``, ``edges`` and ``stats``
+        """
+        nodes = [{
+            "id": node_id,
+            "label": label,
+            "type": node_type,
+            "data": data or {}
+        } for node_id, label, node_type, data in zip(self.node_ids, self.node_labels, self.node_types, self.node_data)]
+        
+        edges = []
+        for source in range(len(self.node_ids)):
+            for e in range(self.offsets[source], self.offsets[source + 1]):
+                edges.append({
+                    "id": self.edge_ids[e],
+                    "source": self.node_ids[source],
+                    "target": self.node_ids[self.targets[e]],
+                    "type": self.type_names[self.edge_types[e]],
+                    "data": self.edge_data[e] or {}
+                })
+        
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "stats": {
+                "num_nodes": len(nodes),
+                "num_edges": len(edges),
+                "truncated": self.truncated
+            }
+        }
+
+
+class GraphCache:
+    """Thread-safe LRU/TTL cache of network views"""
+    
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Initialize graph cache.
+        
+        Args:
+            max_entries: Views kept (defaults to GRAPH_CACHE_SIZE env var or 128)
+            ttl: Seconds a view is served (defaults to GRAPH_CACHE_TTL env var or 300)
+        """
+        self.max_entries = max_entries or int(os.getenv('GRAPH_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        self.ttl = ttl or float(os.getenv('GRAPH_CACHE_TTL', DEFAULT_CACHE_TTL))
+        self.generation = 0
+        self._entries: 'OrderedDict[GraphKey, Tuple[float, CompactGraph]]' = OrderedDict()
+        # Recently requested keys, kept across invalidation so refresh() can rebuild them
+        self._hot: 'OrderedDict[GraphKey, None]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: GraphKey) -> Optional[CompactGraph]:
+        """
+        Look up a fresh view.
+        
+        Args:
+            key: View key
+            
+        Returns:
+            Cached view, or None if missing or expired
+        """
+        with self._lock:
+            self._touch(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: GraphKey, graph: CompactGraph, generation: Optional[int] = None) -> bool:
+        """
+        Store a view.
+        
+        Args:
+            key: View key
+            graph: View to store
+            generation: Cache generation read before the view was computed; if
+                the graph has been invalidated since, the view is discarded
+                
+        Returns:
+            True if the view was stored
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._touch(key)
+            self._entries[key] = (time.monotonic(), graph)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+    
+    def invalidate(self):
+        """Drop every view after the graph has changed."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+    
+    def stale_keys(self) -> List[GraphKey]:
+        """Recently requested keys that have no fresh view."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key in self._hot
+                    if key not in self._entries or now - self._entries[key][0] > self.ttl]
+    
+    async def refresh(self, fetch: Callable[[GraphKey], Awaitable[Dict]]) -> int:
+        """
+        Rebuild stale views of recently requested keys.
+        
+        Args:
+            fetch: Coroutine function returning get_threat_subgraph output for a key
+            
+        Returns:
+            Number of views rebuilt
+        """
+        rebuilt = 0
+        for key in self.stale_keys():
+            generation = self.generation
+            try:
+                subgraph = await fetch(key)
+            except Exception as e:
+                logger.error(f"Error refreshing network view {key}: {e}")
+                continue
+            if subgraph.get('nodes') and self.put(key, CompactGraph.from_subgraph(subgraph), generation):
+                rebuilt += 1
+        return rebuilt
+    
+    def _touch(self, key: GraphKey):
+        self._hot[key] = None
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.max_entries:
+            self._hot.popitem(last=False)
+
+
+async def refresh_periodically(cache: GraphCache,
+                               fetch: Callable[[GraphKey], Awaitable[Dict]],
+                               interval: float):
+    """
+    Rebuild stale views every ``interval`` seconds until cancelled.
+    
+    Args:
+        cache: Cache to refresh
+        fetch: Coroutine function returning get_threat_subgraph output for a key
+        interval: Seconds between refreshes
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            rebuilt = await cache.refresh(fetch)
+            if rebuilt:
+                logger.info(f"Rebuilt {rebuilt} network views")
+        except Exception as e:
+            logger.error(f"Error refreshing network views: {e}")
+
+
+_graph_cache: Optional[GraphCache] = None
+_graph_cache_lock = threading.Lock()
+
+
+def get_graph_cache() -> GraphCache:
+    """Process-wide network view cache."""
+    global _graph_cache
+    
+    with _graph_cache_lock:
+        if _graph_cache is None:
+            _graph_cache = GraphCache()
+        return _graph_cache
+
+
+def invalidate_graph_cache():
+    """Drop cached network views (called after writes to the graph)."""
+    if _graph_cache is not None:
+        _graph_cache.invalidate()
@@ -0,0 +1,246 @@
+"""Async Neo4j integration for the API"""
+
+from typing import List, Dict, Optional
+import logging
+
+from .neo4j_graph import (
+    driver_config,
+    threat_network_query,
+    path_record,
+    subgraph_bounds,
+    subgraph_seed_query,
+    subgraph_hop_query,
+    apoc_subgraph_query,
+    SubgraphAccumulator,
+    ALL_ACTORS_QUERY,
+    ACTOR_DETAILS_QUERY,
+    ACTOR_IOCS_QUERY,
+    ALL_CAMPAIGNS_QUERY,
+    CAMPAIGN_DETAILS_QUERY,
+    CAMPAIGN_IOCS_QUERY
+)
+
+try:
+    from neo4j import AsyncGraphDatabase
+    NEO4J_AVAILABLE = True
+except ImportError:
+    NEO4J_AVAILABLE = False
+    logging.warning("Neo4j not available. Install with: pip install neo4j")
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNeo4jClient:
+    """Non-blocking Neo4j client for graph reads from async handlers"""
+    
+    def __init__(self,
+                 uri: Optional[str] = None,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 max_connection_pool_size: Optional[int] = None):
+        """
+        Initialize async Neo4j client.
+        
+        The driver connects lazily and keeps a pool of connections, so one
+        client should be shared by the whole process.
+        
+        Args:
+            uri: Neo4j URI (defaults to NEO4J_URI env var or bolt://localhost:7687)
+            username: Username (defaults to NEO4J_USER env var or neo4j)
+            password: Password (defaults to NEO4J_PASSWORD env var)
+            max_connection_pool_size: Pooled connections (defaults to NEO4J_POOL_SIZE env var or 50)
+        """
+        if not NEO4J_AVAILABLE:
+            raise ImportError("Neo4j not installed. Install with: pip install neo4j")
+        
+        self.driver = AsyncGraphDatabase.driver(**driver_config(uri, username, password, max_connection_pool_size))
+    
+    async def close(self):
+        """Close Neo4j connections."""
+        await self.driver.close()
+    
+    async def _fetch(self, query: str, **params) -> List:
+        """Run a read query and return all records."""
+        async with self.driver.session() as session:
+            result = await session.run(query, **params)
+            return [record async for record in result]
+    
+    async def get_threat_network(self, actor_name: Optional[str] = None, depth: int = 2) -> List[Dict]:
+        """
+        Get threat actor network graph.
+        
+        Args:
+            actor_name: Optional starting actor name
+            depth: Graph depth to traverse
+            
+        Returns:
+            List of node and relationship dictionaries
+        """
+        query, params = threat_network_query(actor_name, depth)
+        
+        try:
+            return [path_record(record) for record in await self._fetch(query, **params)]
+        except Exception as e:
+            logger.error(f"Error getting threat network: {e}")
+            return []
+    
+    async def get_threat_subgraph(self,
+                                  actor_name: Optional[str] = None,
+                                  depth: int = 2,
+                                  relationship_types: Optional[List[str]] = None,
+                                  fanout: Optional[int] = None,
+                                  limit: Optional[int] = None,
+                                  use_apoc: bool = False) -> Dict:
+        """
+        Get the deduplicated subgraph around threat actors.
+        
+        See Neo4jClient.get_threat_subgraph.
+        
+        Args:
+            actor_name: Optional starting actor name (all actors if omitted)
+            depth: Number of hops to expand
+            relationship_types: Relationship types to follow (all types if empty)
+            fanout: Neighbours per node per hop (defaults to NEO4J_HOP_FANOUT env var or 25)
+            limit: Maximum nodes returned (defaults to NEO4J_SUBGRAPH_LIMIT env var or 500)
+            use_apoc: Use APOC subgraphAll (requires the APOC plugin)
+            
+        Returns:
+            Dictionary with distinct ``nodes``, ``relationships`` and ``truncated``
+        """
+        fanout, limit = subgraph_bounds(fanout, limit)
+        subgraph = SubgraphAccumulator(limit)
+        
+        try:
+            if use_apoc:
+                query, params = apoc_subgraph_query(actor_name, depth, relationship_types, limit)
+                for record in await self._fetch(query, **params):
+                    subgraph.add_subgraph(record)
+                return subgraph.result()
+            
+            query, params = subgraph_seed_query(actor_name, limit)
+            frontier = subgraph.add_seeds(await self._fetch(query, **params))
+            hop_query = subgraph_hop_query(relationship_types)
+            
+            for _ in range(depth):
+                if not frontier:
+                    break
+                frontier = subgraph.add_hop(await self._fetch(hop_query, frontier=frontier, fanout=fanout))
+            
+            return subgraph.result()
+        except Exception as e:
+            logger.error(f"Error getting threat subgraph: {e}")
+            return subgraph.result()
+    
+    async def get_all_actors(self, limit: int = 100) -> List[Dict]:
+        """
+        Get all threat actors.
+        
+        Args:
+            limit: Maximum number of actors to return
+            
+        Returns:
+            List of threat actor dictionaries
+        """
+        try:
+            return [dict(record) for record in await self._fetch(ALL_ACTORS_QUERY, limit=limit)]
+        except Exception as e:
+            logger.error(f"Error getting all actors: {e}")
+            return []
+    
+    async def get_actor_details(self, actor_name: str) -> Optional[Dict]:
+        """
+        Get details for a specific threat actor.
+        
+        Args:
+            actor_name: Threat actor name
+            
+        Returns:
+            Actor details dictionary or None if not found
+        """
+        try:
+            records = await self._fetch(ACTOR_DETAILS_QUERY, name=actor_name)
+            if not records:
+                return None
+            
+            record = records[0]
+            actor_data = dict(record['a'])
+            actor_data['iocs'] = record['iocs'] or []
+            actor_data['related_actors'] = record['related_actors'] or []
+            
+            return actor_data
+        except Exception as e:
+            logger.error(f"Error getting actor details: {e}")
+            return None
+    
+    async def get_actor_iocs(self, actor_name: str) -> List[Dict]:
+        """
+        Get all IOCs associated with a threat actor.
+        
+        Args:
+            actor_name: Threat actor name
+            
+        Returns:
+            List of IOC dictionaries
+        """
+        try:
+            return [dict(record) for record in await self._fetch(ACTOR_IOCS_QUERY, name=actor_name)]
+        except Exception as e:
+            logger.error(f"Error getting actor IOCs: {e}")
+            return []
+    
+    async def get_all_campaigns(self, limit: int = 100) -> List[Dict]:
+        """
+        Get all campaigns.
+        
+        Args:
+            limit: Maximum number of campaigns to return
+            
+        Returns:
+            List of campaign dictionaries
+        """
+        try:
+            return [dict(record) for record in await self._fetch(ALL_CAMPAIGNS_QUERY, limit=limit)]
+        except Exception as e:
+            logger.error(f"Error getting all campaigns: {e}")
+            return []
+    
+    async def get_campaign_details(self, campaign_id: str) -> Optional[Dict]:
+        """
+        Get details for a specific campaign.
+        
+        Args:
+            campaign_id: Campaign identifier
+            
+        Returns:
+            Campaign details dictionary or None if not found
+        """
+        try:
+            records = await self._fetch(CAMPAIGN_DETAILS_QUERY, campaign_id=campaign_id)
+            if not records:
+                return None
+            
+            record = records[0]
+            campaign_data = dict(record['c'])
+            campaign_data['iocs'] = record['iocs'] or []
+            campaign_data['threat_actors'] = record['threat_actors'] or []
+            
+            return campaign_data
+        except Exception as e:
+            logger.error(f"Error getting campaign details: {e}")
+            return None
+    
+    async def get_campaign_iocs(self, campaign_id: str) -> List[Dict]:
+        """
+        Get all IOCs in a campaign.
+        
+        Args:
+            campaign_id: Campaign identifier
+            
+        Returns:
+            List of IOC dictionaries
+        """
+        try:
+            return [dict(record) for record in await self._fetch(CAMPAIGN_IOCS_QUERY, campaign_id=campaign_id)]
+        except Exception as e:
+            logger.error(f"Error getting campaign IOCs: {e}")
+            return []
@@ -1,10 +1,14 @@
 """Neo4j graph database integration for threat actor network"""
 
 import os
+import re
+from collections import defaultdict
 from typing import List, Dict, Optional
 from datetime import datetime
 import logging
 
+from .graph_cache import invalidate_graph_cache
+
 try:
     from neo4j import GraphDatabase
     NEO4J_AVAILABLE = True
@@ -14,6 +18,435 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Connections kept open by the process-wide driver (overridable with NEO4J_POOL_SIZE)
+DEFAULT_POOL_SIZE = 50
+
+# Rows sent per UNWIND write transaction (overridable with NEO4J_WRITE_BATCH_SIZE)
+DEFAULT_WRITE_BATCH_SIZE = 5000
+
+# Subgraph traversal bounds (overridable with NEO4J_HOP_FANOUT / NEO4J_SUBGRAPH_LIMIT)
+DEFAULT_HOP_FANOUT = 25
+DEFAULT_SUBGRAPH_LIMIT = 500
+
+# Relationship types cannot be query parameters, so they are checked before formatting
+_RELATIONSHIP_TYPE = re.compile(r'^[A-Z][A-Z0-9_]*$')
+
+# Map projections used by the subgraph queries (``n`` is a node, ``r`` a relationship)
+SUBGRAPH_NODE = "{id: elementId(n), labels: labels(n), properties: properties(n)}"
+SUBGRAPH_RELATIONSHIP = ("{id: elementId(r), type: type(r), source: elementId(startNode(r)), "
+                         "target: elementId(endNode(r)), properties: properties(r)}")
+
+
+def driver_config(uri: Optional[str] = None,
+                  username: Optional[str] = None,
+                  password: Optional[str] = None,
+                  max_connection_pool_size: Optional[int] = None) -> Dict:
+    """
+    Build driver arguments shared by the sync and async clients.
+    
+    Args:
+        uri: Neo4j URI (defaults to NEO4J_URI env var or bolt://localhost:7687)
+        username: Username (defaults to NEO4J_USER env var or neo4j)
+        password: Password (defaults to NEO4J_PASSWORD env var)
+        max_connection_pool_size: Pooled connections (defaults to NEO4J_POOL_SIZE env var or 50)
+        
+    Returns:
+        Keyword arguments for GraphDatabase.driver / AsyncGraphDatabase.driver
+    """
+    return {
+        'uri': uri or os.getenv('NEO4J_URI', 'bolt://localhost:7687'),
+        'auth': (username or os.getenv('NEO4J_USER', 'neo4j'),
+                 password or os.getenv('NEO4J_PASSWORD', 'password')),
+        'max_connection_pool_size': max_connection_pool_size or int(os.getenv('NEO4J_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        # Fail fast when the pool is exhausted instead of hanging a request for a minute
+        'connection_acquisition_timeout': float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', '10')),
+        # Recycle connections before load balancers and firewalls drop idle ones
+        'max_connection_lifetime': 3600,
+        'keep_alive': True
+    }
+
+
+def threat_network_query(actor_name: Optional[str], depth: int):
+    """
+    Cypher query and parameters for the threat actor network.
+    
+    Returns:
+        Tuple of (query, parameters)
+    """
+    if actor_name:
+        query = f"""
+        MATCH path = (a:ThreatActor {{name: $actor_name}})-[*1..{depth}]-(related)
+        RETURN nodes(path) as nodes, relationships(path) as relationships
+        LIMIT 100
+        """
+        return query, {'actor_name': actor_name}
+    
+    query = f"""
+    MATCH path = (a:ThreatActor)-[*1..{depth}]-(related)
+    RETURN nodes(path) as nodes, relationships(path) as relationships
+    LIMIT 100
+    """
+    return query, {}
+
+
+def relationship_type(name: str) -> str:
+    """
+    Validate a relationship type before it is formatted into Cypher.
+    
+    Args:
+        name: Relationship type such as USES or ASSOCIATED_WITH
+        
+    Returns:
+        The relationship type
+        
+    Raises:
+        ValueError: If the name is not an upper-case identifier
+    """
+    if not isinstance(name, str) or not _RELATIONSHIP_TYPE.match(name):
+        raise ValueError(f"Invalid relationship type: {name!r}")
+    return name
+
+
+def group_by_relationship(links: List[Dict], default: str) -> Dict[str, List[Dict]]:
+    """
+    Group link rows by relationship type so each type is one UNWIND query.
+    
+    Rows with an invalid type are logged and dropped.
+    
+    Args:
+        links: Link dictionaries with an optional ``relationship`` key
+        default: Relationship type for rows without one
+        
+    Returns:
+        Dictionary of relationship type to rows
+    """
+    groups = defaultdict(list)
+    for link in links:
+        try:
+            groups[relationship_type(link.get('relationship') or default)].append(link)
+        except ValueError as e:
+            logger.warning(f"Skipping link: {e}")
+    return dict(groups)
+
+
+def relationship_pattern(relationship_types: Optional[List[str]]) -> str:
+    """Relationship type filter for a pattern, e.g. ':USES|ASSOCIATED_WITH' ('' for any type)."""
+    if not relationship_types:
+        return ''
+    return ':' + '|'.join(relationship_type(name) for name in relationship_types)
+
+
+def subgraph_bounds(fanout: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Resolve subgraph traversal bounds.
+    
+    Returns:
+        Tuple of (neighbours expanded per node per hop, maximum nodes returned)
+    """
+    return (fanout or int(os.getenv('NEO4J_HOP_FANOUT', DEFAULT_HOP_FANOUT)),
+            limit or int(os.getenv('NEO4J_SUBGRAPH_LIMIT', DEFAULT_SUBGRAPH_LIMIT)))
+
+
+def subgraph_seed_query(actor_name: Optional[str], limit: int):
+    """
+    Query for the traversal's starting actors (looked up through the actor_name constraint).
+    
+    Returns:
+        Tuple of (query, parameters)
+    """
+    if actor_name:
+        query = f"""
+        MATCH (n:ThreatActor {{name: $actor_name}})
+        RETURN {SUBGRAPH_NODE} AS node
+        """
+        return query, {'actor_name': actor_name}
+    
+    query = f"""
+    MATCH (n:ThreatActor)
+    RETURN {SUBGRAPH_NODE} AS node
+    LIMIT $limit
+    """
+    return query, {'limit': limit}
+
+
+def subgraph_hop_query(relationship_types: Optional[List[str]] = None) -> str:
+    """
+    Query expanding one hop from $frontier, keeping at most $fanout neighbours per node.
+    
+    Args:
+        relationship_types: Relationship types to follow (all types if empty)
+        
+    Returns:
+        Cypher query
+    """
+    return f"""
+    UNWIND $frontier AS node_id
+    MATCH (source) WHERE elementId(source) = node_id
+    CALL {{
+        WITH source
+        MATCH (source)-[r{relationship_pattern(relationship_types)}]-(n)
+        RETURN r, n
+        LIMIT $fanout
+    }}
+    RETURN {SUBGRAPH_RELATIONSHIP} AS relationship, {SUBGRAPH_NODE} AS node
+    """
+
+
+def apoc_subgraph_query(actor_name: Optional[str],
+                        depth: int,
+                        relationship_types: Optional[List[str]],
+                        limit: int):
+    """
+    Single APOC ``subgraphAll`` query returning the whole deduplicated subgraph.
+    
+    Returns:
+        Tuple of (query, parameters)
+    """
+    seed = ("MATCH (a:ThreatActor {name: $actor_name})" if actor_name
+            else "MATCH (a:ThreatActor) WITH a LIMIT $limit")
+    query = f"""
+    {seed}
+    WITH collect(a) AS seeds
+    CALL apoc.path.subgraphAll(seeds, {{
+        maxLevel: $depth,
+        relationshipFilter: $relationship_filter,
+        limit: $limit
+    }})
+    YIELD nodes, relationships
+    RETURN [n IN nodes | {SUBGRAPH_NODE}] AS nodes,
+           [r IN relationships | {SUBGRAPH_RELATIONSHIP}] AS relationships
+    """
+    params = {
+        'actor_name': actor_name,
+        'depth': depth,
+        'relationship_filter': relationship_pattern(relationship_types)[1:],
+        'limit': limit
+    }
+    return query, params
+
+
+class SubgraphAccumulator:
+    """Collects distinct nodes and relationships while a subgraph is expanded hop by hop"""
+    
+    def __init__(self, limit: int):
+        """
+        Initialize accumulator.
+        
+        Args:
+            limit: Maximum number of nodes to keep
+        """
+        self.limit = limit
+        self.nodes: Dict[str, Dict] = {}
+        self.relationships: Dict[str, Dict] = {}
+        self.truncated = False
+    
+    def _add_node(self, node: Dict) -> bool:
+        """Add a node; returns True if it is new."""
+        if node['id'] in self.nodes:
+            return False
+        if len(self.nodes) >= self.limit:
+            self.truncated = True
+            return False
+        self.nodes[node['id']] = node
+        return True
+    
+    def add_seeds(self, records) -> List[str]:
+        """
+        Add starting nodes.
+        
+        Returns:
+            Element IDs of the first frontier
+        """
+        return [record['node']['id'] for record in records if self._add_node(dict(record['node']))]
+    
+    def add_hop(self, records) -> List[str]:
+        """
+        Add the relationships and neighbours found by one hop query.
+        
+        Relationships to neighbours dropped by the node limit are dropped too.
+        
+        Returns:
+            Element IDs of nodes first reached in this hop (the next frontier)
+        """
+        frontier = []
+        for record in records:
+            node = record['node']
+            if self._add_node(dict(node)):
+                frontier.append(node['id'])
+            if node['id'] in self.nodes:
+                relationship = dict(record['relationship'])
+                self.relationships.setdefault(relationship['id'], relationship)
+        return frontier
+    
+    def add_subgraph(self, record) -> 'SubgraphAccumulator':
+        """Add the nodes and relationships of an APOC subgraph record."""
+        for node in record['nodes']:
+            self._add_node(dict(node))
+        for relationship in record['relationships']:
+            if relationship['source'] in self.nodes and relationship['target'] in self.nodes:
+                self.relationships.setdefault(relationship['id'], dict(relationship))
+        return self
+    
+    def result(self) -> Dict:
+        """
+        Subgraph as plain dictionaries.
+        
+        Returns:
+            Dictionary with ``nodes`` ({id, labels, properties}), ``relationships``
+            ({id, type, source, target, properties}) and ``truncated``
+        """
+        return {
+            'nodes': list(self.nodes.values()),
+            'relationships': list(self.relationships.values()),
+            'truncated': self.truncated
+        }
+
+
+def path_record(record) -> Dict:
+    """Nodes and relationships of a path record as dictionaries."""
+    return {
+        'nodes': [dict(node) for node in record['nodes']],
+        'relationships': [dict(rel) for rel in record['relationships']]
+    }
+
+
+# Read queries shared by Neo4jClient and AsyncNeo4jClient
+
+ALL_ACTORS_QUERY = """
+MATCH (a:ThreatActor)
+RETURN a.name as name, 
+       a.aliases as aliases,
+       a.country_of_origin as country_of_origin,
+       a.sector_targets as sector_targets,
+       a.updated_at as updated_at
+LIMIT $limit
+"""
+
+ACTOR_DETAILS_QUERY = """
+MATCH (a:ThreatActor {name: $name})
+OPTIONAL MATCH (a)-[:USES]->(i:IOC)
+OPTIONAL MATCH (a)-[:ASSOCIATED_WITH]-(related:ThreatActor)
+RETURN a,
+       collect(DISTINCT i.ioc_value) as iocs,
+       collect(DISTINCT related.name) as related_actors
+"""
+
+ACTOR_IOCS_QUERY = """
+MATCH (a:ThreatActor {name: $name})-[r:USES]->(i:IOC)
+RETURN i.ioc_value as ioc_value,
+       i.ioc_type as ioc_type,
+       i.ioc_id as ioc_id,
+       i.source as source,
+       i.threat_type as threat_type,
+       i.confidence as confidence,
+       i.first_seen as first_seen,
+       i.last_seen as last_seen,
+       i.tags as tags
+"""
+
+ALL_CAMPAIGNS_QUERY = """
+MATCH (c:Campaign)
+OPTIONAL MATCH (c)<-[:FROM_CAMPAIGN]-(i:IOC)
+RETURN c.campaign_id as campaign_id,
+       c.name as name,
+       c.description as description,
+       c.start_date as start_date,
+       c.end_date as end_date,
+       count(i) as num_iocs,
+       c.updated_at as updated_at
+ORDER BY c.updated_at DESC
+LIMIT $limit
+"""
+
+CAMPAIGN_DETAILS_QUERY = """
+MATCH (c:Campaign {campaign_id: $campaign_id})
+OPTIONAL MATCH (c)<-[:FROM_CAMPAIGN]-(i:IOC)
+OPTIONAL MATCH (i)<-[:USES]-(a:ThreatActor)
+RETURN c,
+       collect(DISTINCT i.ioc_value) as iocs,
+       collect(DISTINCT a.name) as threat_actors
+"""
+
+CAMPAIGN_IOCS_QUERY = """
+MATCH (c:Campaign {campaign_id: $campaign_id})<-[:FROM_CAMPAIGN]-(i:IOC)
+RETURN i.ioc_value as ioc_value,
+       i.ioc_type as ioc_type,
+       i.ioc_id as ioc_id,
+       i.source as source,
+       i.threat_type as threat_type,
+       i.confidence as confidence,
+       i.first_seen as first_seen,
+       i.last_seen as last_seen,
+       i.tags as tags
+ORDER BY i.first_seen DESC
+"""
+
+# Batched write queries; each runs once per chunk with the chunk bound to $rows
+
+IOC_BATCH_QUERY = """
+UNWIND $rows AS ioc
+MERGE (i:IOC {ioc_id: ioc.ioc_id})
+SET i.ioc_value = ioc.ioc_value,
+    i.ioc_type = ioc.ioc_type,
+    i.source = ioc.source,
+    i.threat_type = ioc.threat_type,
+    i.first_seen = ioc.first_seen,
+    i.last_seen = ioc.last_seen,
+    i.confidence = ioc.confidence,
+    i.tags = ioc.tags,
+    i.updated_at = datetime()
+"""
+
+ACTOR_BATCH_QUERY = """
+UNWIND $rows AS row
+MERGE (a:ThreatActor {name: row.name})
+SET a.aliases = row.aliases,
+    a.country_of_origin = row.country_of_origin,
+    a.sector_targets = row.sector_targets,
+    a.updated_at = datetime()
+"""
+
+CAMPAIGN_BATCH_QUERY = """
+UNWIND $rows AS row
+MERGE (c:Campaign {campaign_id: row.campaign_id})
+SET c.name = row.name,
+    c.description = row.description,
+    c.start_date = row.start_date,
+    c.end_date = row.end_date,
+    c.updated_at = datetime()
+"""
+
+IOC_CAMPAIGN_LINK_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (i:IOC {ioc_id: row.ioc_id})
+MATCH (c:Campaign {campaign_id: row.campaign_id})
+MERGE (i)-[:FROM_CAMPAIGN]->(c)
+"""
+
+
+def ioc_actor_link_batch_query(relationship: str) -> str:
+    """Batched actor-to-IOC link query for one relationship type."""
+    return f"""
+    UNWIND $rows AS row
+    MATCH (i:IOC {{ioc_id: row.ioc_id}})
+    MATCH (a:ThreatActor {{name: row.actor_name}})
+    MERGE (a)-[:{relationship_type(relationship)}]->(i)
+    """
+
+
+def actor_link_batch_query(relationship: str) -> str:
+    """Batched actor-to-actor link query for one relationship type."""
+    return f"""
+    UNWIND $rows AS row
+    MATCH (a1:ThreatActor {{name: row.actor1}})
+    MATCH (a2:ThreatActor {{name: row.actor2}})
+    MERGE (a1)-[:{relationship_type(relationship)}]->(a2)
+    """
+
+
+def _run_batch(tx, query: str, rows: List[Dict]):
+    tx.run(query, rows=rows).consume()
+
 
 class Neo4jClient:
     """Neo4j client for threat graph construction"""
@@ -21,7 +454,9 @@ class Neo4jClient:
     def __init__(self,
                  uri: Optional[str] = None,
                  username: Optional[str] = None,
-                 password: Optional[str] = None):
+                 password: Optional[str] = None,
+                 max_connection_pool_size: Optional[int] = None,
+                 write_batch_size: Optional[int] = None):
         """
         Initialize Neo4j client.
         
@@ -29,15 +464,15 @@ class Neo4jClient:
             uri: Neo4j URI (defaults to NEO4J_URI env var or bolt://localhost:7687)
             username: Username (defaults to NEO4J_USER env var or neo4j)
             password: Password (defaults to NEO4J_PASSWORD env var)
+            max_connection_pool_size: Pooled connections (defaults to NEO4J_POOL_SIZE env var or 50)
+            write_batch_size: Rows per write transaction in the bulk_* methods
+                (defaults to NEO4J_WRITE_BATCH_SIZE env var or 5000)
         """
         if not NEO4J_AVAILABLE:
             raise ImportError("Neo4j not installed. Install with: pip install neo4j")
         
-        uri = uri or os.getenv('NEO4J_URI', 'bolt://localhost:7687')
-        username = username or os.getenv('NEO4J_USER', 'neo4j')
-        password = password or os.getenv('NEO4J_PASSWORD', 'password')
-        
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        self.driver = GraphDatabase.driver(**driver_config(uri, username, password, max_connection_pool_size))
+        self.write_batch_size = write_batch_size or int(os.getenv('NEO4J_WRITE_BATCH_SIZE', DEFAULT_WRITE_BATCH_SIZE))
     
     def close(self):
         """Close Neo4j connection."""
@@ -85,6 +520,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, **ioc)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error creating IOC node: {e}")
@@ -121,6 +557,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, **params)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error creating threat actor: {e}")
@@ -147,6 +584,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, ioc_id=ioc_id, actor_name=actor_name)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error linking IOC to actor: {e}")
@@ -183,6 +621,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, **params)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error creating campaign: {e}")
@@ -208,6 +647,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, ioc_id=ioc_id, campaign_id=campaign_id)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error linking IOC to campaign: {e}")
@@ -234,6 +674,7 @@ class Neo4jClient:
         try:
             with self.driver.session() as session:
                 session.run(query, actor1=actor1, actor2=actor2)
+            invalidate_graph_cache()
             return True
         except Exception as e:
             logger.error(f"Error linking actors: {e}")
@@ -250,37 +691,98 @@ class Neo4jClient:
         Returns:
             List of node and relationship dictionaries
         """
-        if actor_name:
-            query = f"""
-            MATCH path = (a:ThreatActor {{name: $actor_name}})-[*1..{depth}]-(related)
-            RETURN nodes(path) as nodes, relationships(path) as relationships
-            LIMIT 100
-            """
-            params = {'actor_name': actor_name}
-        else:
-            query = f"""
-            MATCH path = (a:ThreatActor)-[*1..{depth}]-(related)
-            RETURN nodes(path) as nodes, relationships(path) as relationships
-            LIMIT 100
-            """
-            params = {}
+        query, params = threat_network_query(actor_name, depth)
         
         try:
             with self.driver.session() as session:
                 result = session.run(query, **params)
-                paths = []
-                for record in result:
-                    nodes = [dict(node) for node in record['nodes']]
-                    relationships = [dict(rel) for rel in record['relationships']]
-                    paths.append({
-                        'nodes': nodes,
-                        'relationships': relationships
-                    })
-                return paths
+                return [path_record(record) for record in result]
         except Exception as e:
             logger.error(f"Error getting threat network: {e}")
             return []
     
+    def _write_batches(self, query: str, rows: List[Dict], label: str) -> int:
+        """
+        Run a batched write query over rows in chunks of ``write_batch_size``.
+        
+        Each chunk is one explicit write transaction, so a failed chunk is
+        retried by the driver on transient errors and rolled back on others.
+        Cached network views are invalidated once rows have been written.
+        
+        Args:
+            query: UNWIND query reading the chunk from $rows
+            rows: Parameter rows
+            label: What is being written, for error messages
+            
+        Returns:
+            Number of rows committed before any error
+        """
+        written = 0
+        
+        try:
+            with self.driver.session() as session:
+                for start in range(0, len(rows), self.write_batch_size):
+                    chunk = rows[start:start + self.write_batch_size]
+                    session.execute_write(_run_batch, query, chunk)
+                    written += len(chunk)
+        except Exception as e:
+            logger.error(f"Error bulk {label}: {e}")
+        
+        if written:
+            invalidate_graph_cache()
+        return written
+    
+    def get_threat_subgraph(self,
+                            actor_name: Optional[str] = None,
+                            depth: int = 2,
+                            relationship_types: Optional[List[str]] = None,
+                            fanout: Optional[int] = None,
+                            limit: Optional[int] = None,
+                            use_apoc: bool = False) -> Dict:
+        """
+        Get the deduplicated subgraph around threat actors.
+        
+        The traversal expands one hop per query, following at most ``fanout``
+        relationships from each node, so dense IOC hubs cannot blow up the
+        result. With ``use_apoc`` a single ``apoc.path.subgraphAll`` call is
+        made instead (``limit`` bounds it, but there is no per-hop fan-out cap).
+        
+        Args:
+            actor_name: Optional starting actor name (all actors if omitted)
+            depth: Number of hops to expand
+            relationship_types: Relationship types to follow (all types if empty)
+            fanout: Neighbours per node per hop (defaults to NEO4J_HOP_FANOUT env var or 25)
+            limit: Maximum nodes returned (defaults to NEO4J_SUBGRAPH_LIMIT env var or 500)
+            use_apoc: Use APOC subgraphAll (requires the APOC plugin)
+            
+        Returns:
+            Dictionary with distinct ``nodes`` and ``relationships`` keyed by
+            element ID, and ``truncated`` when the node limit was reached
+        """
+        fanout, limit = subgraph_bounds(fanout, limit)
+        subgraph = SubgraphAccumulator(limit)
+        
+        try:
+            with self.driver.session() as session:
+                if use_apoc:
+                    query, params = apoc_subgraph_query(actor_name, depth, relationship_types, limit)
+                    record = session.run(query, **params).single()
+                    return subgraph.add_subgraph(record).result() if record else subgraph.result()
+                
+                query, params = subgraph_seed_query(actor_name, limit)
+                frontier = subgraph.add_seeds(session.run(query, **params))
+                hop_query = subgraph_hop_query(relationship_types)
+                
+                for _ in range(depth):
+                    if not frontier:
+                        break
+                    frontier = subgraph.add_hop(session.run(hop_query, frontier=frontier, fanout=fanout))
+                
+                return subgraph.result()
+        except Exception as e:
+            logger.error(f"Error getting threat subgraph: {e}")
+            return subgraph.result()
+    
     def bulk_create_iocs(self, iocs: List[Dict]) -> int:
         """
         Bulk create IOC nodes.
@@ -294,28 +796,94 @@ class Neo4jClient:
         if not iocs:
             return 0
         
-        query = """
-        UNWIND $iocs AS ioc
-        MERGE (i:IOC {ioc_id: ioc.ioc_id})
-        SET i.ioc_value = ioc.ioc_value,
-            i.ioc_type = ioc.ioc_type,
-            i.source = ioc.source,
-            i.threat_type = ioc.threat_type,
-            i.first_seen = ioc.first_seen,
-            i.last_seen = ioc.last_seen,
-            i.confidence = ioc.confidence,
-            i.tags = ioc.tags,
-            i.updated_at = datetime()
+        return self._write_batches(IOC_BATCH_QUERY, iocs, 'creating IOCs')
+    
+    def bulk_create_threat_actors(self, actors: List[Dict]) -> int:
         """
+        Bulk create or update threat actor nodes.
         
-        try:
-            with self.driver.session() as session:
-                result = session.run(query, iocs=iocs)
-                result.consume()
-                return len(iocs)
-        except Exception as e:
-            logger.error(f"Error bulk creating IOCs: {e}")
-            return 0
+        Args:
+            actors: Dictionaries with ``name`` and optional ``aliases``,
+                ``country_of_origin`` and ``sector_targets``
+                
+        Returns:
+            Number of actors written
+        """
+        rows = [{
+            'name': actor['name'],
+            'aliases': actor.get('aliases', []),
+            'country_of_origin': actor.get('country_of_origin', ''),
+            'sector_targets': actor.get('sector_targets', [])
+        } for actor in actors]
+        
+        return self._write_batches(ACTOR_BATCH_QUERY, rows, 'creating threat actors')
+    
+    def bulk_create_campaigns(self, campaigns: List[Dict]) -> int:
+        """
+        Bulk create or update campaign nodes.
+        
+        Args:
+            campaigns: Dictionaries with ``campaign_id`` and optional ``name``,
+                ``description``, ``start_date`` and ``end_date``
+                
+        Returns:
+            Number of campaigns written
+        """
+        rows = [{
+            'campaign_id': campaign['campaign_id'],
+            'name': campaign.get('name', ''),
+            'description': campaign.get('description', ''),
+            'start_date': campaign.get('start_date', ''),
+            'end_date': campaign.get('end_date', '')
+        } for campaign in campaigns]
+        
+        return self._write_batches(CAMPAIGN_BATCH_QUERY, rows, 'creating campaigns')
+    
+    def bulk_link_iocs_to_actors(self, links: List[Dict]) -> int:
+        """
+        Bulk link IOCs to threat actors.
+        
+        Args:
+            links: Dictionaries with ``ioc_id``, ``actor_name`` and optional
+                ``relationship`` (default: USES)
+                
+        Returns:
+            Number of links written
+        """
+        return sum(
+            self._write_batches(ioc_actor_link_batch_query(relationship), rows, 'linking IOCs to actors')
+            for relationship, rows in group_by_relationship(links, 'USES').items()
+        )
+    
+    def bulk_link_iocs_to_campaigns(self, links: List[Dict]) -> int:
+        """
+        Bulk link IOCs to campaigns.
+        
+        Args:
+            links: Dictionaries with ``ioc_id`` and ``campaign_id``
+            
+        Returns:
+            Number of links written
+        """
+        rows = [{'ioc_id': link['ioc_id'], 'campaign_id': link['campaign_id']} for link in links]
+        
+        return self._write_batches(IOC_CAMPAIGN_LINK_BATCH_QUERY, rows, 'linking IOCs to campaigns')
+    
+    def bulk_link_actors(self, links: List[Dict]) -> int:
+        """
+        Bulk link threat actors to each other.
+        
+        Args:
+            links: Dictionaries with ``actor1``, ``actor2`` and optional
+                ``relationship`` (default: ASSOCIATED_WITH)
+                
+        Returns:
+            Number of links written
+        """
+        return sum(
+            self._write_batches(actor_link_batch_query(relationship), rows, 'linking actors')
+            for relationship, rows in group_by_relationship(links, 'ASSOCIATED_WITH').items()
+        )
     
     def get_all_actors(self, limit: int = 100) -> List[Dict]:
         """
@@ -327,19 +895,9 @@ class Neo4jClient:
         Returns:
             List of threat actor dictionaries
         """
-        query = """
-        MATCH (a:ThreatActor)
-        RETURN a.name as name, 
-               a.aliases as aliases,
-               a.country_of_origin as country_of_origin,
-               a.sector_targets as sector_targets,
-               a.updated_at as updated_at
-        LIMIT $limit
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, limit=limit)
+                result = session.run(ALL_ACTORS_QUERY, limit=limit)
                 actors = [dict(record) for record in result]
                 return actors
         except Exception as e:
@@ -356,18 +914,9 @@ class Neo4jClient:
         Returns:
             Actor details dictionary or None if not found
         """
-        query = """
-        MATCH (a:ThreatActor {name: $name})
-        OPTIONAL MATCH (a)-[:USES]->(i:IOC)
-        OPTIONAL MATCH (a)-[:ASSOCIATED_WITH]-(related:ThreatActor)
-        RETURN a,
-               collect(DISTINCT i.ioc_value) as iocs,
-               collect(DISTINCT related.name) as related_actors
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, name=actor_name)
+                result = session.run(ACTOR_DETAILS_QUERY, name=actor_name)
                 record = result.single()
                 
                 if not record:
@@ -392,22 +941,9 @@ class Neo4jClient:
         Returns:
             List of IOC dictionaries
         """
-        query = """
-        MATCH (a:ThreatActor {name: $name})-[r:USES]->(i:IOC)
-        RETURN i.ioc_value as ioc_value,
-               i.ioc_type as ioc_type,
-               i.ioc_id as ioc_id,
-               i.source as source,
-               i.threat_type as threat_type,
-               i.confidence as confidence,
-               i.first_seen as first_seen,
-               i.last_seen as last_seen,
-               i.tags as tags
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, name=actor_name)
+                result = session.run(ACTOR_IOCS_QUERY, name=actor_name)
                 iocs = [dict(record) for record in result]
                 return iocs
         except Exception as e:
@@ -424,23 +960,9 @@ class Neo4jClient:
         Returns:
             List of campaign dictionaries
         """
-        query = """
-        MATCH (c:Campaign)
-        OPTIONAL MATCH (c)<-[:FROM_CAMPAIGN]-(i:IOC)
-        RETURN c.campaign_id as campaign_id,
-               c.name as name,
-               c.description as description,
-               c.start_date as start_date,
-               c.end_date as end_date,
-               count(i) as num_iocs,
-               c.updated_at as updated_at
-        ORDER BY c.updated_at DESC
-        LIMIT $limit
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, limit=limit)
+                result = session.run(ALL_CAMPAIGNS_QUERY, limit=limit)
                 campaigns = [dict(record) for record in result]
                 return campaigns
         except Exception as e:
@@ -457,18 +979,9 @@ class Neo4jClient:
         Returns:
             Campaign details dictionary or None if not found
         """
-        query = """
-        MATCH (c:Campaign {campaign_id: $campaign_id})
-        OPTIONAL MATCH (c)<-[:FROM_CAMPAIGN]-(i:IOC)
-        OPTIONAL MATCH (i)<-[:USES]-(a:ThreatActor)
-        RETURN c,
-               collect(DISTINCT i.ioc_value) as iocs,
-               collect(DISTINCT a.name) as threat_actors
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, campaign_id=campaign_id)
+                result = session.run(CAMPAIGN_DETAILS_QUERY, campaign_id=campaign_id)
                 record = result.single()
                 
                 if not record:
@@ -493,23 +1006,9 @@ class Neo4jClient:
         Returns:
             List of IOC dictionaries
         """
-        query = """
-        MATCH (c:Campaign {campaign_id: $campaign_id})<-[:FROM_CAMPAIGN]-(i:IOC)
-        RETURN i.ioc_value as ioc_value,
-               i.ioc_type as ioc_type,
-               i.ioc_id as ioc_id,
-               i.source as source,
-               i.threat_type as threat_type,
-               i.confidence as confidence,
-               i.first_seen as first_seen,
-               i.last_seen as last_seen,
-               i.tags as tags
-        ORDER BY i.first_seen DESC
-        """
-        
         try:
             with self.driver.session() as session:
-                result = session.run(query, campaign_id=campaign_id)
+                result = session.run(CAMPAIGN_IOCS_QUERY, campaign_id=campaign_id)
                 iocs = [dict(record) for record in result]
                 return iocs
         except Exception as e:
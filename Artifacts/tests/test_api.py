@@ -1,6 +1,7 @@
 """Tests for FastAPI endpoints"""
 
 import pytest
+from unittest.mock import Mock, AsyncMock, patch
 from fastapi.testclient import TestClient
 from src.api.main import app
 
@@ -36,12 +37,264 @@ class TestAPI:
         # Accept both 200 (empty results) and 500 (service unavailable)
         assert response.status_code in [200, 500]
     
+    def test_ioc_filter_stats(self):
+        """Test IOC membership filter stats endpoint"""
+        response = client.get("/api/v1/ioc/filter/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert "avoided" in data
+        assert "target_error_rate" in data
+    
+    def test_collect_commits_only_after_indexing(self):
+        """Test feed state only advances when every collected IOC was indexed"""
+        from src.api.dependencies import get_es_client
+        
+        es_client = Mock()
+        app.dependency_overrides[get_es_client] = lambda: es_client
+        try:
+            with patch('src.api.routers.ioc.IOCOrchestrator') as factory:
+                orchestrator = factory.return_value
+                orchestrator.iter_all.return_value = iter([])
+                
+                es_client.stream_index.return_value = {'indexed': 9, 'failed': 1, 'error': None}
+                assert client.post("/api/v1/ioc/collect").status_code == 200
+                orchestrator.commit.assert_not_called()
+                
+                es_client.stream_index.return_value = {'indexed': 4, 'failed': 0, 'error': 'feed broke off'}
+                assert client.post("/api/v1/ioc/collect").status_code == 200
+                orchestrator.commit.assert_not_called()
+                
+                es_client.stream_index.return_value = {'indexed': 10, 'failed': 0, 'error': None}
+                assert client.post("/api/v1/ioc/collect").status_code == 200
+                orchestrator.commit.assert_called_once()
+                assert orchestrator.close.call_count == 3
+        finally:
+            app.dependency_overrides.clear()
+    
+    def test_ioc_check_filters_aliased_types(self):
+        """Test the membership filter is keyed by the normalized type, so aliases are not ruled out"""
+        from src.api.dependencies import get_async_es_client, get_es_client
+        from src.collectors.base_collector import BaseCollector
+        from src.utils.bloom import BloomFilter
+        
+        bloom = BloomFilter(capacity=10)
+        bloom.add(BaseCollector._ioc_id('ip', '192.0.2.1'))
+        index = Mock(rebuild_due=False)
+        index.might_contain.side_effect = lambda ioc_id: ioc_id in bloom
+        
+        es_client = Mock()
+        es_client.search_ioc = AsyncMock(return_value=[])
+        app.dependency_overrides[get_async_es_client] = lambda: es_client
+        app.dependency_overrides[get_es_client] = lambda: Mock()
+        try:
+            with patch('src.api.routers.ioc.get_ioc_bloom_index', return_value=index):
+                response = client.post("/api/v1/ioc/check", json={"ioc_value": "192.0.2.1", "ioc_type": "IPv4"})
+                assert response.status_code == 200
+                es_client.search_ioc.assert_awaited_once_with(ioc_value="192.0.2.1", ioc_type="ip")
+                
+                response = client.post("/api/v1/ioc/check", json={"ioc_value": "192.0.2.2", "ioc_type": "ipv4"})
+                assert response.json() == []
+                es_client.search_ioc.assert_awaited_once()
+        finally:
+            app.dependency_overrides.clear()
+    
+    def test_ioc_check_batch(self):
+        """Test batched IOC check returns one result per indicator"""
+        payload = {"indicators": [
+            {"ioc_value": "192.168.1.1", "ioc_type": "ip"},
+            {"ioc_value": "evil.com"}
+        ]}
+        response = client.post("/api/v1/ioc/check/batch", json=payload)
+        # Accept both 200 (results) and 500 (service unavailable)
+        assert response.status_code in [200, 500]
+        if response.status_code == 200:
+            data = response.json()
+            assert data["checked"] == 2
+            assert len(data["results"]) == 2
+    
     def test_threats_endpoint(self):
         """Test threats endpoint"""
         response = client.get("/api/v1/threats")
         # Accept both 200 (results) and 500 (service unavailable)
         assert response.status_code in [200, 500]
     
+    def test_threat_stats_rejects_bad_interval(self):
+        """Test an unknown histogram interval is a client error and backend errors are not zeros"""
+        from src.api.dependencies import get_async_es_client
+        
+        es_client = Mock()
+        es_client.threat_stats = AsyncMock(side_effect=ConnectionError('cluster unavailable'))
+        app.dependency_overrides[get_async_es_client] = lambda: es_client
+        try:
+            assert client.get("/api/v1/threats/stats", params={"interval": "dya"}).status_code == 422
+            es_client.threat_stats.assert_not_awaited()
+            assert client.get("/api/v1/threats/stats", params={"interval": "week"}).status_code == 500
+        finally:
+            app.dependency_overrides.clear()
+    
+    def test_es_client_is_shared(self):
+        """Test that handlers reuse one Elasticsearch client"""
+        from src.api import dependencies
+        
+        sentinel = object()
+        with patch.object(dependencies, 'ElasticsearchClient', return_value=sentinel) as factory:
+            dependencies.close_es_client()
+            try:
+                assert dependencies.get_es_client() is sentinel
+                assert dependencies.get_es_client() is sentinel
+            finally:
+                dependencies._es_client = None
+        
+        factory.assert_called_once()
+    
+    def test_async_es_client_is_created_once(self):
+        """Test concurrent first requests share one async Elasticsearch client"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from src.api import dependencies
+        
+        def slow_client():
+            time.sleep(0.05)
+            return Mock()
+        
+        with patch.object(dependencies, 'ASYNC_ELASTICSEARCH_AVAILABLE', True), \
+             patch.object(dependencies, 'AsyncElasticsearchClient', side_effect=slow_client) as factory:
+            dependencies._async_es_client = None
+            try:
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    clients = list(executor.map(lambda _: dependencies.get_async_es_client(), range(4)))
+            finally:
+                dependencies._async_es_client = None
+        
+        assert all(c is clients[0] for c in clients)
+        factory.assert_called_once()
+    
+    def test_neo4j_driver_is_shared(self):
+        """Test graph endpoints reuse one Neo4j driver across requests"""
+        from src.api import dependencies
+        
+        neo4j = Mock()
+        neo4j.get_all_actors = AsyncMock(return_value=[{'name': 'APT28'}])
+        with patch.object(dependencies, 'AsyncNeo4jClient', return_value=neo4j) as factory:
+            dependencies._neo4j_client = None
+            try:
+                for _ in range(2):
+                    response = client.get("/api/v1/actors")
+                    assert response.status_code == 200
+                    assert response.json() == {"actors": [{'name': 'APT28'}], "count": 1}
+            finally:
+                dependencies._neo4j_client = None
+        
+        factory.assert_called_once()
+    
+    def test_neo4j_driver_is_created_once(self):
+        """Test concurrent first requests share one Neo4j driver"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from src.api import dependencies
+        
+        def slow_client():
+            time.sleep(0.05)
+            return Mock()
+        
+        with patch.object(dependencies, 'NEO4J_AVAILABLE', True), \
+             patch.object(dependencies, 'AsyncNeo4jClient', side_effect=slow_client) as factory:
+            dependencies._neo4j_client = None
+            try:
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    clients = list(executor.map(lambda _: dependencies.get_neo4j_client(), range(4)))
+            finally:
+                dependencies._neo4j_client = None
+        
+        assert all(c is clients[0] for c in clients)
+        factory.assert_called_once()
+    
+    def test_network_returns_distinct_subgraph(self):
+        """Test the network endpoint formats the subgraph and rejects unsafe relationship types"""
+        from src.api.dependencies import get_neo4j_client
+        from src.utils.graph_cache import get_graph_cache
+        
+        get_graph_cache().invalidate()
+        neo4j = Mock()
+        neo4j.get_threat_subgraph = AsyncMock(return_value={
+            'nodes': [
+                {'id': '4:x:1', 'labels': ['ThreatActor'], 'properties': {'name': 'APT28'}},
+                {'id': '4:x:2', 'labels': ['IOC'], 'properties': {'ioc_value': 'evil.com', 'ioc_type': 'domain'}}
+            ],
+            'relationships': [
+                {'id': '5:x:1', 'type': 'USES', 'source': '4:x:1', 'target': '4:x:2', 'properties': {}}
+            ],
+            'truncated': False
+        })
+        app.dependency_overrides[get_neo4j_client] = lambda: neo4j
+        try:
+            response = client.get("/api/v1/network", params={"actor_name": "APT28", "relationship_types": "USES"})
+            assert response.status_code == 200
+            data = response.json()
+            assert [n['label'] for n in data['nodes']] == ['APT28', 'evil.com']
+            assert data['edges'][0]['source'] == '4:x:1' and data['edges'][0]['target'] == '4:x:2'
+            assert neo4j.get_threat_subgraph.call_args.kwargs['relationship_types'] == ('USES',)
+            
+            response = client.get("/api/v1/network", params={"relationship_types": "USES]-()"})
+            assert response.status_code == 400
+        finally:
+            app.dependency_overrides.clear()
+    
+    def test_network_views_are_cached(self):
+        """Test repeated network requests are served from the cache and honour If-None-Match"""
+        from src.api.dependencies import get_neo4j_client
+        from src.utils.graph_cache import get_graph_cache
+        
+        get_graph_cache().invalidate()
+        neo4j = Mock()
+        neo4j.get_threat_subgraph = AsyncMock(return_value={
+            'nodes': [{'id': '4:x:1', 'labels': ['ThreatActor'], 'properties': {'name': 'APT29'}}],
+            'relationships': [],
+            'truncated': False
+        })
+        app.dependency_overrides[get_neo4j_client] = lambda: neo4j
+        try:
+            first = client.get("/api/v1/network", params={"actor_name": "APT29"})
+            assert first.status_code == 200
+            etag = first.headers["etag"]
+            
+            second = client.get("/api/v1/network", params={"actor_name": "APT29"}, headers={"If-None-Match": etag})
+            assert second.status_code == 304
+            assert second.headers["etag"] == etag
+            neo4j.get_threat_subgraph.assert_awaited_once()
+            
+            get_graph_cache().invalidate()
+            third = client.get("/api/v1/network", params={"actor_name": "APT29"})
+            assert third.json() == first.json()
+            assert neo4j.get_threat_subgraph.await_count == 2
+        finally:
+            app.dependency_overrides.clear()
+    
+    def test_ioc_search_cursor(self):
+        """Test the next-page cursor in the body and rejection of malformed or expired cursors"""
+        from src.api.dependencies import get_async_es_client
+        from src.utils.elastic import CursorExpiredError
+        
+        es_client = Mock()
+        es_client.search_text_page = AsyncMock(return_value=([{'ioc_value': 'evil.com'}], 'next-page'))
+        app.dependency_overrides[get_async_es_client] = lambda: es_client
+        try:
+            response = client.get("/api/v1/ioc/search", params={"query": "evil", "paginate": "true"})
+            assert response.status_code == 200
+            assert response.json() == {'results': [{'ioc_value': 'evil.com'}], 'count': 1,
+                                       'next_cursor': 'next-page'}
+            assert es_client.search_text_page.call_args.kwargs['paginate'] is True
+            
+            es_client.search_text_page.side_effect = ValueError("Invalid cursor")
+            response = client.get("/api/v1/ioc/search", params={"query": "evil", "cursor": "bad"})
+            assert response.status_code == 400
+            
+            es_client.search_text_page.side_effect = CursorExpiredError("Cursor has expired")
+            response = client.get("/api/v1/ioc/search", params={"query": "evil", "cursor": "old"})
+            assert response.status_code == 410
+        finally:
+            app.dependency_overrides.clear()
+    
     def test_detect_anomaly(self):
         """Test anomaly detection endpoint"""
         payload = {
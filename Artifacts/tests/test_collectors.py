@@ -1,12 +1,27 @@
 """Tests for IOC collectors"""
 
+import io
 import pytest
+import json
+import requests
+import pandas as pd
+import threading
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
 from src.collectors.otx_collector import OTXCollector
 from src.collectors.abuse_collector import AbuseCollector
 from src.collectors.phishtank_collector import PhishTankCollector
 from src.collectors.nvd_collector import NVDCollector
 from src.collectors.base_collector import BaseCollector, IOCDeduplicator
+from src.collectors.ioc_orchestrator import IOCOrchestrator
+from src.collectors.watermarks import WatermarkStore
+from src.collectors.rate_limiter import TokenBucket
+from src.collectors.json_stream import iter_json_array
+from src.collectors.http_cache import configure_session
+from src.collectors.ioc_record import to_records, from_records
+from src.collectors.dedup_store import DedupStore
 
 
 class TestBaseCollector:
@@ -39,6 +54,116 @@ class TestBaseCollector:
         assert collector._normalize_type('url') == 'url'
         assert collector._normalize_type('domain') == 'domain'
         assert collector._normalize_type('hash') == 'hash'
+    
+    def test_normalize_batch_matches_normalize_ioc(self):
+        """Test batch normalization produces the same records as per-IOC normalization"""
+        collector = BaseCollector()
+        iocs = [
+            {'ioc_value': ' 192.168.001.010 ', 'ioc_type': 'IPv4', 'source': 'otx', 'first_seen': '2024-01-01T00:00:00Z'},
+            {'ioc_value': 'HTTPS://Evil.example.com/Path/', 'ioc_type': 'url', 'first_seen': '2024-01-02 03:04:05',
+             'last_seen': '01/05/2024', 'tags': ['Phishing', ''], 'phish_id': '1'},
+            {'ioc_value': 'http://www.Example.com:8080/x', 'ioc_type': 'hostname', 'first_seen': '2024-1-2 3:04:05',
+             'tags': 'a, b', 'confidence': '0.7'},
+            {'ioc_value': 'ABCDEF0123', 'ioc_type': 'FileHash-MD5', 'first_seen': datetime(2024, 1, 3)},
+            {'ioc_value': 'CVE-2024-0001', 'ioc_type': 'cve', 'first_seen': '2024-01-04', 'threat_type': 'high_risk'}
+        ]
+        
+        batch = collector.normalize_batch(iocs)
+        assert batch == [collector.normalize_ioc(ioc) for ioc in iocs]
+        
+        frame = pd.DataFrame(iocs)
+        assert [ioc['ioc_id'] for ioc in collector.normalize_batch(frame)] == [ioc['ioc_id'] for ioc in batch]
+        assert 'phish_id' not in collector.normalize_batch(frame)[0]['metadata']
+
+
+class TestIOCRecord:
+    """Tests for IOCRecord"""
+    
+    def test_round_trip(self):
+        """Test records convert losslessly to and from the normalized dict shape"""
+        collector = BaseCollector()
+        iocs = collector.normalize_batch([
+            {'ioc_value': 'd41d8cd98f00b204e9800998ecf8427e', 'ioc_type': 'md5', 'source': 'abuse_ch_malwarebazaar',
+             'threat_type': 'malware', 'first_seen': '2024-01-02 03:04:05', 'tags': ['exe'], 'file_type': 'exe'},
+            {'ioc_value': 'http://phish.example.com', 'ioc_type': 'url', 'source': 'phishtank',
+             'first_seen': '2024-01-01T00:00:00Z', 'last_seen': '2024-01-01T12:30:00.250000'},
+            {'ioc_value': 'CVE-2024-0001', 'ioc_type': 'cve', 'first_seen': '2024-01-01T02:00:00+02:00'}
+        ])
+        iocs.append({'ioc_id': 'test_id_1', 'ioc_value': 'x', 'ioc_type': 'ip', 'source': 'test',
+                     'threat_type': 'unknown', 'first_seen': 'bad', 'last_seen': '2024-01-01T00:00:00Z',
+                     'confidence': 0.5, 'tags': [], 'metadata': {}, 'extra_field': 1})
+        
+        records = to_records(iocs)
+        
+        assert from_records(records) == iocs
+        assert len(records[0].ioc_id) == 32
+        assert records[0].hex_id == iocs[0]['ioc_id']
+        assert records[2].first_seen_datetime == datetime(2024, 1, 1, 0, 0, 0)
+        assert records[0].source is to_records([dict(iocs[0])])[0].source
+    
+    def test_round_trip_keeps_missing_and_null_fields(self):
+        """Test absent keys stay absent and None or oddly shaped values come back as given"""
+        iocs = [
+            {'ioc_id': 'ab' * 32, 'ioc_value': '192.0.2.1', 'ioc_type': 'ip'},
+            {'ioc_id': 'cd' * 32, 'ioc_value': 'evil.com', 'ioc_type': 'domain', 'source': 'otx',
+             'first_seen': None, 'last_seen': '2024-01-01T00:00:00Z', 'tags': None, 'metadata': None},
+            {'ioc_id': 'ef' * 32, 'ioc_value': 'x', 'first_seen': '2024-01-01T00:00:00Z', 'last_seen': None,
+             'tags': ('a', 'b'), 'metadata': ['related']}
+        ]
+        
+        records = to_records(iocs)
+        
+        assert from_records(records) == iocs
+        assert records[0].missing_fields == ('source', 'threat_type', 'first_seen', 'last_seen',
+                                             'confidence', 'tags', 'metadata')
+        assert records[1].raw_timestamps[0] is None
+    
+    def test_compact_fields(self):
+        """Test timestamps are epoch integers and repeated strings are shared"""
+        ioc = {'ioc_id': 'ab' * 32, 'ioc_value': '192.0.2.1', 'ioc_type': 'ip', 'source': 'otx',
+               'threat_type': 'malware', 'first_seen': '1970-01-01T00:00:01Z',
+               'last_seen': '1970-01-01T00:00:02+00:00Z', 'confidence': 0.9, 'tags': ['c2'],
+               'metadata': {'pulse_id': 'p1'}}
+        
+        first, second = to_records([ioc, dict(ioc, metadata={'pulse_id': 'p2'})])
+        
+        assert first.first_seen == 1000000
+        assert first.last_seen == 2000000
+        assert first.raw_timestamps is None
+        assert first.metadata_keys is second.metadata_keys
+        assert first.tags is second.tags
+        assert second.metadata == {'pulse_id': 'p2'}
+    
+    def test_shared_tuples_are_bounded(self):
+        """Test the table of shared tag tuples does not grow with every distinct tag set"""
+        from src.collectors import ioc_record
+        
+        for i in range(ioc_record._MAX_SHARED_TUPLES + 10):
+            ioc_record._shared((f'tag{i}',))
+        
+        assert ioc_record._shared_tuple.cache_info().currsize == ioc_record._MAX_SHARED_TUPLES
+    
+    def test_deduplicator_keeps_pending_records_compact(self):
+        """Test records awaiting commit are held as IOCRecords and merged from them"""
+        from src.collectors.ioc_record import IOCRecord
+        
+        deduplicator = IOCDeduplicator(store=DedupStore(':memory:'))
+        collector = BaseCollector()
+        first, second = collector.normalize_batch([
+            {'ioc_value': '192.0.2.1', 'ioc_type': 'ip', 'source': 'otx', 'tags': ['c2'],
+             'first_seen': '2024-01-02T00:00:00Z'},
+            {'ioc_value': '192.0.2.1', 'ioc_type': 'ip', 'source': 'abuse', 'tags': ['botnet'],
+             'first_seen': '2024-01-01T00:00:00Z'}
+        ])
+        
+        emitted = list(deduplicator.iter_deduplicate([first]))
+        assert isinstance(deduplicator._pending[first['ioc_id']], IOCRecord)
+        merged = list(deduplicator.iter_deduplicate([second]))
+        
+        assert emitted == [first]
+        assert merged[0]['first_seen'] == second['first_seen']
+        assert sorted(merged[0]['tags']) == ['botnet', 'c2']
+        assert merged[0]['metadata']['all_sources'] == ['abuse', 'otx']
 
 
 class TestIOCDeduplicator:
@@ -77,6 +202,71 @@ class TestIOCDeduplicator:
         
         assert len(deduplicated) == 2
         assert deduplicated[0]['confidence'] == 0.9  # Max confidence
+    
+    def test_iter_deduplicate(self):
+        """Test incremental deduplication yields new and changed records only"""
+        deduplicator = IOCDeduplicator()
+        
+        iocs = [
+            {'ioc_id': 'a', 'source': 'source1', 'confidence': 0.8, 'tags': [], 'metadata': {}},
+            {'ioc_id': 'b', 'source': 'source1', 'confidence': 0.7, 'tags': [], 'metadata': {}},
+            {'ioc_id': 'a', 'source': 'source1', 'confidence': 0.5, 'tags': [], 'metadata': {}},
+            {'ioc_id': 'a', 'source': 'source2', 'confidence': 0.9, 'tags': [], 'metadata': {}},
+        ]
+        
+        emitted = [(ioc['ioc_id'], ioc['confidence']) for ioc in deduplicator.iter_deduplicate(iter(iocs))]
+        
+        # Second 'a' changes all_sources metadata, third raises confidence
+        assert emitted[0] == ('a', 0.8)
+        assert emitted[1] == ('b', 0.7)
+        assert emitted[-1] == ('a', 0.9)
+        assert {ioc_id for ioc_id, _ in emitted} == {'a', 'b'}
+    
+    def test_persistent_store_emits_only_changes(self):
+        """Test a dedup store merges across runs and only returns new or changed IOCs"""
+        store = DedupStore(':memory:')
+        base = {'ioc_type': 'ip', 'threat_type': 'malware', 'first_seen': '2024-01-02T00:00:00Z',
+                'last_seen': '2024-01-02T00:00:00Z', 'tags': ['c2'], 'metadata': {}}
+        first_run = [dict(base, ioc_id='a', ioc_value='192.0.2.1', source='otx', confidence=0.5),
+                     dict(base, ioc_id='b', ioc_value='192.0.2.2', source='otx', confidence=0.5)]
+        second_run = [dict(base, ioc_id='a', ioc_value='192.0.2.1', source='otx', confidence=0.5),
+                      dict(base, ioc_id='b', ioc_value='192.0.2.2', source='abuse_ch', confidence=0.9,
+                           first_seen='2024-01-01T00:00:00Z', tags=['botnet'])]
+        
+        deduplicator = IOCDeduplicator(store=store)
+        assert len(deduplicator.deduplicate(first_run)) == 2
+        # Nothing is stored until the consumer confirms the records were indexed
+        assert store.count() == 0
+        assert len(IOCDeduplicator(store=store).deduplicate(first_run)) == 2
+        deduplicator.commit()
+        
+        deduplicator = IOCDeduplicator(store=store, batch_size=1)
+        changed = list(deduplicator.iter_deduplicate(second_run))
+        deduplicator.commit()
+        
+        assert [ioc['ioc_id'] for ioc in changed] == ['b']
+        assert changed[0]['confidence'] == 0.9
+        assert changed[0]['first_seen'] == '2024-01-01T00:00:00Z'
+        assert sorted(changed[0]['tags']) == ['botnet', 'c2']
+        assert changed[0]['metadata']['all_sources'] == ['abuse_ch', 'otx']
+        assert store.get_many(['b'])['b'] == changed[0]
+        assert IOCDeduplicator(store=store).deduplicate(second_run) == []
+    
+    def test_pending_records_merge_across_batches(self):
+        """Test uncommitted records of a run are merged without mutating emitted ones"""
+        store = DedupStore(':memory:')
+        base = {'ioc_id': 'a', 'ioc_type': 'ip', 'ioc_value': '192.0.2.1', 'threat_type': 'malware',
+                'first_seen': '2024-01-02T00:00:00Z', 'last_seen': '2024-01-02T00:00:00Z',
+                'tags': [], 'metadata': {}}
+        deduplicator = IOCDeduplicator(store=store, batch_size=1)
+        
+        emitted = list(deduplicator.iter_deduplicate([dict(base, source='otx', confidence=0.5),
+                                                      dict(base, source='abuse_ch', confidence=0.9)]))
+        
+        assert [ioc['confidence'] for ioc in emitted] == [0.5, 0.9]
+        assert emitted[1]['metadata']['all_sources'] == ['abuse_ch', 'otx']
+        deduplicator.commit()
+        assert store.get_many(['a'])['a'] == emitted[1]
 
 
 class TestOTXCollector:
@@ -148,14 +338,16 @@ class TestPhishTankCollector:
         """Test PhishTank collection"""
         # Mock response
         mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response.status_code = 200
+        mock_response.headers = {'ETag': '"v1"'}
+        mock_response.iter_content.return_value = iter([json.dumps([
             {
                 'url': 'http://phishing.example.com',
                 'phish_id': '12345',
                 'verified': 'yes',
                 'submission_time': '2024-01-01T00:00:00Z'
             }
-        ]
+        ]).encode()])
         mock_response.raise_for_status = Mock()
         mock_session.return_value.get.return_value = mock_response
         
@@ -165,3 +357,306 @@ class TestPhishTankCollector:
         assert len(iocs) > 0
         assert any(ioc['ioc_type'] == 'url' for ioc in iocs)
 
+
+class TestJSONStream:
+    """Tests for the streaming JSON array decoder"""
+    
+    def test_iter_json_array_across_chunks(self):
+        """Test elements split across chunk boundaries are decoded in order"""
+        document = json.dumps([{'url': 'http://a.example.com'}, 12345, 'café', {'n': [1, 2]}]).encode()
+        chunks = [document[i:i + 3] for i in range(0, len(document), 3)]
+        
+        assert list(iter_json_array(chunks)) == [{'url': 'http://a.example.com'}, 12345, 'café', {'n': [1, 2]}]
+        assert list(iter_json_array([b'{"phishes": [1, 2]}'], key='phishes')) == [1, 2]
+    
+    def test_stops_reading_early(self):
+        """Test no chunks are read beyond the last element requested"""
+        read = []
+        
+        def chunks():
+            for chunk in (b'[{"a": 1},', b' {"a": 2},', b' {"a": 3}]'):
+                read.append(chunk)
+                yield chunk
+        
+        stream = iter_json_array(chunks())
+        assert next(stream) == {'a': 1}
+        assert len(read) == 1
+
+
+class TestHTTPCache:
+    """Tests for the shared caching HTTP layer"""
+    
+    @staticmethod
+    def _response(status, body=b'', headers=None):
+        return HTTPResponse(body=io.BytesIO(body), headers=headers or {}, status=status, preload_content=False)
+    
+    def test_fresh_responses_served_from_disk(self, tmp_path):
+        """Test a response within its TTL is reused without a request"""
+        session = configure_session(requests.Session(), 'otx', cache_dir=str(tmp_path))
+        
+        with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+            raw = self._response(200, b'{"results": [1]}', {'Content-Type': 'application/json'})
+            mock_send.side_effect = lambda request, **kwargs: HTTPAdapter().build_response(request, raw)
+            
+            first = session.get('https://otx.example.com/api/v1/pulses', params={'page': 1}).json()
+            second = session.get('https://otx.example.com/api/v1/pulses', params={'page': 1})
+        
+        assert mock_send.call_count == 1
+        assert second.json() == first == {'results': [1]}
+        assert second.from_cache is True
+    
+    def test_stale_responses_revalidated(self, tmp_path):
+        """Test a stale response is revalidated with its ETag and reused on 304"""
+        session = configure_session(requests.Session(), 'phishtank', ttl=0, cache_dir=str(tmp_path))
+        responses = [
+            self._response(200, b'[{"url": "http://a.example.com"}]', {'ETag': '"v1"'}),
+            self._response(304)
+        ]
+        
+        with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+            mock_send.side_effect = lambda request, **kwargs: HTTPAdapter().build_response(request, responses.pop(0))
+            
+            first = session.get('http://data.example.com/online-valid.json', stream=True)
+            body = b''.join(first.iter_content(chunk_size=4))
+            second = session.get('http://data.example.com/online-valid.json', stream=True)
+            
+            revalidation = mock_send.call_args.args[0]
+        
+        assert revalidation.headers['If-None-Match'] == '"v1"'
+        assert second.status_code == 200
+        assert b''.join(second.iter_content(chunk_size=4)) == body
+    
+    def test_partial_body_not_cached(self, tmp_path):
+        """Test a body closed before it was fully read is not stored"""
+        session = configure_session(requests.Session(), 'phishtank', cache_dir=str(tmp_path))
+        
+        with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+            mock_send.side_effect = lambda request, **kwargs: HTTPAdapter().build_response(
+                request, self._response(200, b'x' * 100))
+            
+            response = session.get('http://data.example.com/online-valid.json', stream=True)
+            next(response.iter_content(chunk_size=10))
+            response.close()
+            session.get('http://data.example.com/online-valid.json')
+        
+        assert mock_send.call_count == 2
+
+
+class TestNVDCollector:
+    """Tests for NVDCollector"""
+    
+    @patch('src.collectors.nvd_collector.requests.Session')
+    def test_incremental_query(self, mock_session):
+        """Test modified-since collection uses lastModified range and fills the cursor"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'totalResults': 3,
+            'vulnerabilities': [
+                {'cve': {'id': 'CVE-2024-0001', 'lastModified': '2024-01-02T00:00:00.000'}},
+                {'cve': {'id': 'CVE-2024-0002', 'lastModified': '2024-01-03T00:00:00.000'}}
+            ]
+        }
+        mock_response.raise_for_status = Mock()
+        mock_session.return_value.get.return_value = mock_response
+        
+        collector = NVDCollector()
+        cursor = {}
+        since = datetime.utcnow() - timedelta(days=1)
+        iocs = list(collector.iter_recent_cves(limit=2, modified_since=since, cursor=cursor))
+        
+        params = mock_session.return_value.get.call_args.kwargs['params']
+        assert 'lastModStartDate' in params
+        assert 'pubStartDate' not in params
+        assert len(iocs) == 2
+        assert cursor['exhausted'] is False
+        assert cursor['page'] == 2
+        assert cursor['max_modified'] == '2024-01-03T00:00:00.000'
+    
+    @patch('src.collectors.nvd_collector.requests.Session')
+    def test_paginates_with_start_index(self, mock_session):
+        """Test a backfill follows startIndex across pages and retries after 429"""
+        def page(start, count, total):
+            response = Mock()
+            response.status_code = 200
+            response.headers = {}
+            response.raise_for_status = Mock()
+            response.json.return_value = {
+                'totalResults': total,
+                'vulnerabilities': [{'cve': {'id': f'CVE-2024-{i:04d}'}} for i in range(start, start + count)]
+            }
+            return response
+        
+        throttled = Mock()
+        throttled.status_code = 429
+        throttled.headers = {'Retry-After': '6'}
+        mock_session.return_value.get.side_effect = [page(0, 2, 5), throttled, page(2, 2, 5), page(4, 1, 5)]
+        
+        limiter = Mock()
+        limiter.period, limiter.capacity = 30, 5
+        collector = NVDCollector(rate_limiter=limiter)
+        cursor = {}
+        end = datetime(2024, 1, 10)
+        iocs = list(collector.iter_cves(end - timedelta(days=5), end, cursor=cursor))
+        
+        assert [ioc['ioc_value'] for ioc in iocs] == [f'CVE-2024-{i:04d}' for i in range(5)]
+        start_indexes = [call.kwargs['params'].get('startIndex', 0)
+                         for call in mock_session.return_value.get.call_args_list]
+        assert start_indexes == [0, 2, 2, 4]
+        limiter.penalize.assert_called_once_with(6.0)
+        assert limiter.acquire.call_count == 4
+        assert cursor['exhausted'] is True
+    
+    @patch('src.collectors.nvd_collector.requests.Session')
+    def test_failed_page_fails_the_source(self, mock_session, tmp_path):
+        """Test a page that cannot be fetched is reported as an error and keeps the watermark"""
+        first = Mock(status_code=200, headers={})
+        first.json.return_value = {'totalResults': 4, 'vulnerabilities': [
+            {'cve': {'id': f'CVE-2024-{i:04d}', 'lastModified': '2024-01-05T00:00:00.000'}} for i in range(2)]}
+        broken = Mock(status_code=500, headers={})
+        broken.raise_for_status.side_effect = requests.exceptions.HTTPError('500 Server Error')
+        mock_session.return_value.get.side_effect = [first, broken]
+        
+        store = WatermarkStore(path=str(tmp_path / 'watermarks.json'))
+        since = datetime(2024, 1, 1)
+        store.update('nvd', modified_since=since.isoformat(), page=None)
+        orchestrator = IOCOrchestrator(watermarks=store)
+        orchestrator.nvd.rate_limiter = Mock(period=30, capacity=5)
+        for name in ('otx', 'abuse', 'phishtank'):
+            getattr(orchestrator, name).iter_all = Mock(return_value=iter([]))
+        
+        orchestrator.collect_all(limit_per_source=10, incremental=True)
+        orchestrator.commit()
+        
+        report = orchestrator.source_reports['nvd']
+        assert report['status'] == 'error'
+        assert '500 Server Error' in report['error']
+        assert store.get_since('nvd') == since
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket"""
+    
+    def test_rolling_window(self):
+        """Test no more than capacity tokens are handed out per window"""
+        now = [0.0]
+        bucket = TokenBucket(capacity=5, period=30, margin=0.5,
+                             clock=lambda: now[0],
+                             sleep=lambda seconds: now.__setitem__(0, now[0] + seconds))
+        
+        assert all(bucket.try_acquire() == 0.0 for _ in range(5))
+        assert bucket.try_acquire() == pytest.approx(30.5)
+        
+        assert bucket.acquire() is True
+        assert now[0] == pytest.approx(30.5)
+        assert bucket.available == 4
+        
+        bucket.penalize(10)
+        assert bucket.available == 0
+        assert bucket.acquire(timeout=1) is False
+
+
+class TestWatermarkStore:
+    """Tests for WatermarkStore"""
+    
+    def test_commit_and_reload(self, tmp_path):
+        """Test watermarks advance only when a feed was drained and survive reloads"""
+        path = str(tmp_path / 'watermarks.json')
+        store = WatermarkStore(path=path)
+        run_started = datetime(2024, 1, 2, 12, 0, 0)
+        previous = datetime(2024, 1, 1, 0, 0, 0)
+        
+        store.commit('otx', {'exhausted': True, 'page': 4}, run_started, count=10)
+        store.commit('nvd', {'exhausted': False, 'page': 2000, 'modified_since': previous}, run_started)
+        
+        reloaded = WatermarkStore(path=path)
+        assert reloaded.get_since('otx') == run_started
+        assert reloaded.get('otx')['page'] is None
+        assert reloaded.get_since('nvd') == previous
+        assert reloaded.get('nvd')['page'] == 2000
+        
+        reloaded.reset('otx')
+        assert reloaded.get_since('otx') is None
+
+
+class TestIOCOrchestrator:
+    """Tests for IOCOrchestrator"""
+    
+    def test_collect_all_concurrent(self):
+        """Test concurrent collection with per-source reports and timeouts"""
+        orchestrator = IOCOrchestrator(max_workers=4)
+        release = threading.Event()
+        
+        orchestrator.otx.iter_all = Mock(return_value=iter([
+            {'ioc_value': '192.0.2.1', 'ioc_type': 'ipv4', 'source': 'otx'}
+        ]))
+        orchestrator.abuse.iter_all = Mock(side_effect=RuntimeError('feed down'))
+        orchestrator.phishtank.iter_all = Mock(return_value=iter([]))
+        orchestrator.nvd.iter_all = lambda **kwargs: iter(release.wait(5) and [])
+        
+        try:
+            iocs = orchestrator.collect_all(limit_per_source=1, source_timeout=0.2)
+        finally:
+            release.set()
+        
+        assert len(iocs) == 1
+        assert iocs[0]['ioc_type'] == 'ip'
+        
+        reports = orchestrator.source_reports
+        assert reports['otx']['status'] == 'ok'
+        assert reports['otx']['count'] == 1
+        assert reports['abuse_ch']['status'] == 'error'
+        assert reports['phishtank']['status'] == 'ok'
+        assert reports['nvd']['status'] == 'timeout'
+    
+    def test_iter_all_streams_deduplicated(self):
+        """Test streaming collection deduplicates across sources"""
+        orchestrator = IOCOrchestrator(max_workers=2, queue_size=2)
+        
+        ioc = {'ioc_value': 'evil.example.com', 'ioc_type': 'domain', 'first_seen': '2024-01-01'}
+        orchestrator.otx.iter_all = Mock(return_value=iter([dict(ioc, source='otx', confidence=0.6)]))
+        orchestrator.abuse.iter_all = Mock(return_value=iter([dict(ioc, source='abuse', confidence=0.9)]))
+        orchestrator.phishtank.iter_all = Mock(return_value=iter(
+            {'ioc_value': f'http://{i}.example.com/', 'ioc_type': 'url', 'source': 'phishtank'}
+            for i in range(10)
+        ))
+        orchestrator.nvd.iter_all = Mock(return_value=iter([]))
+        
+        latest = {}
+        for record in orchestrator.iter_all(limit_per_source=10):
+            latest[record['ioc_id']] = dict(record)
+        
+        assert len(latest) == 11
+        domain = [r for r in latest.values() if r['ioc_type'] == 'domain'][0]
+        assert domain['confidence'] == 0.9
+        assert all(report['status'] == 'ok' for report in orchestrator.source_reports.values())
+    
+    def test_incremental_commits_watermarks(self, tmp_path):
+        """Test incremental runs pass watermarks to collectors and advance them"""
+        store = WatermarkStore(path=str(tmp_path / 'watermarks.json'))
+        since = datetime(2024, 1, 1)
+        store.update('otx', modified_since=since.isoformat(), page=3)
+        orchestrator = IOCOrchestrator(watermarks=store)
+        
+        def otx_iter_pulses(limit, modified_since, cursor):
+            assert modified_since == since
+            assert cursor['page'] == 3
+            cursor['exhausted'] = True
+            return iter([])
+        
+        # The real OTXCollector.iter_all, with only the HTTP paging stubbed out
+        orchestrator.otx.iter_pulses = otx_iter_pulses
+        orchestrator.abuse.iter_all = Mock(return_value=iter([]))
+        orchestrator.phishtank.iter_all = Mock(return_value=iter([]))
+        orchestrator.nvd.iter_all = Mock(return_value=iter([]))
+        
+        orchestrator.collect_all(limit_per_source=5, incremental=True)
+        assert orchestrator.source_reports['otx']['status'] == 'ok'
+        # Nothing moves until the consumer confirms the IOCs were indexed
+        assert store.get_since('otx') == since
+        orchestrator.commit()
+        
+        assert store.get_since('otx') > since
+        assert store.get('otx')['page'] is None
+        nvd_kwargs = orchestrator.nvd.iter_all.call_args.kwargs
+        assert nvd_kwargs['modified_since'] is not None
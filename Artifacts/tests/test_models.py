@@ -7,6 +7,7 @@ from src.models.autoencoder import TrafficAutoencoder, AutoencoderTrainer, Anoma
 from src.models.anomaly_detector import IsolationForestDetector, BehavioralAnomalyDetector
 from src.models.ioc_classifier import IOCClassifier
 from src.models.correlation_engine import ThreatCorrelationEngine
+from src.models.similarity_kernel import SimilarityKernel
 
 
 class TestTrafficAutoencoder:
@@ -130,4 +131,112 @@ class TestThreatCorrelationEngine:
         
         assert len(correlated_iocs) == 2
         assert isinstance(campaigns, dict)
+    
+    def _random_iocs(self, count, seed):
+        rng = np.random.default_rng(seed)
+        timestamps = ['2024-01-01T00:00:00Z', '2024-01-01T05:30:00Z', '2024-01-02T00:00:00Z',
+                      '2024-01-01T23:00:00', '2024-01-03T12:00:00+02:00', '2024-01-01T00:00:00+00:00Z', '']
+        iocs = []
+        for i in range(count):
+            ioc_type = ['ip', 'domain', 'hash', 'url'][rng.integers(4)]
+            ioc = {
+                'ioc_id': f'id{rng.integers(count + 5)}' if rng.random() > 0.05 else '',
+                'ioc_value': f'{ioc_type}-{rng.integers(count)}',
+                'ioc_type': ioc_type,
+                'source': ['test1', 'test2', 'test3'][rng.integers(3)],
+                'threat_type': ['malware', 'phishing', 'c2_server'][rng.integers(3)],
+                'first_seen': timestamps[rng.integers(len(timestamps))],
+                'tags': [f'tag{t}' for t in rng.integers(6, size=rng.integers(3))],
+                'metadata': {}
+            }
+            if ioc_type in ('ip', 'domain') and rng.random() < 0.3:
+                ioc['metadata']['related_domain'] = f'domain-{rng.integers(count)}'
+            if ioc_type == 'hash' and rng.random() < 0.3:
+                ioc['metadata']['related_hashes'] = {'sha1': f'hash-{rng.integers(count)}'}
+            iocs.append(ioc)
+        return iocs
+    
+    def test_candidate_generation_matches_brute_force(self):
+        """Test blocked candidate generation builds exactly the all-pairs graph"""
+        for threshold in [0.0, 0.3, 0.5, 0.7, 0.9]:
+            for seed in range(3):
+                engine = ThreatCorrelationEngine(time_window_hours=6, similarity_threshold=threshold)
+                iocs = self._random_iocs(150, seed)
+                
+                blocked = engine._build_correlation_graph(iocs)
+                brute = engine._build_correlation_graph(iocs, exhaustive=True)
+                
+                assert list(blocked.nodes) == list(brute.nodes)
+                assert list(blocked.edges(data=True)) == list(brute.edges(data=True))
+    
+    def test_candidate_generation_skips_unrelated_pairs(self):
+        """Test only pairs that can reach the threshold are scored"""
+        engine = ThreatCorrelationEngine(time_window_hours=24, similarity_threshold=0.7)
+        iocs = [{
+            'ioc_id': f'id{i}',
+            'ioc_value': f'198.51.100.{i}',
+            'ioc_type': 'ip',
+            'source': f'feed{i % 10}',
+            'threat_type': 'malware',
+            'first_seen': f'2024-01-{i % 28 + 1:02d}T00:00:00Z',
+            'tags': [f'tag{i % 20}']
+        } for i in range(500)]
+        
+        candidates = list(engine._candidate_pairs(iocs, list(range(len(iocs)))))
+        
+        assert len(candidates) < 500 * 499 // 2 // 5
+        assert candidates == sorted(set(candidates))
+        assert len(engine._build_correlation_graph(iocs).edges) == \
+            len(engine._build_correlation_graph(iocs, exhaustive=True).edges)
+
 
+class TestSimilarityKernel:
+    """Tests for SimilarityKernel"""
+    
+    def test_scores_match_scalar_similarity(self):
+        """Test vectorized scores equal _calculate_similarity bit for bit"""
+        engine = ThreatCorrelationEngine(time_window_hours=6)
+        iocs = TestThreatCorrelationEngine()._random_iocs(120, seed=7)
+        iocs[0].update({'ioc_type': 'domain', 'ioc_value': 'Evil.COM'})
+        iocs[1].update({'ioc_type': 'ip', 'metadata': {'related_domain': 'evil.com'}})
+        iocs[2].update({'ioc_type': 'hash', 'ioc_value': 'ABC'})
+        iocs[3].update({'ioc_type': 'hash', 'metadata': {'related_hashes': {'md5': 'abc'}}})
+        iocs[4].update({'first_seen': '2024-01-01T02:15:30.123456Z', 'tags': []})
+        
+        left, right = np.triu_indices(len(iocs), k=1)
+        scores = SimilarityKernel(iocs, 6).score(left, right)
+        expected = [engine._calculate_similarity(iocs[i], iocs[j]) for i, j in zip(left, right)]
+        
+        assert scores.tolist() == expected
+        assert scores[0] == engine._calculate_similarity(iocs[0], iocs[1])
+        assert engine._relationship_similarity(iocs[0], iocs[1]) == 1.0
+        assert engine._relationship_similarity(iocs[2], iocs[3]) == 1.0
+    
+    def test_unhashable_values_fall_back_to_scalar(self):
+        """Test IOCs the kernel cannot encode are still correlated"""
+        engine = ThreatCorrelationEngine(similarity_threshold=0.5)
+        iocs = [
+            {'ioc_id': 'a', 'source': ['feed'], 'threat_type': 'malware', 'first_seen': '2024-01-01T00:00:00Z'},
+            {'ioc_id': 'b', 'source': ['feed'], 'threat_type': 'malware', 'first_seen': '2024-01-01T00:00:00Z'}
+        ]
+        
+        with pytest.raises(TypeError):
+            SimilarityKernel(iocs, 24)
+        assert list(engine._build_correlation_graph(iocs).edges) == [('a', 'b')]
+    
+    def test_non_dict_metadata_is_ignored(self):
+        """Test metadata that is not a dict counts as no relationship instead of raising"""
+        engine = ThreatCorrelationEngine(time_window_hours=6, similarity_threshold=0.3)
+        iocs = TestThreatCorrelationEngine()._random_iocs(60, seed=3)
+        iocs[0].update({'ioc_type': 'domain', 'metadata': 'related_domain'})
+        iocs[1].update({'ioc_type': 'ip', 'metadata': ['evil.com']})
+        iocs[2].update({'ioc_type': 'hash', 'metadata': None})
+        iocs[3].update({'ioc_type': 'hash', 'metadata': {'related_hashes': ['abc']}})
+        
+        left, right = np.triu_indices(len(iocs), k=1)
+        scores = SimilarityKernel(iocs, 6).score(left, right)
+        assert scores.tolist() == [engine._calculate_similarity(iocs[i], iocs[j]) for i, j in zip(left, right)]
+        
+        blocked = engine._build_correlation_graph(iocs)
+        brute = engine._build_correlation_graph(iocs, exhaustive=True)
+        assert list(blocked.edges(data=True)) == list(brute.edges(data=True))
@@ -0,0 +1,704 @@
+"""Tests for utility modules"""
+
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from src.collectors.base_collector import BaseCollector
+from src.utils.bloom import BloomFilter, IOCBloomIndex
+from src.utils import elastic_async
+from datetime import datetime
+from src.utils.elastic import (ElasticsearchClient, build_threats_query, partition_index, partitions_for_range,
+                               plan_lookups)
+from src.utils.elastic_async import AsyncElasticsearchClient, ThreadedElasticsearchClient
+from src.utils.neo4j_graph import Neo4jClient, IOC_CAMPAIGN_LINK_BATCH_QUERY, subgraph_hop_query
+from src.utils.graph_cache import CompactGraph, GraphCache, graph_key, get_graph_cache
+
+
+def _ioc_ids(prefix, count):
+    return [BaseCollector._ioc_id('ip', f'{prefix}.{i >> 8 & 255}.{i & 255}') for i in range(count)]
+
+
+class TestBloomFilter:
+    """Tests for BloomFilter"""
+    
+    def test_membership_and_error_rate(self):
+        """Test added IDs are always found and the false-positive rate stays near target"""
+        known = _ioc_ids('10.0', 5000)
+        unknown = _ioc_ids('11.0', 5000)
+        
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        bloom.add_many(known)
+        
+        assert all(ioc_id in bloom for ioc_id in known)
+        assert sum(ioc_id in bloom for ioc_id in unknown) / len(unknown) < 0.03
+        assert bloom.estimated_error_rate == pytest.approx(0.01, rel=0.2)
+    
+    def test_add_matches_add_many_and_serialization(self):
+        """Test scalar and vectorized inserts set the same bits and survive serialization"""
+        ioc_ids = _ioc_ids('10.0', 100) + ['not-a-hex-id']
+        
+        scalar = BloomFilter(capacity=1000)
+        for ioc_id in ioc_ids:
+            scalar.add(ioc_id)
+        vectorized = BloomFilter(capacity=1000)
+        vectorized.add_many(ioc_ids)
+        
+        assert scalar.bits.tobytes() == vectorized.bits.tobytes()
+        
+        restored = BloomFilter.from_bytes(vectorized.to_bytes())
+        assert restored.count == len(ioc_ids)
+        assert all(ioc_id in restored for ioc_id in ioc_ids)
+        
+        with pytest.raises(ValueError):
+            BloomFilter.from_bytes(b'garbage')
+
+
+class TestIOCBloomIndex:
+    """Tests for IOCBloomIndex"""
+    
+    def test_rebuild_and_stats(self, tmp_path):
+        """Test the index is rebuilt from Elasticsearch, saved and counts avoided lookups"""
+        known = _ioc_ids('10.0', 100)
+        es_client = Mock()
+        es_client.count_iocs.return_value = len(known)
+        es_client.iter_ioc_ids.return_value = iter(known)
+        
+        path = str(tmp_path / 'bloom.bin')
+        index = IOCBloomIndex(path=path, error_rate=0.001)
+        assert index.might_contain(_ioc_ids('11.0', 1)[0]) is True  # Not built yet
+        
+        index.rebuild(es_client)
+        new_id = _ioc_ids('12.0', 1)[0]
+        index.add(new_id)
+        
+        assert index.might_contain(known[0]) is True
+        assert index.might_contain(new_id) is True
+        assert index.might_contain(_ioc_ids('11.0', 1)[0]) is False
+        
+        stats = index.stats()
+        assert stats['ready'] is True
+        assert stats['ids'] == len(known) + 1
+        assert stats['avoided'] == 1
+        assert stats['checks'] == 3
+        
+        reloaded = IOCBloomIndex(path=path)
+        assert reloaded.ready
+        assert reloaded.might_contain(known[-1]) is True
+        assert reloaded.stats()['built_at'] == stats['built_at']
+    
+    def test_stale_filter_is_not_trusted(self, tmp_path):
+        """Test lookups go to the backend once the filter is older than the rebuild interval"""
+        es_client = Mock()
+        es_client.count_iocs.return_value = 10
+        es_client.iter_ioc_ids.return_value = iter(_ioc_ids('10.0', 10))
+        unknown = _ioc_ids('11.0', 1)[0]
+        
+        index = IOCBloomIndex(path=str(tmp_path / 'bloom.bin'), rebuild_interval=60)
+        index.rebuild(es_client)
+        assert index.might_contain(unknown) is False
+        
+        # Another process may have indexed the IOC since the rebuild
+        index._built_at -= 61
+        assert index.fresh is False
+        assert index.might_contain(unknown) is True
+        assert index.stats()['avoided'] == 1
+        
+        # The saved build time counts, not the file's mtime
+        index._filter.built_at -= 61
+        index.save()
+        reloaded = IOCBloomIndex(path=index.path, rebuild_interval=60)
+        assert reloaded.ready and not reloaded.fresh
+        assert reloaded.might_contain(unknown) is True
+
+
+class TestBulkIndexing:
+    """Tests for streaming bulk indexing"""
+    
+    def test_stream_index_chunks_and_retries_rejections(self):
+        """Test IOCs are chunked from a generator and 429 rejections are retried"""
+        attempts = {}
+        
+        def fake_bulk(*args, operations=None, **kwargs):
+            items = []
+            for line in operations[::2]:
+                doc_id = json.loads(line)['index']['_id']
+                attempts[doc_id] = attempts.get(doc_id, 0) + 1
+                # Reject every tenth document once
+                status = 429 if doc_id.endswith('0') and attempts[doc_id] == 1 else 201
+                items.append({'index': {'_id': doc_id, 'status': status}})
+            return Mock(body={'errors': any(i['index']['status'] != 201 for i in items), 'items': items})
+        
+        es_client = ElasticsearchClient()
+        chunks = []
+        iocs = ({'ioc_id': f'ioc-{i}', 'ioc_value': f'10.0.0.{i}'} for i in range(250))
+        
+        with patch('elasticsearch.Elasticsearch.bulk', side_effect=fake_bulk):
+            totals = es_client.stream_index(iocs, chunk_size=100, thread_count=2,
+                                            initial_backoff=0, on_chunk=chunks.append)
+        
+        assert totals['indexed'] == 250
+        assert totals['failed'] == 0
+        assert totals['chunks'] == 3
+        assert [c['documents'] for c in sorted(chunks, key=lambda c: c['chunk'])] == [100, 100, 50]
+        assert attempts['ioc-10'] == 2
+        assert attempts['ioc-11'] == 1
+    
+    def test_stream_index_respects_chunk_bytes(self):
+        """Test chunks are split before exceeding the byte limit"""
+        es_client = ElasticsearchClient()
+        chunks = []
+        iocs = [{'ioc_id': f'ioc-{i}', 'ioc_value': 'x' * 1000} for i in range(10)]
+        
+        def fake_bulk(*args, operations=None, **kwargs):
+            items = [{'index': {'status': 201}} for _ in operations[::2]]
+            return Mock(body={'errors': False, 'items': items})
+        
+        with patch('elasticsearch.Elasticsearch.bulk', side_effect=fake_bulk):
+            totals = es_client.stream_index(iocs, chunk_size=100, max_chunk_bytes=3000,
+                                            on_chunk=chunks.append)
+        
+        assert totals['indexed'] == 10
+        assert all(c['bytes'] <= 3000 for c in chunks)
+        assert len(chunks) > 1
+    
+    def test_stream_index_reports_a_broken_source(self):
+        """Test a source that raises mid-stream is reported, not mistaken for a clean run"""
+        es_client = ElasticsearchClient()
+        
+        def iocs():
+            for i in range(150):
+                yield {'ioc_id': f'ioc-{i}', 'ioc_value': f'10.0.0.{i}'}
+            raise RuntimeError('feed broke off')
+        
+        def fake_bulk(*args, operations=None, **kwargs):
+            items = [{'index': {'status': 201}} for _ in operations[::2]]
+            return Mock(body={'errors': False, 'items': items})
+        
+        with patch('elasticsearch.Elasticsearch.bulk', side_effect=fake_bulk):
+            totals = es_client.stream_index(iocs(), chunk_size=100, thread_count=1)
+        
+        assert totals['error'] == 'feed broke off'
+        assert totals['indexed'] == 100
+        assert totals['failed'] == 0
+    
+    def test_bulk_load_restores_settings(self):
+        """Test bulk-load mode disables refresh and replicas, then restores them"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        indices = es_client.client.indices
+        indices.get_settings.return_value = {
+            'iocs': {'settings': {'index': {'refresh_interval': '5s', 'number_of_replicas': '1'}}}
+        }
+        
+        with pytest.raises(RuntimeError):
+            with es_client.bulk_load(force_merge=True):
+                indices.put_settings.assert_called_once_with(index='iocs', settings={
+                    'index': {'refresh_interval': '-1', 'number_of_replicas': 0}
+                })
+                raise RuntimeError("ingest failed")
+        
+        assert indices.put_settings.call_args.kwargs['settings'] == {
+            'index': {'refresh_interval': '5s', 'number_of_replicas': '1'}
+        }
+        indices.refresh.assert_called_once_with(index='iocs')
+        indices.forcemerge.assert_called_once_with(index='iocs', max_num_segments=1)
+    
+    def test_bulk_load_restores_each_partition(self):
+        """Test every partition gets its own settings back"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        indices = es_client.client.indices
+        indices.get_settings.return_value = {
+            'iocs-2024.04': {'settings': {'index': {'refresh_interval': '30s', 'number_of_replicas': '0'}}},
+            'iocs-2024.05': {'settings': {'index': {'refresh_interval': '1s', 'number_of_replicas': '2'}}}
+        }
+        
+        with es_client.bulk_load():
+            pass
+        
+        restored = {c.kwargs['index']: c.kwargs['settings']['index']
+                    for c in indices.put_settings.call_args_list[2:]}
+        assert restored == {
+            'iocs-2024.04': {'refresh_interval': '30s', 'number_of_replicas': '0'},
+            'iocs-2024.05': {'refresh_interval': '1s', 'number_of_replicas': '2'}
+        }
+    
+    def test_bulk_load_refuses_reentry(self):
+        """Test a nested load or an index with refresh already disabled is refused"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        indices = es_client.client.indices
+        indices.get_settings.return_value = {
+            'iocs': {'settings': {'index': {'refresh_interval': '5s', 'number_of_replicas': '1'}}}
+        }
+        
+        with es_client.bulk_load():
+            with pytest.raises(RuntimeError):
+                with es_client.bulk_load():
+                    pass
+        
+        indices.put_settings.reset_mock()
+        indices.get_settings.return_value = {
+            'iocs': {'settings': {'index': {'refresh_interval': '-1', 'number_of_replicas': '0'}}}
+        }
+        with pytest.raises(RuntimeError):
+            with es_client.bulk_load():
+                pass
+        indices.put_settings.assert_not_called()
+        
+        # The lock is released after a refusal
+        indices.get_settings.return_value = {
+            'iocs': {'settings': {'index': {'refresh_interval': '5s', 'number_of_replicas': '1'}}}
+        }
+        with es_client.bulk_load():
+            pass
+
+
+class TestThreatStats:
+    """Tests for aggregated threat statistics"""
+    
+    def test_threat_stats_uses_aggregations(self):
+        """Test threat stats come from a size=0 aggregation request"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.search.return_value = {
+            'hits': {'total': {'value': 1500, 'relation': 'eq'}, 'hits': []},
+            'aggregations': {
+                'by_threat_type': {'buckets': [{'key': 'malware', 'doc_count': 1200},
+                                               {'key': 'phishing', 'doc_count': 300}]},
+                'by_source': {'buckets': [{'key': 'otx', 'doc_count': 1500}]},
+                'over_time': {'buckets': [{'key': 0, 'key_as_string': '2024-05-01T00:00:00.000Z',
+                                           'doc_count': 1500}]},
+                'confidence': {'values': {'50.0': 0.85, '90.0': 0.95, '99.0': 0.99}}
+            }
+        }
+        
+        stats = es_client.threat_stats(min_confidence=0.8)
+        
+        body = es_client.client.search.call_args.kwargs['body']
+        assert body['size'] == 0
+        assert body['track_total_hits'] is True
+        assert stats['total_threats'] == 1500
+        assert stats['by_threat_type'] == {'malware': 1200, 'phishing': 300}
+        assert stats['by_source'] == {'otx': 1500}
+        assert stats['over_time'] == {'2024-05-01T00:00:00.000Z': 1500}
+        assert stats['confidence_percentiles']['90.0'] == 0.95
+    
+    def test_threat_stats_errors_are_not_zeros(self):
+        """Test a bad interval or a failed request raises instead of reporting no threats"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        
+        with pytest.raises(ValueError):
+            es_client.threat_stats(interval='dya')
+        es_client.client.search.assert_not_called()
+        
+        es_client.client.search.side_effect = ConnectionError('cluster unavailable')
+        with pytest.raises(ConnectionError):
+            es_client.threat_stats()
+
+
+class TestLookupMany:
+    """Tests for batched IOC lookups"""
+    
+    def test_lookup_many_uses_mget_and_msearch(self):
+        """Test typed indicators resolve by ID in one _mget and untyped ones in one msearch"""
+        known_id = BaseCollector._ioc_id('ip', '1.2.3.4')
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.mget.return_value = {'docs': [
+            {'_id': known_id, 'found': True, '_source': {'ioc_value': '1.2.3.4'}},
+            {'_id': BaseCollector._ioc_id('ip', '5.6.7.8'), 'found': False}
+        ]}
+        es_client.client.msearch.return_value = {'responses': [
+            {'hits': {'hits': [{'_source': {'ioc_value': 'evil.com'}}]}}
+        ]}
+        
+        results = es_client.lookup_many([
+            {'ioc_value': '1.2.3.4', 'ioc_type': 'ip'},
+            {'ioc_value': 'evil.com'},
+            {'ioc_value': '5.6.7.8', 'ioc_type': 'ip'}
+        ])
+        
+        assert [r['found'] for r in results] == [True, True, False]
+        assert results[0]['matches'] == [{'ioc_value': '1.2.3.4'}]
+        assert results[1]['matches'] == [{'ioc_value': 'evil.com'}]
+        es_client.client.mget.assert_called_once()
+        assert es_client.client.mget.call_args.kwargs['ids'][0] == known_id
+        es_client.client.msearch.assert_called_once()
+    
+    def test_plan_lookups_normalizes_type_aliases(self):
+        """Test aliased types resolve to the same IDs the collectors index under"""
+        sha256 = 'AB' * 32
+        typed, untyped = plan_lookups([
+            {'ioc_value': '1.2.3.4', 'ioc_type': 'IPv4'},
+            {'ioc_value': sha256, 'ioc_type': 'sha256'},
+            {'ioc_value': 'Mail.Evil.com', 'ioc_type': 'hostname'},
+            {'ioc_value': 'evil.com'}
+        ])
+        
+        assert typed == [[(0, BaseCollector._ioc_id('ip', '1.2.3.4')),
+                          (1, BaseCollector._ioc_id('hash', sha256)),
+                          (2, BaseCollector._ioc_id('domain', 'Mail.Evil.com'))]]
+        assert untyped == [[3]]
+        assert typed[0][1][1] == BaseCollector().normalize_ioc({'ioc_value': sha256, 'ioc_type': 'SHA256'})['ioc_id']
+
+
+class TestTextSearch:
+    """Tests for full-text IOC search"""
+    
+    def test_text_search_runs_server_side_with_highlighting(self):
+        """Test the query covers exact, substring, suffix and description matches and keeps highlights"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.open_point_in_time.return_value = {'id': 'pit'}
+        es_client.client.search.return_value = {'hits': {'hits': [
+            {'_source': {'ioc_value': 'mail.evil.com'}, 'sort': [3.0, 0.9, 1],
+             'highlight': {'ioc_value.domain': ['<em>evil.com</em>']}}
+        ]}}
+        
+        results, cursor = es_client.search_text_page('Evil.com', ioc_type='domain', page_size=10)
+        
+        assert results == [{'ioc_value': 'mail.evil.com', 'highlight': {'ioc_value.domain': ['<em>evil.com</em>']}}]
+        assert cursor is None
+        body = es_client.client.search.call_args.kwargs['body']
+        should = body['query']['bool']['should']
+        assert {'term': {'ioc_value.domain': {'value': 'evil.com', 'boost': 5}}} in should
+        assert should[2]['wildcard']['ioc_value.wildcard']['value'] == '*Evil.com*'
+        assert {'term': {'ioc_type': 'domain'}} in body['query']['bool']['filter']
+        assert 'description' in body['highlight']['fields']
+
+
+class TestCursorPagination:
+    """Tests for point-in-time cursor pagination"""
+    
+    def test_search_page_walks_with_search_after(self):
+        """Test pages resume from the cursor and the PIT is closed after the last page"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.open_point_in_time.return_value = {'id': 'pit-1'}
+        es_client.client.search.side_effect = [
+            {'pit_id': 'pit-2', 'hits': {'hits': [
+                {'_source': {'ioc_value': 'a'}, 'sort': [0.9, 1]},
+                {'_source': {'ioc_value': 'b'}, 'sort': [0.8, 2]}
+            ]}},
+            {'pit_id': 'pit-2', 'hits': {'hits': [
+                {'_source': {'ioc_value': 'c'}, 'sort': [0.7, 3]}
+            ]}}
+        ]
+        
+        first, cursor = es_client.search_threats_page(min_confidence=0.5, page_size=2, paginate=True)
+        assert [d['ioc_value'] for d in first] == ['a', 'b']
+        assert cursor is not None
+        
+        second, cursor = es_client.search_threats_page(min_confidence=0.5, page_size=2, cursor=cursor)
+        assert [d['ioc_value'] for d in second] == ['c']
+        assert cursor is None
+        
+        es_client.client.open_point_in_time.assert_called_once()
+        body = es_client.client.search.call_args.kwargs['body']
+        assert body['pit']['id'] == 'pit-2'
+        assert body['search_after'] == [0.8, 2]
+        assert body['sort'][-1] == {'_shard_doc': 'asc'}
+        es_client.client.close_point_in_time.assert_called_once_with(id='pit-2')
+    
+    def test_first_page_without_paginate_opens_no_pit(self):
+        """Test a first page that does not ask for a cursor is a plain search"""
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.search.return_value = {'hits': {'hits': [
+            {'_source': {'ioc_value': 'a'}, 'sort': [0.9]},
+            {'_source': {'ioc_value': 'b'}, 'sort': [0.8]}
+        ]}}
+        
+        results, cursor = es_client.search_threats_page(min_confidence=0.5, page_size=2)
+        
+        assert [d['ioc_value'] for d in results] == ['a', 'b']
+        assert cursor is None
+        es_client.client.open_point_in_time.assert_not_called()
+        assert 'pit' not in es_client.client.search.call_args.kwargs['body']
+    
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected"""
+        es_client = ElasticsearchClient()
+        with pytest.raises(ValueError):
+            es_client.search_threats_page(cursor='not-a-cursor')
+    
+    def test_expired_cursor(self):
+        """Test a cursor whose point-in-time is gone raises instead of ending the walk"""
+        from elasticsearch import NotFoundError
+        from src.utils.elastic import CursorExpiredError, encode_cursor
+        
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.search.side_effect = NotFoundError(
+            'search_context_missing_exception', Mock(status=404), {})
+        
+        with pytest.raises(CursorExpiredError):
+            es_client.search_threats_page(cursor=encode_cursor('pit-1', [0.8, 2]))
+        
+        es_client.client.search.side_effect = ConnectionError("unreachable")
+        with pytest.raises(ConnectionError):
+            es_client.search_threats_page(cursor=encode_cursor('pit-1', [0.8, 2]))
+
+
+class TestPartitionedIndices:
+    """Tests for time-partitioned IOC indices"""
+    
+    def test_partition_names(self):
+        """Test IOCs map to monthly partitions and ranges to the partitions they span"""
+        assert partition_index('2024-05-31T23:59:59Z') == 'iocs-2024.05'
+        assert partition_index(datetime(2024, 12, 1)) == 'iocs-2024.12'
+        assert partition_index('not a date') is None
+        assert partitions_for_range(datetime(2024, 11, 20), datetime(2025, 2, 1)) == [
+            'iocs-2024.11', 'iocs-2024.12', 'iocs-2025.01', 'iocs-2025.02'
+        ]
+    
+    def test_partitioned_writes_and_searches(self, monkeypatch):
+        """Test documents are routed by first_seen and time searches touch only their partitions"""
+        monkeypatch.setenv('ELASTICSEARCH_PARTITIONED', 'true')
+        es_client = ElasticsearchClient()
+        es_client.client = Mock()
+        es_client.client.search.return_value = {'hits': {'hits': []}}
+        es_client.client.indices.exists.return_value = False
+        es_client.client.indices.exists_alias.return_value = True
+        es_client.client.indices.get_alias.return_value = {'iocs-2024.04': {}}
+        
+        assert es_client.index_name == 'iocs-read'
+        
+        es_client.index_ioc({'ioc_id': 'a', 'first_seen': '2024-05-02T00:00:00Z'})
+        es_client.index_ioc({'ioc_id': 'b', 'first_seen': None})
+        indices = [c.kwargs['_index'] for c in es_client.client.index.call_args_list]
+        assert indices == ['iocs-2024.05', 'iocs-write']
+        
+        es_client.search_by_time_range(datetime(2024, 5, 30), datetime(2024, 6, 2))
+        assert es_client.client.search.call_args.kwargs['index'] == 'iocs-2024.05,iocs-2024.06'
+        
+        assert es_client.rollover(now=datetime(2024, 5, 1)) == 'iocs-2024.05'
+        es_client.client.indices.create.assert_called_once_with(index='iocs-2024.05')
+        assert es_client.client.indices.update_aliases.call_args.kwargs['actions'] == [
+            {'remove': {'index': 'iocs-2024.04', 'alias': 'iocs-write'}},
+            {'add': {'index': 'iocs-2024.05', 'alias': 'iocs-write', 'is_write_index': True}}
+        ]
+    
+    def test_moved_first_seen_deletes_stale_copy(self, monkeypatch):
+        """Test an IOC whose first_seen moves to an earlier month is removed from its old partition"""
+        monkeypatch.setenv('ELASTICSEARCH_PARTITIONED', 'true')
+        es_client = ElasticsearchClient()
+        sent = []
+        
+        def fake_search(*args, index=None, body=None, **kwargs):
+            # 'a' was indexed into May by an earlier run
+            hits = [{'_index': 'iocs-2024.05', '_id': 'a'}] if 'a' in body['query']['ids']['values'] else []
+            return {'hits': {'hits': hits}}
+        
+        def fake_bulk(*args, operations=None, **kwargs):
+            items = []
+            for line in operations:
+                op_type, meta = next(iter(json.loads(line).items()))
+                if op_type in ('index', 'delete'):
+                    sent.append((op_type, meta['_index'], meta['_id']))
+                    items.append({op_type: {'_id': meta['_id'], 'status': 200}})
+            return Mock(body={'errors': False, 'items': items})
+        
+        iocs = [
+            {'ioc_id': 'a', 'first_seen': '2024-04-20T00:00:00Z'},
+            {'ioc_id': 'b', 'first_seen': '2024-06-01T00:00:00Z'},
+            # 'b' merged with an earlier sighting later in the same stream
+            {'ioc_id': 'b', 'first_seen': '2024-03-15T00:00:00Z'}
+        ]
+        
+        with patch('elasticsearch.Elasticsearch.search', side_effect=fake_search), \
+             patch('elasticsearch.Elasticsearch.bulk', side_effect=fake_bulk):
+            totals = es_client.stream_index(iocs, chunk_size=1, thread_count=2)
+        
+        assert totals['indexed'] == 3
+        assert totals['failed'] == 0
+        assert ('delete', 'iocs-2024.05', 'a') in sent
+        assert ('delete', 'iocs-2024.06', 'b') in sent
+        # The stale copy of 'b' is deleted after it was written
+        assert sent.index(('index', 'iocs-2024.06', 'b')) < sent.index(('delete', 'iocs-2024.06', 'b'))
+        assert not any(op == ('delete', 'iocs-2024.04', 'a') or op == ('delete', 'iocs-2024.03', 'b')
+                       for op in sent)
+
+
+class TestAsyncElasticsearchClient:
+    """Tests for the async Elasticsearch clients"""
+    
+    def test_async_client_awaits_search(self):
+        """Test the async client sends the shared query and returns documents"""
+        es = Mock()
+        es.search = AsyncMock(return_value={'hits': {'hits': [{'_source': {'ioc_value': '1.2.3.4'}}]}})
+        
+        with patch.object(elastic_async, 'ASYNC_ELASTICSEARCH_AVAILABLE', True), \
+             patch.object(elastic_async, 'AsyncElasticsearch', return_value=es, create=True):
+            client = AsyncElasticsearchClient()
+            results = asyncio.run(client.search_threats(threat_type='malware', min_confidence=0.8, limit=5))
+        
+        assert results == [{'ioc_value': '1.2.3.4'}]
+        es.search.assert_awaited_once_with(index='iocs', body=build_threats_query('malware', 0.8, 5))
+    
+    def test_threaded_client_runs_sync_client(self):
+        """Test the fallback client runs the sync client off the event loop"""
+        sync_client = Mock(index_name='iocs')
+        sync_client.search_ioc.return_value = [{'ioc_value': 'evil.com'}]
+        
+        client = ThreadedElasticsearchClient(sync_client)
+        results = asyncio.run(client.search_ioc('evil.com', 'domain'))
+        
+        assert results == [{'ioc_value': 'evil.com'}]
+        sync_client.search_ioc.assert_called_once_with('evil.com', 'domain')
+
+
+class TestNeo4jBatchWrites:
+    """Tests for batched Neo4j writes"""
+    
+    def _client(self, batch_size):
+        with patch('src.utils.neo4j_graph.GraphDatabase'):
+            client = Neo4jClient(write_batch_size=batch_size)
+        session = client.driver.session.return_value.__enter__.return_value
+        return client, session
+    
+    def test_links_are_grouped_and_chunked(self):
+        """Test each relationship type is its own UNWIND query, sent in chunks"""
+        client, session = self._client(batch_size=2)
+        links = [{'ioc_id': f'id{i}', 'actor_name': 'APT1'} for i in range(3)]
+        links.append({'ioc_id': 'id9', 'actor_name': 'APT1', 'relationship': 'DROPS'})
+        
+        assert client.bulk_link_iocs_to_actors(links) == 4
+        
+        calls = session.execute_write.call_args_list
+        assert [len(c.args[2]) for c in calls] == [2, 1, 1]
+        assert all('UNWIND $rows' in c.args[1] for c in calls)
+        assert ':USES]' in calls[0].args[1] and ':DROPS]' in calls[2].args[1]
+    
+    def test_invalid_relationship_is_skipped(self):
+        """Test relationship types that could inject Cypher are never sent"""
+        client, session = self._client(batch_size=10)
+        
+        written = client.bulk_link_actors([
+            {'actor1': 'A', 'actor2': 'B'},
+            {'actor1': 'A', 'actor2': 'C', 'relationship': 'X]->() DETACH DELETE a //'}
+        ])
+        
+        assert written == 1
+        session.execute_write.assert_called_once()
+    
+    def test_failed_chunk_reports_committed_rows(self):
+        """Test a failing transaction stops the load and returns rows already written"""
+        client, session = self._client(batch_size=1)
+        session.execute_write.side_effect = [None, Exception('deadlock')]
+        
+        written = client.bulk_link_iocs_to_campaigns([
+            {'ioc_id': 'a', 'campaign_id': 'c1'},
+            {'ioc_id': 'b', 'campaign_id': 'c1'},
+            {'ioc_id': 'c', 'campaign_id': 'c1'}
+        ])
+        
+        assert written == 1
+        assert session.execute_write.call_args.args[1] == IOC_CAMPAIGN_LINK_BATCH_QUERY
+
+
+def _node(node_id, name):
+    return {'id': node_id, 'labels': ['ThreatActor'], 'properties': {'name': name}}
+
+
+def _rel(rel_id, source, target):
+    return {'id': rel_id, 'type': 'ASSOCIATED_WITH', 'source': source, 'target': target, 'properties': {}}
+
+
+class TestThreatSubgraph:
+    """Tests for bounded subgraph traversal"""
+    
+    def _client(self):
+        with patch('src.utils.neo4j_graph.GraphDatabase'):
+            client = Neo4jClient()
+        session = client.driver.session.return_value.__enter__.return_value
+        return client, session
+    
+    def test_hops_are_deduplicated_and_bounded(self):
+        """Test nodes and relationships repeat once and expansion stops at the node limit"""
+        client, session = self._client()
+        session.run.side_effect = [
+            [{'node': _node('a', 'APT1')}],
+            [{'node': _node('b', 'APT2'), 'relationship': _rel('r1', 'a', 'b')},
+             {'node': _node('c', 'APT3'), 'relationship': _rel('r2', 'a', 'c')}],
+            [{'node': _node('a', 'APT1'), 'relationship': _rel('r1', 'a', 'b')},
+             {'node': _node('d', 'APT4'), 'relationship': _rel('r3', 'b', 'd')}]
+        ]
+        
+        subgraph = client.get_threat_subgraph('APT1', depth=3, relationship_types=['ASSOCIATED_WITH'],
+                                              fanout=10, limit=3)
+        
+        assert [n['id'] for n in subgraph['nodes']] == ['a', 'b', 'c']
+        assert [r['id'] for r in subgraph['relationships']] == ['r1', 'r2']
+        assert subgraph['truncated'] is True
+        hop = session.run.call_args_list[1]
+        assert hop.args[0] == subgraph_hop_query(['ASSOCIATED_WITH'])
+        assert hop.kwargs == {'frontier': ['a'], 'fanout': 10}
+        # Depth 3 was requested, but the last hop reached nothing new
+        assert session.run.call_count == 3
+    
+    def test_hop_query_filters_relationship_types(self):
+        """Test the type filter is part of the pattern and invalid types are rejected"""
+        assert '[r:USES|FROM_CAMPAIGN]' in subgraph_hop_query(['USES', 'FROM_CAMPAIGN'])
+        assert '[r]' in subgraph_hop_query()
+        with pytest.raises(ValueError):
+            subgraph_hop_query(['USES]-() DETACH DELETE n //'])
+
+
+class TestGraphCache:
+    """Tests for cached network views"""
+    
+    def _subgraph(self):
+        return {
+            'nodes': [_node('a', 'APT1'), _node('b', 'APT2'), _node('c', 'APT3')],
+            'relationships': [_rel('r2', 'b', 'c'), _rel('r1', 'a', 'b'), _rel('r9', 'a', 'zz')],
+            'truncated': False
+        }
+    
+    def test_compact_graph_round_trip(self):
+        """Test the CSR view keeps every in-view edge and has a content-derived ETag"""
+        graph = CompactGraph.from_subgraph(self._subgraph())
+        
+        assert list(graph.offsets) == [0, 1, 2, 2]
+        assert graph.neighbours('a') == ['b']
+        payload = graph.to_payload()
+        assert [(e['source'], e['target']) for e in payload['edges']] == [('a', 'b'), ('b', 'c')]
+        assert payload['nodes'][0] == {'id': 'a', 'label': 'APT1', 'type': 'ThreatActor', 'data': {'name': 'APT1'}}
+        assert graph.etag == CompactGraph.from_subgraph(self._subgraph()).etag
+    
+    def test_lru_ttl_and_invalidation(self):
+        """Test eviction, expiry and that views computed before an invalidation are discarded"""
+        cache = GraphCache(max_entries=2, ttl=60)
+        graph = CompactGraph.from_subgraph(self._subgraph())
+        keys = [graph_key('APT1'), graph_key('APT2'), graph_key('APT3')]
+        
+        for key in keys:
+            cache.put(key, graph)
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) is graph
+        
+        with patch('src.utils.graph_cache.time.monotonic', return_value=time.monotonic() + 61):
+            assert cache.get(keys[2]) is None
+        
+        generation = cache.generation
+        cache.invalidate()
+        assert cache.put(keys[0], graph, generation) is False
+        assert cache.stale_keys() == [keys[0], keys[2]]
+        
+        rebuilt = asyncio.run(cache.refresh(AsyncMock(return_value=self._subgraph())))
+        assert rebuilt == 2
+        assert cache.get(keys[0]).etag == graph.etag
+    
+    def test_graph_writes_invalidate_views(self):
+        """Test Neo4jClient writes drop cached views"""
+        cache = get_graph_cache()
+        cache.put(graph_key('APT1'), CompactGraph.from_subgraph(self._subgraph()))
+        with patch('src.utils.neo4j_graph.GraphDatabase'):
+            client = Neo4jClient()
+        
+        assert client.bulk_create_iocs([{'ioc_id': 'x'}]) == 1
+        assert cache.get(graph_key('APT1')) is None